@@ -1,8 +1,8 @@
 """Public init."""
 
-from . import index, metadata_manager
+from . import classification, index, metadata_manager
 
-__all__ = ["index", "metadata_manager"]
+__all__ = ["classification", "index", "metadata_manager"]
 
 # version is a human-readable version number.
 
@@ -0,0 +1,127 @@
+"""Classify file paths like `MetadataManager.new_file()`, in batches.
+
+Classification only looks at the path (no I/O), so whole path lists (Ex:
+the path collector's traverse) can be classified up front.
+"""
+
+
+import itertools
+import multiprocessing
+from enum import Enum
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple, Union
+
+from .metadata import real, simulation
+from .metadata.simulation.data_sim import DataSimI3FileMetadata
+from .utils import filename_matching, utils
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+CHUNKSIZE: Final[int] = 10000  # paths per task sent to a worker process
+
+
+class Kind(Enum):
+    """Enum for the kind of metadata collected for a file."""
+
+    REAL = "real"  # /data/exp/ file w/ a known processing level
+    SIMULATION = "simulation"  # /data/sim/ i3 file
+    BASIC = "basic"  # any other /data/exp/ or /data/sim/ file
+    UNACCOUNTED = "unaccounted"  # not indexable w/o --basic-only
+
+
+class CostClass(Enum):
+    """Enum for what the indexer reads to collect a file's metadata."""
+
+    CHECKSUM = "checksum"  # only the file's bytes, for its checksum
+    TARBALL = "tarball"  # also, the tarball's *meta.xml
+    I3 = "i3"  # also, the i3 file's events
+
+
+class Classification(NamedTuple):
+    """A file path's classification."""
+
+    path: str
+    kind: Kind
+    processing_level: Optional[utils.ProcessingLevel]
+    # real: (year, run, subrun, part); simulation: (dataset num, job index)
+    parsed_ids: Union[
+        None, real.filename_patterns.YearRunSubrunPart, Tuple[Optional[int], ...]
+    ]
+
+    @property
+    def cost_class(self) -> CostClass:
+        """Return what the indexer reads to collect the file's metadata."""
+        if self.kind == Kind.SIMULATION or (
+            self.kind == Kind.REAL
+            and self.processing_level == utils.ProcessingLevel.L2
+        ):
+            return CostClass.I3
+        if self.kind == Kind.REAL:
+            return CostClass.TARBALL
+        return CostClass.CHECKSUM
+
+
+def _classify_simulation(path: str) -> Classification:
+    file = utils.FileInfo(path)  # not stat'd
+    if not DataSimI3FileMetadata.is_valid_filename(file.name):
+        return Classification(path, Kind.BASIC, None, None)
+
+    matcher = filename_matching.get_matcher(simulation.filename_patterns.regex_patterns)
+    try:
+        ids = DataSimI3FileMetadata.parse_iceprod_dataset_job_ids(matcher, file)
+    except ValueError:
+        ids = None  # the indexer will raise for this file
+    return Classification(
+        path,
+        Kind.SIMULATION,
+        DataSimI3FileMetadata.figure_processing_level(file),
+        ids,
+    )
+
+
+def classify_path(path: str) -> Classification:
+    """Return the path's classification, same as `MetadataManager.new_file()`.
+
+    `parsed_ids` is `None` if the filename has a known processing level but
+    no known format; the indexer will raise for this file.
+    """
+    if path.startswith("/data/sim/"):
+        return _classify_simulation(path)
+
+    if path.startswith("/data/exp/"):
+        level, ids = real.filename_patterns.classify(utils.FileInfo(path).name)
+        if not level:
+            return Classification(path, Kind.BASIC, None, None)
+        return Classification(path, Kind.REAL, level, ids)
+
+    return Classification(path, Kind.UNACCOUNTED, None, None)
+
+
+def classify_paths(
+    paths: Iterable[str], processes: int = 1, chunksize: int = CHUNKSIZE
+) -> Iterator[Classification]:
+    """Classify the paths, in order, streaming each classification.
+
+    With `processes > 1`, classify across a process pool, `chunksize`
+    paths per task. The paths are read a batch (a task per process) at a
+    time, w/ only the next batch classified ahead of the consumer--instead
+    of `imap()`'s reading all of them ahead of a slow consumer.
+    """
+    if processes <= 1:
+        yield from map(classify_path, paths)
+        return
+
+    paths = iter(paths)
+    with multiprocessing.get_context().Pool(processes) as pool:
+        pending: Iterator[Classification] = iter([])
+        while True:
+            batch = list(itertools.islice(paths, processes * chunksize))
+            if not batch:
+                break
+            ahead = pool.imap(classify_path, batch, chunksize)
+            yield from pending
+            pending = ahead
+        yield from pending
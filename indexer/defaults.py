@@ -21,3 +21,16 @@ ICEPRODV1_DB_PASS = ""
 DRYRUN = False
 NON_RECURSIVE = False
 N_PROCESSES = 1
+CHECKSUM_CACHE = ""
+CHECKSUM_CACHE_XATTR = False
+HASH_MODE = "auto"
+EVENTS_CACHE = ""
+I3_FRAME_SCAN = False
+L2_DIR_CACHE = ""
+ADAPTIVE_PATTERNS = False
+PATTERN_STATS = ""
+ICEPROD_CACHE = ""
+ICEPROD_CACHE_SWR = 0.0  # seconds
+ICEPROD_BUNDLE = ""
+ICEPROD_BULK_TASKS = False
+MAX_TASKS_PER_WORKER = 0
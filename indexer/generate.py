@@ -5,11 +5,12 @@ import argparse
 import logging
 import os
 import pprint
+import stat
 
 import coloredlogs  # type: ignore[import]
 
 from indexer.metadata_manager import MetadataManager
-from indexer.utils import file_utils
+from indexer.utils import file_utils, utils
 
 
 def main() -> None:
@@ -52,14 +53,15 @@ def main() -> None:
 
     while filepath_queue:
         fpath = filepath_queue.pop(0)
-        if not file_utils.is_processable_path(fpath):  # pylint: disable=R1724
+        lstat = os.lstat(fpath)
+        if not file_utils.is_processable_path(fpath, lstat):  # pylint: disable=R1724
             logging.warning(f"File is not processable: {fpath}")
             continue
-        elif os.path.isfile(fpath):
+        elif stat.S_ISREG(lstat.st_mode):
             logging.info(f"Generating metadata for file: {fpath}")
-            metadata = manager.new_file(fpath).generate()
+            metadata = manager.new_file(utils.FileInfo(fpath, lstat)).generate()
             pprint.pprint(metadata)
-        elif os.path.isdir(fpath):
+        elif stat.S_ISDIR(lstat.st_mode):
             logging.info(f"Appending directory's contents to queue: {fpath}")
             filepath_queue.extend(file_utils.get_subpaths(fpath))
         else:
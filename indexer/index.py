@@ -6,7 +6,11 @@ import asyncio
 import json
 import logging
 import math
+import multiprocessing
+import multiprocessing.util
 import os
+import stat
+import sys
 from concurrent.futures import Future, ProcessPoolExecutor
 from time import sleep
 from typing import Any, Dict, List, Optional, cast
@@ -18,7 +22,7 @@ from rest_tools.client import RestClient
 
 from . import defaults
 from .metadata_manager import MetadataManager
-from .utils import file_utils
+from .utils import file_utils, hashing, io_policy, utils
 
 try:
     from typing import TypedDict
@@ -46,6 +50,18 @@ class IndexerFlags(TypedDict):
     iceprodv2_rc_token: str
     iceprodv1_db_pass: str
     dryrun: bool
+    checksum_cache: str
+    checksum_cache_xattr: bool
+    hash_mode: str
+    events_cache: str
+    i3_frame_scan: bool
+    l2_dir_cache: str
+    adaptive_patterns: bool
+    pattern_stats: str
+    iceprod_cache: str
+    iceprod_cache_swr: float
+    iceprod_bundle: str
+    iceprod_bulk_tasks: bool
 
 
 # Constants ----------------------------------------------------------------------------
@@ -53,6 +69,13 @@ class IndexerFlags(TypedDict):
 
 ACCEPTED_ROOTS = ["/data"]  # don't include trailing slash
 
+# imported once by the forkserver, instead of by each worker process
+PRELOAD_MODULES = [
+    "indexer.metadata_manager",
+    "icecube.dataclasses",
+    "icecube.dataio",
+]
+
 
 # Indexing Functions -------------------------------------------------------------------
 
@@ -100,15 +123,23 @@ async def file_exists_in_fc(fc_rc: RestClient, filepath: str) -> bool:
     return bool(ret["files"])
 
 
-async def index_file(
+async def index_file(  # pylint: disable=R0913
     filepath: str,
     manager: MetadataManager,
     fc_rc: RestClient,
     patch: bool = defaults.PATCH,
     dryrun: bool = defaults.DRYRUN,
+    lstat: Optional[os.stat_result] = None,
+    exists_in_fc: Optional[bool] = None,
 ) -> None:
-    """Gather and POST metadata for a file."""
-    if not patch and await file_exists_in_fc(fc_rc, filepath):
+    """Gather and POST metadata for a file.
+
+    Pass in `lstat` if `filepath` was already `os.lstat()`'d, and
+    `exists_in_fc` if it was already looked up in the File Catalog.
+    """
+    if exists_in_fc is None and not patch:
+        exists_in_fc = await file_exists_in_fc(fc_rc, filepath)
+    if not patch and exists_in_fc:
         logging.info(
             f"File already exists in the File Catalog (use --patch to overwrite); "
             f"skipping ({filepath})"
@@ -116,8 +147,8 @@ async def index_file(
         return
 
     try:
-        metadata_file = manager.new_file(filepath)
-        metadata = metadata_file.generate()
+        metadata_file = manager.new_file(utils.FileInfo(filepath, lstat))
+        metadata = await metadata_file.generate_async()
     # OSError is thrown for special files like sockets
     except (OSError, PermissionError, FileNotFoundError) as e:
         logging.exception(f"{filepath} not gathered, {e.__class__.__name__}.")
@@ -126,6 +157,7 @@ async def index_file(
         logging.exception(f"Unexpected exception raised for {filepath}.")
         raise
 
+    io_policy.evict(filepath)  # done reading the file
     logging.debug(f"{filepath} gathered.")
     logging.debug(metadata)
     await _post_metadata(fc_rc, metadata, patch, dryrun)
@@ -140,13 +172,39 @@ async def index_paths(
 ) -> List[str]:
     """POST metadata of files given by paths, and return all child paths."""
     child_paths: List[str] = []
+    lookahead: Dict[str, os.stat_result] = {}  # lstat'd early, for prefetching
+    in_fc: Dict[str, bool] = {}  # looked up early, for prefetching
 
-    for p in paths:  # pylint: disable=C0103
+    async def prefetch(path: str) -> None:
+        try:
+            lookahead[path] = os.lstat(path)
+        except OSError:
+            return  # it'll be dealt with in its own iteration
+        if not stat.S_ISREG(lookahead[path].st_mode):
+            return
+        if not patch:  # don't prefetch a file that'll be skipped
+            try:
+                in_fc[path] = await file_exists_in_fc(fc_rc, path)
+            except requests.exceptions.RequestException:
+                return  # it'll be raised again in its own iteration
+            if in_fc[path]:
+                return
+        io_policy.prefetch(path, lookahead[path])
+        manager.prefetch_iceprod_async(path)  # overlaps w/ the current file
+
+    for i, p in enumerate(paths):  # pylint: disable=C0103
         try:
-            if file_utils.is_processable_path(p):
-                if os.path.isfile(p):
-                    await index_file(p, manager, fc_rc, patch, dryrun)
-                elif os.path.isdir(p):
+            # each path is only stat'd once, here (or in `prefetch()`)
+            lstat = lookahead.pop(p, None) or os.lstat(p)
+            if file_utils.is_processable_path(p, lstat):
+                if stat.S_ISREG(lstat.st_mode):
+                    exists_in_fc = in_fc.pop(p, None)
+                    if i + 1 < len(paths):
+                        await prefetch(paths[i + 1])
+                    await index_file(
+                        p, manager, fc_rc, patch, dryrun, lstat, exists_in_fc
+                    )
+                elif stat.S_ISDIR(lstat.st_mode):
                     logging.debug(f"Directory found, {p}. Queuing its contents...")
                     child_paths.extend(file_utils.get_subpaths(p))
             else:
@@ -155,6 +213,8 @@ async def index_paths(
         except (PermissionError, FileNotFoundError, NotADirectoryError) as e:
             logging.info(f"Skipping {p}, {e.__class__.__name__}.")
 
+    if manager.async_iceprod:
+        await manager.async_iceprod.drop_prefetched()
     return child_paths
 
 
@@ -177,6 +237,84 @@ def path_in_blacklist(path: str, blacklist: List[str]) -> bool:
 # Indexing-Wrapper Functions --------------------------------------------------
 
 
+class _Indexer:
+    """Long-lived indexing state: the metadata manager, REST client, etc.
+
+    Setting these up is costly (Ex: compiling the simulation filename
+    patterns), so they're kept for repeated `index()` calls.
+    """
+
+    def __init__(
+        self,
+        rest_client_args: RestClientArgs,
+        site: str,
+        indexer_flags: IndexerFlags,
+    ):
+        self.indexer_flags = indexer_flags
+        self.fc_rc = RestClient(
+            rest_client_args["url"],
+            token=rest_client_args["token"],
+            timeout=rest_client_args["timeout"],
+            retries=rest_client_args["retries"],
+        )
+        self.manager = MetadataManager(
+            site,
+            basic_only=indexer_flags["basic_only"],
+            iceprodv2_rc_token=indexer_flags["iceprodv2_rc_token"],
+            iceprodv1_db_pass=indexer_flags["iceprodv1_db_pass"],
+            checksum_cache_path=indexer_flags["checksum_cache"],
+            checksum_cache_xattr=indexer_flags["checksum_cache_xattr"],
+            hash_mode=indexer_flags["hash_mode"],
+            events_cache_path=indexer_flags["events_cache"],
+            i3_frame_scan=indexer_flags["i3_frame_scan"],
+            l2_dir_cache_dir=indexer_flags["l2_dir_cache"],
+            adaptive_patterns=indexer_flags["adaptive_patterns"],
+            pattern_stats_path=indexer_flags["pattern_stats"],
+            iceprod_cache_path=indexer_flags["iceprod_cache"],
+            iceprod_cache_swr=indexer_flags["iceprod_cache_swr"],
+            iceprod_bundle_path=indexer_flags["iceprod_bundle"],
+            iceprod_bulk_tasks=indexer_flags["iceprod_bulk_tasks"],
+        )
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def index(self, paths: List[str], blacklist: List[str]) -> List[str]:
+        """Index paths, excluding any matching the blacklist.
+
+        Return all child paths nested under any directories.
+        """
+        if not isinstance(paths, list):
+            raise TypeError(f"`paths` object is not list {paths}")
+        if not paths:
+            return []
+
+        # Filter
+        paths = file_utils.sorted_unique_filepaths(list_of_filepaths=paths)
+        paths = [p for p in paths if not path_in_blacklist(p, blacklist)]
+        try:
+            self.manager.prefetch_iceprod(paths)
+        except Exception as e:  # pylint: disable=W0703
+            logging.warning(f"Could not prefetch from IceProd (querying per file): {e}")
+
+        # Index
+        return self.loop.run_until_complete(
+            index_paths(
+                paths,
+                self.manager,
+                self.fc_rc,
+                self.indexer_flags["patch"],
+                self.indexer_flags["dryrun"],
+            )
+        )
+
+    def close(self) -> None:
+        """Close connections."""
+        self.fc_rc.close()
+        self.manager.close()
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+
 def _index(
     paths: List[str],
     blacklist: List[str],
@@ -188,38 +326,48 @@ def _index(
 
     Return all child paths nested under any directories.
     """
-    if not isinstance(paths, list):
-        raise TypeError(f"`paths` object is not list {paths}")
-    if not paths:
-        return []
-
-    # Filter
-    paths = file_utils.sorted_unique_filepaths(list_of_filepaths=paths)
-    paths = [p for p in paths if not path_in_blacklist(p, blacklist)]
-
-    # Prep
-    fc_rc = RestClient(
-        rest_client_args["url"],
-        token=rest_client_args["token"],
-        timeout=rest_client_args["timeout"],
-        retries=rest_client_args["retries"],
-    )
-    manager = MetadataManager(
-        site,
-        basic_only=indexer_flags["basic_only"],
-        iceprodv2_rc_token=indexer_flags["iceprodv2_rc_token"],
-        iceprodv1_db_pass=indexer_flags["iceprodv1_db_pass"],
-    )
-
-    # Index
-    child_paths = asyncio.get_event_loop().run_until_complete(
-        index_paths(
-            paths, manager, fc_rc, indexer_flags["patch"], indexer_flags["dryrun"]
-        )
+    indexer = _Indexer(rest_client_args, site, indexer_flags)
+    try:
+        return indexer.index(paths, blacklist)
+    finally:
+        indexer.close()
+
+
+# the worker process's indexer, see `_init_worker()`
+_worker_indexer: Optional[_Indexer] = None
+
+
+def _init_worker(
+    rest_client_args: RestClientArgs,
+    site: str,
+    indexer_flags: IndexerFlags,
+) -> None:
+    """Set up the worker process's indexer, for the worker's lifetime."""
+    global _worker_indexer  # pylint: disable=W0603
+    _worker_indexer = _Indexer(rest_client_args, site, indexer_flags)
+    _worker_indexer.manager.preload()
+    multiprocessing.util.Finalize(
+        _worker_indexer, _worker_indexer.close, exitpriority=10
     )
 
-    fc_rc.close()
-    return child_paths
+
+def _index_in_worker(paths: List[str], blacklist: List[str]) -> List[str]:
+    """Index paths with the worker process's indexer."""
+    if not _worker_indexer:
+        raise RuntimeError("Worker process was not initialized.")
+    return _worker_indexer.index(paths, blacklist)
+
+
+def _get_mp_context() -> multiprocessing.context.BaseContext:
+    """Get the forkserver context (if available), with the heavy imports preloaded.
+
+    Each worker forks from the server, which has already imported these.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(PRELOAD_MODULES)  # import errors are ignored
+    return ctx
 
 
 def _recursively_index_multiprocessed(  # pylint: disable=R0913
@@ -229,14 +377,32 @@ def _recursively_index_multiprocessed(  # pylint: disable=R0913
     site: str,
     indexer_flags: IndexerFlags,
     n_processes: int,
+    max_tasks_per_worker: int = defaults.MAX_TASKS_PER_WORKER,
 ) -> None:
     """Gather and post metadata from files rooted at `starting_paths`.
 
-    Do this multi-processed.
+    Do this multi-processed, with long-lived workers. Each is replaced after
+    `max_tasks_per_worker` tasks (batches of paths), if given (Python 3.11+).
+
+    If a worker can't be set up, or dies (Ex: OOM-killed), this raises
+    `BrokenProcessPool`.
     """
+    pool_kwargs: Dict[str, Any] = {}
+    if max_tasks_per_worker:
+        if sys.version_info >= (3, 11):
+            pool_kwargs["max_tasks_per_child"] = max_tasks_per_worker
+        else:
+            logging.warning("Ignoring max_tasks_per_worker, it needs Python 3.11+")
+
     # Traverse paths and process files
     futures: List[Future] = []  # type: ignore[type-arg]
-    with ProcessPoolExecutor() as pool:
+    with ProcessPoolExecutor(
+        n_processes,
+        mp_context=_get_mp_context(),
+        initializer=_init_worker,
+        initargs=(rest_client_args, site, indexer_flags),
+        **pool_kwargs,
+    ) as pool:
         queue = starting_paths
         split = math.ceil(len(queue) / n_processes)
         while futures or queue:
@@ -249,23 +415,14 @@ def _recursively_index_multiprocessed(  # pylint: disable=R0913
                     logging.debug(
                         f"Worker Assigned: {len(futures)+1}/{n_processes} ({len(paths)} paths)."
                     )
-                    futures.append(
-                        pool.submit(
-                            _index,
-                            paths,
-                            blacklist,
-                            rest_client_args,
-                            site,
-                            indexer_flags,
-                        )
-                    )
+                    futures.append(pool.submit(_index_in_worker, paths, blacklist))
             logging.debug(f"Workers: {len(futures)} {futures}.")
             # Extend the queue
             # concurrent.futures.wait(FIRST_COMPLETED) is slower
             while not futures[0].done():
                 sleep(0.1)
             future = futures.pop(0)
-            result = future.result()
+            result = future.result()  # Ex: BrokenProcessPool
             if result:
                 queue.extend(result)
                 split = math.ceil(len(queue) / n_processes)
@@ -279,6 +436,7 @@ def _recursively_index(  # pylint: disable=R0913
     site: str,
     indexer_flags: IndexerFlags,
     n_processes: int,
+    max_tasks_per_worker: int = defaults.MAX_TASKS_PER_WORKER,
 ) -> None:
     """Gather and post metadata from files rooted at `starting_paths`."""
     if n_processes > 1:
@@ -289,14 +447,19 @@ def _recursively_index(  # pylint: disable=R0913
             site,
             indexer_flags,
             n_processes,
+            max_tasks_per_worker,
         )
     else:
+        indexer = _Indexer(rest_client_args, site, indexer_flags)
         queue = starting_paths
         i = 0
-        while queue:
-            logging.debug(f"Queue Iteration #{i}")
-            queue = _index(queue, blacklist, rest_client_args, site, indexer_flags)
-            i += 1
+        try:
+            while queue:
+                logging.debug(f"Queue Iteration #{i}")
+                queue = indexer.index(queue, blacklist)
+                i += 1
+        finally:
+            indexer.close()
 
 
 # Main ---------------------------------------------------------------------------------
@@ -329,6 +492,19 @@ def index(
     dryrun: bool = defaults.DRYRUN,
     non_recursive: bool = defaults.NON_RECURSIVE,
     n_processes: int = defaults.N_PROCESSES,
+    checksum_cache: str = defaults.CHECKSUM_CACHE,
+    checksum_cache_xattr: bool = defaults.CHECKSUM_CACHE_XATTR,
+    hash_mode: str = defaults.HASH_MODE,
+    events_cache: str = defaults.EVENTS_CACHE,
+    i3_frame_scan: bool = defaults.I3_FRAME_SCAN,
+    l2_dir_cache: str = defaults.L2_DIR_CACHE,
+    adaptive_patterns: bool = defaults.ADAPTIVE_PATTERNS,
+    pattern_stats: str = defaults.PATTERN_STATS,
+    iceprod_cache: str = defaults.ICEPROD_CACHE,
+    iceprod_cache_swr: float = defaults.ICEPROD_CACHE_SWR,
+    iceprod_bundle: str = defaults.ICEPROD_BUNDLE,
+    iceprod_bulk_tasks: bool = defaults.ICEPROD_BULK_TASKS,
+    max_tasks_per_worker: int = defaults.MAX_TASKS_PER_WORKER,
 ) -> None:
     """Traverse paths and index.
 
@@ -367,6 +543,32 @@ def index(
             do not recursively index / do not descend into sub-directories
         `n_processes`:
             number of processes for multi-processing (ignored if `non_recursive=True`)
+        `checksum_cache`:
+            SQLite file for caching checksums of unchanged files between runs
+        `checksum_cache_xattr`:
+            also cache checksums in each file's `user.` extended attributes
+        `hash_mode`:
+            how files are read for checksumming ("auto", "readinto", "mmap", or "overlap")
+        `events_cache`:
+            SQLite file for caching i3 files' events summaries by checksum
+        `i3_frame_scan`:
+            (experimental) get i3 files' events summaries by scanning their frames' headers, instead of with `dataio`
+        `l2_dir_cache`:
+            directory for caching L2 run directories' parsed metadata, shared between jobs
+        `adaptive_patterns`:
+            try the simulation filename patterns most-hit first, where that gives the same first match
+        `pattern_stats`:
+            YAML file to add the simulation filename patterns' hit counts to (for `resources/filename_patterns/by_frequency.py`)
+        `iceprod_cache`:
+            SQLite file for caching IceProd query results, shared between jobs
+        `iceprod_cache_swr`:
+            seconds past its TTL that a cached IceProd query result is still used, while it's re-queried in the background
+        `iceprod_bundle`:
+            offline IceProd bundle to answer all IceProd queries from, instead of connecting to IceProd
+        `iceprod_bulk_tasks`:
+            get each IceProd2 dataset's tasks in one request, instead of one request per job
+        `max_tasks_per_worker`:
+            replace each worker process after this many tasks (batches of paths), to cap memory growth (0 for never; needs Python 3.11+)
     """
 
     logging.info(
@@ -400,6 +602,18 @@ def index(
         "iceprodv2_rc_token": iceprodv2_rc_token,
         "iceprodv1_db_pass": iceprodv1_db_pass,
         "dryrun": dryrun,
+        "checksum_cache": checksum_cache,
+        "checksum_cache_xattr": checksum_cache_xattr,
+        "hash_mode": hash_mode,
+        "events_cache": events_cache,
+        "i3_frame_scan": i3_frame_scan,
+        "l2_dir_cache": l2_dir_cache,
+        "adaptive_patterns": adaptive_patterns,
+        "pattern_stats": pattern_stats,
+        "iceprod_cache": iceprod_cache,
+        "iceprod_cache_swr": iceprod_cache_swr,
+        "iceprod_bundle": iceprod_bundle,
+        "iceprod_bulk_tasks": iceprod_bulk_tasks,
     }
 
     # Go!
@@ -407,7 +621,13 @@ def index(
         _index(paths, blacklist, rest_client_args, site, indexer_flags)
     else:
         _recursively_index(
-            paths, blacklist, rest_client_args, site, indexer_flags, n_processes
+            paths,
+            blacklist,
+            rest_client_args,
+            site,
+            indexer_flags,
+            n_processes,
+            max_tasks_per_worker,
         )
 
 
@@ -442,6 +662,14 @@ if __name__ == "__main__":
         help="number of processes for multi-processing "
         "(ignored if using --non-recursive)",
     )
+    parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        default=defaults.MAX_TASKS_PER_WORKER,
+        help="replace each worker process after this many tasks (batches of paths), "
+        "to cap memory growth; 0 for never (ignored if using --non-recursive, "
+        "or before Python 3.11)",
+    )
     parser.add_argument(
         "-u",
         "--url",
@@ -514,6 +742,92 @@ if __name__ == "__main__":
         action="store_true",
         help="do everything except POSTing/PATCHing to the File Catalog",
     )
+    parser.add_argument(
+        "--checksum-cache",
+        default=defaults.CHECKSUM_CACHE,
+        help="SQLite file for caching checksums of unchanged files between runs "
+        "(Ex: in the staging dir); a file is unchanged if its device, inode, "
+        "size, mtime, and ctime are the same",
+    )
+    parser.add_argument(
+        "--checksum-cache-xattr",
+        default=False,
+        action="store_true",
+        help="also cache checksums in each file's `user.` extended attributes",
+    )
+    parser.add_argument(
+        "--hash-mode",
+        default=defaults.HASH_MODE,
+        choices=hashing.HASH_MODES,
+        help="how files are read for checksumming: 'readinto' (one reused buffer), "
+        "'mmap' (best for local disk), 'overlap' (read the next chunk while hashing "
+        "the current one), or 'auto' ('overlap' for large files, else 'readinto')",
+    )
+    parser.add_argument(
+        "--events-cache",
+        default=defaults.EVENTS_CACHE,
+        help="SQLite file for caching i3 files' events summaries (first/last "
+        "event, event count, & content status) by checksum, so known content "
+        "is not re-scanned; pair with --checksum-cache to skip reading it at all",
+    )
+    parser.add_argument(
+        "--i3-frame-scan",
+        default=defaults.I3_FRAME_SCAN,
+        action="store_true",
+        help="(experimental) get i3 files' events summaries by scanning only their "
+        "frames' I3EventHeaders (learned from dataio reads), instead of with dataio",
+    )
+    parser.add_argument(
+        "--l2-dir-cache",
+        default=defaults.L2_DIR_CACHE,
+        help="directory for caching L2 run directories' parsed metadata "
+        "(level2*meta.xml, gaps files, & GCD files), one file per run directory, "
+        "shared between jobs; an entry is re-parsed if those files change",
+    )
+    parser.add_argument(
+        "--adaptive-patterns",
+        default=False,
+        action="store_true",
+        help="periodically reorder the simulation filename patterns by their hit "
+        "counts (only where the first matching pattern stays the same)",
+    )
+    parser.add_argument(
+        "--pattern-stats",
+        default=defaults.PATTERN_STATS,
+        help="YAML file to add the simulation filename patterns' hit counts to, "
+        "at exit (shared by worker processes); for regenerating the static order "
+        "with resources/filename_patterns/by_frequency.py",
+    )
+    parser.add_argument(
+        "--iceprod-cache",
+        default=defaults.ICEPROD_CACHE,
+        help="SQLite file for caching IceProd query results (steering parameters, "
+        "datasets, job configs, & tasks), shared between jobs (also on other hosts, "
+        "w/ a rollback journal; for a whole DAG, prefer --iceprod-bundle); each kind "
+        "of result expires after its TTL, and not-found datasets are cached briefly",
+    )
+    parser.add_argument(
+        "--iceprod-cache-swr",
+        default=defaults.ICEPROD_CACHE_SWR,
+        type=float,
+        help="stale-while-revalidate: seconds past its TTL that a cached IceProd "
+        "query result is still used, while it's re-queried in the background",
+    )
+    parser.add_argument(
+        "--iceprod-bundle",
+        default=defaults.ICEPROD_BUNDLE,
+        help="offline IceProd bundle (from resources/make_iceprod_bundle.py) to "
+        "answer all IceProd queries from; then, no IceProd credentials are needed "
+        "and IceProd is never contacted",
+    )
+    parser.add_argument(
+        "--iceprod-bulk-tasks",
+        default=defaults.ICEPROD_BULK_TASKS,
+        action="store_true",
+        help="get each IceProd2 dataset's tasks in one (unpaged, so possibly large) "
+        "request, then look up each file's task locally, instead of making one "
+        "request per job",
+    )
 
     args = parser.parse_args()
     coloredlogs.install(level=args.log.upper())
@@ -537,4 +851,17 @@ if __name__ == "__main__":
         dryrun=args.dryrun,
         non_recursive=args.non_recursive,
         n_processes=args.processes,
+        checksum_cache=args.checksum_cache,
+        checksum_cache_xattr=args.checksum_cache_xattr,
+        hash_mode=args.hash_mode,
+        events_cache=args.events_cache,
+        i3_frame_scan=args.i3_frame_scan,
+        l2_dir_cache=args.l2_dir_cache,
+        adaptive_patterns=args.adaptive_patterns,
+        pattern_stats=args.pattern_stats,
+        iceprod_cache=args.iceprod_cache,
+        iceprod_cache_swr=args.iceprod_cache_swr,
+        iceprod_bundle=args.iceprod_bundle,
+        iceprod_bulk_tasks=args.iceprod_bulk_tasks,
+        max_tasks_per_worker=args.max_tasks_per_worker,
     )
@@ -1,14 +1,13 @@
 """Class for collecting basic file metadata."""
 
 
-import hashlib
 import os
 from datetime import date
-from typing import cast
+from typing import List, Optional
 
 from file_catalog.schema import types
 
-from ..utils import utils
+from ..utils import checksum_cache, hashing, utils
 
 
 class BasicFileMetadata:
@@ -21,25 +20,62 @@ class BasicFileMetadata:
     def __init__(self, file: utils.FileInfo, site: str):
         self.file = file
         self.site = site
+        self.checksum_cache: Optional[checksum_cache.ChecksumCache] = None
+        self.hash_mode = "auto"  # see `hashing.HASH_MODES`
+        self._sha512: Optional[str] = None
 
     def generate(self) -> types.Metadata:
         """Gather the file's metadata."""
         metadata: types.Metadata = {}
         metadata["logical_name"] = self.file.path
         metadata["checksum"] = {"sha512": self.sha512sum()}
-        metadata["file_size"] = cast(int, self.file.stat().st_size)  # type: ignore[no-untyped-call]
+        metadata["file_size"] = self.file.stat().st_size
         metadata["locations"] = [{"site": self.site, "path": self.file.path}]
-        iso_date = date.fromtimestamp(os.path.getctime(self.file.path)).isoformat()
+        iso_date = date.fromtimestamp(self.file.stat().st_ctime).isoformat()
         metadata["create_date"] = iso_date
         return metadata
 
+    async def generate_async(self) -> types.Metadata:
+        """Gather the file's metadata, w/ any remote queries not blocking the loop."""
+        return self.generate()
+
+    def _stream_consumers(self) -> List[hashing.Consumer]:
+        """Return callables to be fed each chunk read by `sha512sum()`.
+
+        Override to piggyback on the checksum's read pass, so the file
+        is only read from storage once. Each chunk is a `memoryview` of a
+        reused buffer, so consumers need to copy anything they keep.
+        """
+        return []
+
     def sha512sum(self) -> str:
-        """Return the SHA512 checksum of the file given by path."""
-        bufsize = 4194304
-        sha = hashlib.new("sha512")
-        with open(self.file.path, "rb", buffering=0) as file:
-            line = file.read(bufsize)
-            while line:
-                sha.update(line)
-                line = file.read(bufsize)
-        return sha.hexdigest()
+        """Return the SHA512 checksum of the file given by path.
+
+        If there's a checksum cache, use its value for an unchanged file,
+        otherwise hash the file and store the result.
+        """
+        if self._sha512:
+            return self._sha512
+        if not self.checksum_cache:
+            self._sha512 = self._hash_file()
+            return self._sha512
+
+        stat = self.file.stat()
+        cached = self.checksum_cache.get(self.file.path, stat)
+        if cached:
+            self._sha512 = cached
+            return self._sha512
+
+        self._sha512 = self._hash_file()
+        # don't cache if the file was modified while being hashed
+        if checksum_cache.stat_identity(stat) == checksum_cache.stat_identity(
+            os.stat(self.file.path)
+        ):
+            self.checksum_cache.put(self.file.path, stat, self._sha512)
+        return self._sha512
+
+    def _hash_file(self) -> str:
+        """Read the file & return its SHA512 checksum."""
+        return hashing.sha512_file(
+            self.file.path, self._stream_consumers(), self.hash_mode
+        )
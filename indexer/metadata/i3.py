@@ -1,14 +1,18 @@
 """Class for collecting i3 file metadata."""
 
 
+import logging
 import typing
-from typing import Optional
+from typing import List, Optional
 
 from file_catalog.schema import types
 
-from ..utils import utils
+from ..utils import events_cache, hashing, i3_frames, utils
 from .basic import BasicFileMetadata
 
+# shared by every i3 file in the process, so a layout is only learned once
+_EVENT_HEADER_DECODER = i3_frames.EventHeaderDecoder()
+
 
 class I3FileMetadata(BasicFileMetadata):
     """Metadata for i3 files."""
@@ -24,6 +28,9 @@ class I3FileMetadata(BasicFileMetadata):
         self.processing_level = processing_level
         self.data_type = data_type
         self._events_data: Optional[types.EventsData] = None
+        self._frame_scanner: Optional[i3_frames.I3FrameScanner] = None
+        self.events_cache: Optional[events_cache.EventsCache] = None
+        self.frame_scan = False  # experimental, see `_get_events_data()`
 
     def generate(self) -> types.Metadata:
         """Gather the file's metadata."""
@@ -34,19 +41,67 @@ class I3FileMetadata(BasicFileMetadata):
         metadata["content_status"] = self._get_events_data()["status"]
         return metadata
 
+    def _stream_consumers(self) -> List[hashing.Consumer]:
+        """Scan the i3 frames from the same bytes read for the checksum."""
+        consumers = super()._stream_consumers()
+        if not self.frame_scan:
+            return consumers
+        self._frame_scanner = i3_frames.I3FrameScanner.for_file(
+            self.file.name, _EVENT_HEADER_DECODER
+        )
+        if self._frame_scanner:
+            consumers.append(self._frame_scanner.feed)
+        return consumers
+
     def _get_events_data(self) -> types.EventsData:
         """Return events data as a TypedDict.
 
         AKA: the first event id, last event id, number of events, and content
         status.
+
+        If the content's summary is in the events cache, use that. Next,
+        with `frame_scan`, if the file was already streamed (see
+        `sha512sum()`), use that scan. It's not, if its checksum came from
+        the checksum cache--then, scan only the frames' headers. Otherwise,
+        or if the frames could not be scanned, deserialize the file with
+        `dataio`.
         """
         if self._events_data:
             return self._events_data
 
+        if self.events_cache:
+            self._events_data = self.events_cache.get(self.sha512sum())
+            if self._events_data:
+                return self._events_data
+            self._events_data = self._scan_events_data()
+            self.events_cache.put(self.sha512sum(), self._events_data)
+        else:
+            self._events_data = self._scan_events_data()
+        return self._events_data
+
+    def _scan_events_data(self) -> types.EventsData:
+        """Scan the file's frames for the events data."""
+        if not self.frame_scan:
+            return self._read_events_data()
+        if not self._frame_scanner:
+            self._frame_scanner = i3_frames.scan_file(
+                self.file.path, _EVENT_HEADER_DECODER
+            )
+        if self._frame_scanner:
+            try:
+                return self._frame_scanner.finish()
+            except i3_frames.I3StreamError as e:
+                logging.debug(f"Reading {self.file.path} with dataio instead: {e}")
+
+        return self._read_events_data()
+
+    def _read_events_data(self) -> types.EventsData:
+        """Read the events data by deserializing every frame with `dataio`."""
         first = float("inf")
         last = float("-inf")
         count = 0
         status = "good"
+        event_ids: List[int] = []  # the first few, to teach the frame scanner
 
         from icecube import dataio  # type: ignore[import] # pylint: disable=C0415,E0401
 
@@ -55,6 +110,8 @@ class I3FileMetadata(BasicFileMetadata):
                 if "I3EventHeader" in frame:
                     count = count + 1
                     event_id = int(frame["I3EventHeader"].event_id)
+                    if len(event_ids) < i3_frames.N_LEARNING_SAMPLES:
+                        event_ids.append(event_id)
                     # check if event_id precedes `first`
                     if first > event_id:
                         first = event_id
@@ -64,10 +121,13 @@ class I3FileMetadata(BasicFileMetadata):
         except:  # noqa: E722  # pylint: disable=W0702
             status = "bad"
 
-        self._events_data = {
+        scanner = self._frame_scanner
+        if scanner and not scanner.error and scanner.event_count == count:
+            _EVENT_HEADER_DECODER.learn(scanner.samples, event_ids)
+
+        return {
             "first_event": None if first == float("inf") else typing.cast(int, first),
             "last_event": None if last == float("-inf") else typing.cast(int, last),
             "event_count": count,
             "status": status,
         }
-        return self._events_data
@@ -1,6 +1,7 @@
 """Init."""
 
 
+from . import gaps  # noqa: F401
 from .l2 import L2FileMetadata  # noqa: F401
 from .pfdst import PFDSTFileMetadata  # noqa: F401
 from .pffilt import PFFiltFileMetadata  # noqa: F401
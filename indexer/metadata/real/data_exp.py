@@ -3,7 +3,6 @@
 
 import collections
 import logging
-import os
 import re
 import tarfile
 import xml
@@ -14,8 +13,11 @@ from typing import Any, Dict, List, Optional, Tuple
 import xmltodict  # type: ignore[import]
 from file_catalog.schema import types
 
-from ...utils import utils
+from ...utils import filename_matching, io_policy, utils
 from ..i3 import I3FileMetadata
+from . import filename_patterns
+
+_RUN_NUMBER = re.compile(r".*Run(?P<run>\d+)")
 
 
 class DataExpI3FileMetadata(I3FileMetadata):
@@ -27,6 +29,7 @@ class DataExpI3FileMetadata(I3FileMetadata):
         site: str,
         processing_level: utils.ProcessingLevel,
         filename_patterns_: List[str],
+        year_run_subrun_part: Optional[filename_patterns.YearRunSubrunPart] = None,
     ):
         super().__init__(file, site, processing_level, "real")
         if not self.processing_level:
@@ -34,6 +37,9 @@ class DataExpI3FileMetadata(I3FileMetadata):
                 "Processing level cannot be None for DataExpI3FileMetadata and derived instances."
             )
         self.meta_xml: Dict[str, Any] = {}
+        if year_run_subrun_part is not None:  # Ex: from `filename_patterns.classify()`
+            self.season_year, self.run, self.subrun, self.part = year_run_subrun_part
+            return
         try:
             (
                 self.season_year,
@@ -72,7 +78,7 @@ class DataExpI3FileMetadata(I3FileMetadata):
     @staticmethod
     def parse_year_run_subrun_part(
         patterns: List[str], filename: str
-    ) -> Tuple[Optional[int], int, int, int]:
+    ) -> filename_patterns.YearRunSubrunPart:
         r"""Return the year, run, subrun, and part by parsing the `filename` according to regex `patterns`.
 
         Uses named groups: `year`, `run`, `subrun`, and `part`.
@@ -83,34 +89,9 @@ class DataExpI3FileMetadata(I3FileMetadata):
             if "?P<run>" not in p:
                 raise Exception(f"Pattern does not have `run` regex group, {p}.")
 
-            match = re.match(p, filename)
-            if match:
-                values = match.groupdict()
-                # get year
-                if "ic_strings" in values:
-                    year = utils.IceCubeSeason.name_to_year(f"IC{values['ic_strings']}")
-                else:
-                    try:
-                        year = int(values["year"])
-                    except KeyError:
-                        year = None
-                # get run
-                try:
-                    run = int(values["run"])
-                except KeyError:
-                    run = 0
-                # get subrun
-                try:
-                    subrun = int(values["subrun"])
-                except KeyError:
-                    subrun = 0
-                # get part
-                try:
-                    part = int(values["part"])
-                except KeyError:
-                    part = 0
-
-                return year, run, subrun, part
+        found = filename_matching.get_matcher(patterns).match(filename)
+        if found:
+            return filename_patterns.to_year_run_subrun_part(found[1].groupdict())
 
         # fall-through
         raise ValueError(f"Filename does not match any pattern, {filename}.")
@@ -121,7 +102,7 @@ class DataExpI3FileMetadata(I3FileMetadata):
         # Ex: Level2_IC86.2017_data_Run00130484_0101_71_375_GCD.i3.zst
         # Ex: Level2_IC86.2017_data_Run00130567_Subrun00000000_00000280.i3.zst
         # Ex: Run00125791_GapsTxt.tar
-        match = re.match(r".*Run(?P<run>\d+)", filename)
+        match = _RUN_NUMBER.match(filename)
         try:
             run = match.groupdict()["run"]  # type: ignore[union-attr]
             return int(run)
@@ -156,7 +137,7 @@ class DataExpI3FileMetadata(I3FileMetadata):
                 pass
 
         if not create_date:
-            ctime = os.path.getctime(self.file.path)
+            ctime = self.file.stat().st_ctime
             create_date = date.fromtimestamp(ctime).isoformat()
 
         return start_dt, end_dt, create_date, software
@@ -197,7 +178,9 @@ class DataExpI3FileMetadata(I3FileMetadata):
         2. Set the '*meta.xml' file as `self.meta_xml`.
         """
         try:
-            with tarfile.open(self.file.path) as tar:
+            with io_policy.open_sequential(
+                self.file.path, buffered=True
+            ) as fileobj, tarfile.open(fileobj=fileobj) as tar:
                 for tar_obj in tar:
                     if ".meta.xml" in tar_obj.name:
                         self.meta_xml = xmltodict.parse(tar.extractfile(tar_obj))
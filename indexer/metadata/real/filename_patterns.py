@@ -1,13 +1,19 @@
 """Regex collections for filename patterns."""
 
 
-from typing import List
+import functools
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from ...utils import utils
 
 try:
     from typing import TypedDict
 except ImportError:
     from typing_extensions import TypedDict
 
+YearRunSubrunPart = Tuple[Optional[int], int, int, int]
+
 
 class _Patterns(TypedDict):
     """Filename patterns for a processing level."""
@@ -132,3 +138,106 @@ PFRaw: _Patterns = {
 }
 
 # --------------------------------------------------------------------------------------
+
+
+# Classification (all processing levels, in one pass) ----------------------------------
+
+
+# in order of precedence
+_LEVELS: List[Tuple[utils.ProcessingLevel, _Patterns]] = [
+    (utils.ProcessingLevel.L2, L2),
+    (utils.ProcessingLevel.PFFilt, PFFilt),
+    (utils.ProcessingLevel.PFDST, PFDST),
+    (utils.ProcessingLevel.PFRaw, PFRaw),
+]
+
+
+def _combine() -> Pattern[str]:
+    """Combine every level's base pattern & patterns into one regex.
+
+    Each level is `(?=<base pattern>)(?:<pattern 0>|<pattern 1>|...|<empty>)`,
+    so the first level whose base pattern matches is the only level tried;
+    then, its first matching pattern wins, like trying each in turn. The
+    named groups are renamed `<level>_<pattern index>[_<group>]`.
+    """
+    levels = []
+    for level, patterns in _LEVELS:
+        alternatives = []
+        for i, pattern in enumerate(patterns["patterns"]):
+            name = f"{level.value}_{i}"
+            pattern = re.sub(r"\(\?P<(\w+)>", rf"(?P<{name}_\1>", pattern)
+            alternatives.append(f"(?P<{name}>{pattern})")
+        alternatives.append(f"(?P<{level.value}>)")  # base pattern only
+        levels.append(f"(?={patterns['base_pattern']})(?:{'|'.join(alternatives)})")
+    return re.compile("|".join(levels))
+
+
+_COMBINED: Optional[Pattern[str]] = None
+
+
+def to_year_run_subrun_part(values: Dict[str, Optional[str]]) -> YearRunSubrunPart:
+    r"""Return the year, run, subrun, and part from a match's named groups.
+
+    Uses named groups: `year`, `run`, `subrun`, and `part`.
+    - Only a `run` group is required in the filename/regex pattern.
+    - Optionally include `ic_strings` group (\d+), instead of `year` group.
+    """
+    # get year
+    if "ic_strings" in values:
+        year = utils.IceCubeSeason.name_to_year(f"IC{values['ic_strings']}")
+    else:
+        try:
+            year = int(values["year"])  # type: ignore[arg-type]
+        except KeyError:
+            year = None
+    # get run
+    try:
+        run = int(values["run"])  # type: ignore[arg-type]
+    except KeyError:
+        run = 0
+    # get subrun
+    try:
+        subrun = int(values["subrun"])  # type: ignore[arg-type]
+    except KeyError:
+        subrun = 0
+    # get part
+    try:
+        part = int(values["part"])  # type: ignore[arg-type]
+    except KeyError:
+        part = 0
+
+    return year, run, subrun, part
+
+
+@functools.lru_cache(maxsize=1024)
+def classify(
+    filename: str,
+) -> Tuple[Optional[utils.ProcessingLevel], Optional[YearRunSubrunPart]]:
+    """Return the /data/exp/ file's processing level, and its year, run,
+    subrun, and part.
+
+    Same as the first level whose `base_pattern` matches, then that
+    level's first matching pattern. The level is `None` if no base pattern
+    matches; the year, run, subrun, & part are `None` if none of the
+    level's patterns match.
+    """
+    global _COMBINED  # pylint: disable=W0603
+    if not _COMBINED:
+        _COMBINED = _combine()
+
+    match = _COMBINED.match(filename)
+    if not match or not match.lastgroup:
+        return None, None
+
+    level_value, _, index = match.lastgroup.partition("_")
+    level = utils.ProcessingLevel(level_value)
+    if not index:
+        return level, None
+
+    prefix = f"{match.lastgroup}_"
+    values = {
+        name[len(prefix) :]: value
+        for name, value in match.groupdict().items()
+        if name.startswith(prefix)
+    }
+    return level, to_year_run_subrun_part(values)
@@ -0,0 +1,144 @@
+"""Tools for L2 gaps files, which are bundled per run in `*_GapsTxt.tar` files.
+
+A gaps file is flat YAML:
+
+    Run: 131410
+    First Event of File: 51425386 2018 200268759114415278
+    Last Event of File: 51724697 2018 200269929683097355
+    File Livetime: 117.06
+"""
+
+
+import logging
+import re
+import tarfile
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple, Union
+
+import yaml
+
+from ...utils import io_policy
+
+# A `key: value` line whose key & value resolve exactly as YAML (1.1) would;
+# anything else (Ex: comments, "0123" (octal), dates, quotes, indentation)
+# is left for the YAML loader.
+_LINE = re.compile(
+    r"(?P<key>[A-Za-z][A-Za-z0-9_]*(?: [A-Za-z0-9_]+)*): +"
+    r"(?:(?P<int>[-+]?(?:0|[1-9][0-9]*))"
+    r"|(?P<float>[-+]?[0-9]+\.[0-9]*)"
+    r"|(?P<numbers>[0-9]+(?: +[0-9]+)+)"
+    r"|(?P<str>[A-Za-z][A-Za-z0-9_.]*(?: +[A-Za-z0-9_.]+)*)) *"
+)
+# single words YAML resolves to bools or null
+_YAML_WORDS = re.compile(
+    r"yes|Yes|YES|no|No|NO|true|True|TRUE|false|False|FALSE"
+    r"|on|On|ON|off|Off|OFF|null|Null|NULL"
+)
+
+
+def _fast_parse(text: str) -> Optional[Dict[str, Any]]:
+    """Parse flat `key: value` lines, or return `None` if it's not that simple."""
+    gaps: Dict[str, Any] = {}
+    for line in text.split("\n"):
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line:
+            continue
+        match = _LINE.fullmatch(line)
+        if not match or _YAML_WORDS.fullmatch(match["key"]):
+            return None
+        if match["int"]:
+            gaps[match["key"]] = int(match["int"])
+        elif match["float"]:
+            gaps[match["key"]] = float(match["float"])
+        elif match["numbers"]:
+            gaps[match["key"]] = match["numbers"]
+        elif _YAML_WORDS.fullmatch(match["str"]):
+            return None
+        else:
+            gaps[match["key"]] = match["str"]
+    return gaps or None
+
+
+def parse_gaps(data: Union[bytes, str]) -> Any:
+    """Parse the gaps file's content, same as `yaml.safe_load()`.
+
+    Use a fast parser for the (typical) flat `key: value` file, otherwise
+    fall back to YAML.
+    """
+    try:
+        text = data.decode() if isinstance(data, bytes) else data
+    except UnicodeDecodeError:
+        text = ""
+    gaps = _fast_parse(text) if text else None
+    if gaps is None:
+        logging.debug("Not a simple gaps file, parsing as YAML.")
+        return yaml.safe_load(data)
+    return gaps
+
+
+def _name_to_key(member_name: str) -> str:
+    # Ex. Level2_IC86.2017_data_Run00130484_Subrun00000000_00000188_gaps.txt
+    return member_name.split("_gaps.txt")[0]
+
+
+class GapsFiles(Mapping[str, Dict[str, Any]]):
+    """Gaps-file dicts, by their i3 file's name w/o extension.
+
+    Gaps tarballs are only indexed up front (member name -> data offset &
+    size); a gaps file is read & parsed when it's looked up.
+    """
+
+    def __init__(self) -> None:
+        # {key: (tar path, member data offset, member size)}
+        self._members: Dict[str, Tuple[str, int, int]] = {}
+        self._parsed: Dict[str, Dict[str, Any]] = {}
+
+    def index_tar(self, tar_path: str) -> None:
+        """Index the gaps tarball's members.
+
+        A compressed tarball can't be read by offset, so it's parsed now.
+
+        Raises:
+            tarfile.ReadError -- if the file is not a tarball
+        """
+        with io_policy.open_sequential(tar_path, buffered=True) as fileobj:
+            try:
+                with tarfile.open(fileobj=fileobj, mode="r:") as tar:
+                    for member in tar:
+                        if member.isfile():
+                            key = _name_to_key(member.name)
+                            self._members[key] = (
+                                tar_path,
+                                member.offset_data,
+                                member.size,
+                            )
+                            self._parsed.pop(key, None)
+                return
+            except tarfile.ReadError:
+                fileobj.seek(0)
+
+            with tarfile.open(fileobj=fileobj, mode="r:*") as tar:
+                for member in tar:
+                    iobytes = tar.extractfile(member)
+                    if not iobytes:
+                        continue
+                    key = _name_to_key(member.name)
+                    self._parsed[key] = parse_gaps(iobytes.read())
+                    self._members.pop(key, None)
+                    logging.debug(f"Grabbed gaps file for '{key}', {tar_path}.")
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        if key not in self._parsed:
+            tar_path, offset, size = self._members[key]  # raises KeyError
+            with open(tar_path, "rb") as file:
+                file.seek(offset)
+                self._parsed[key] = parse_gaps(file.read(size))
+            logging.debug(f"Grabbed gaps file for '{key}', {tar_path}.")
+        return self._parsed[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._parsed
+        yield from (k for k in self._members if k not in self._parsed)
+
+    def __len__(self) -> int:
+        return len(self._parsed.keys() | self._members.keys())
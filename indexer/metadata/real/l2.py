@@ -3,11 +3,11 @@
 
 import datetime
 import re
-from typing import Any, cast, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from file_catalog.schema import types
 
-from ...utils import utils
+from ...utils import i3_time, utils
 from . import filename_patterns
 from .data_exp import DataExpI3FileMetadata
 
@@ -16,6 +16,8 @@ try:
 except ImportError:
     from typing_extensions import Final  # type: ignore[misc]
 
+_BASE_PATTERN = re.compile(filename_patterns.L2["base_pattern"])
+
 
 class L2FileMetadata(DataExpI3FileMetadata):
     """Metadata for L2 i3 files."""
@@ -29,9 +31,14 @@ class L2FileMetadata(DataExpI3FileMetadata):
         dir_meta_xml: Dict[str, Any],
         gaps_dict: Dict[str, Any],
         gcd_filepath: str,
+        year_run_subrun_part: Optional[filename_patterns.YearRunSubrunPart] = None,
     ):
         super().__init__(
-            file, site, utils.ProcessingLevel.L2, L2FileMetadata.FILENAME_PATTERNS
+            file,
+            site,
+            utils.ProcessingLevel.L2,
+            L2FileMetadata.FILENAME_PATTERNS,
+            year_run_subrun_part,
         )
         self.meta_xml = dir_meta_xml
         self.gaps_dict = gaps_dict
@@ -40,10 +47,7 @@ class L2FileMetadata(DataExpI3FileMetadata):
     @staticmethod
     def _i3time_to_datetime(year: int, daq_time: int) -> datetime.datetime:
         """Convert `I3Time` to `datetime.datetime`."""
-        from icecube import dataclasses  # type: ignore[import]  # pylint: disable=E0401,C0415
-
-        i3_dt = dataclasses.I3Time(year, daq_time).date_time
-        return cast(datetime.datetime, i3_dt)
+        return i3_time.daq_time_to_datetime(year, daq_time)
 
     def _parse_gaps_dict(
         self,
@@ -128,4 +132,4 @@ class L2FileMetadata(DataExpI3FileMetadata):
         Check if `filename` matches the base filename pattern for L2
         files.
         """
-        return bool(re.match(filename_patterns.L2["base_pattern"], filename))
+        return bool(_BASE_PATTERN.match(filename))
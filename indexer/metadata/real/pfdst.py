@@ -2,7 +2,7 @@
 
 
 import re
-from typing import List
+from typing import List, Optional
 
 from ...utils import utils
 from . import filename_patterns
@@ -13,15 +13,26 @@ try:
 except ImportError:
     from typing_extensions import Final  # type: ignore[misc]
 
+_BASE_PATTERN = re.compile(filename_patterns.PFDST["base_pattern"])
+
 
 class PFDSTFileMetadata(DataExpI3FileMetadata):
     """Metadata for PFDST i3 files."""
 
     FILENAME_PATTERNS: Final[List[str]] = filename_patterns.PFDST["patterns"]
 
-    def __init__(self, file: utils.FileInfo, site: str):
+    def __init__(
+        self,
+        file: utils.FileInfo,
+        site: str,
+        year_run_subrun_part: Optional[filename_patterns.YearRunSubrunPart] = None,
+    ):
         super().__init__(
-            file, site, utils.ProcessingLevel.PFDST, PFDSTFileMetadata.FILENAME_PATTERNS
+            file,
+            site,
+            utils.ProcessingLevel.PFDST,
+            PFDSTFileMetadata.FILENAME_PATTERNS,
+            year_run_subrun_part,
         )
         self._grab_meta_xml_from_tar()
 
@@ -32,4 +43,4 @@ class PFDSTFileMetadata(DataExpI3FileMetadata):
         Check if `filename` matches the base filename pattern for PFDST
         files.
         """
-        return bool(re.match(filename_patterns.PFDST["base_pattern"], filename))
+        return bool(_BASE_PATTERN.match(filename))
@@ -2,14 +2,14 @@
 
 
 import logging
-import re
-from typing import Dict, List, Optional, Pattern, Tuple
+from typing import Dict, List, Optional, Pattern, Tuple, Union
 
 from file_catalog.schema import types
 
-from ...utils import utils
+from ...utils import filename_matching, utils
 from ..i3 import I3FileMetadata
 from .iceprod_tools import (
+    AsyncIceProd,
     DatasetNotFound,
     IceProdConnection,
     SteeringParameters,
@@ -24,8 +24,9 @@ class DataSimI3FileMetadata(I3FileMetadata):
         self,
         file: utils.FileInfo,
         site: str,
-        regexes: List[Pattern[str]],
+        regexes: Union[filename_matching.PatternMatcher, List[Pattern[str]]],
         iceprod_conn: IceProdConnection,
+        async_iceprod: Optional[AsyncIceProd] = None,
     ):
         super().__init__(
             file,
@@ -34,6 +35,7 @@ class DataSimI3FileMetadata(I3FileMetadata):
             "simulation",
         )
         self.iceprod_conn = iceprod_conn
+        self.async_iceprod = async_iceprod
         try:
             (
                 self.iceprod_dataset_num,
@@ -81,29 +83,28 @@ class DataSimI3FileMetadata(I3FileMetadata):
 
     @staticmethod
     def parse_iceprod_dataset_job_ids(
-        regexes: List[Pattern[str]], file: utils.FileInfo
+        regexes: Union[filename_matching.PatternMatcher, List[Pattern[str]]],
+        file: utils.FileInfo,
+        count_hit: bool = True,
     ) -> Tuple[Optional[int], Optional[int]]:
         """Return the iceprod dataset_num and job_index, via `regexes`.
 
-        Uses named groups: `alpha` & `beta`; or `single`.
+        The first matching pattern (in order) is used. Uses named groups:
+        `alpha` & `beta`; or `single`.
         """
-        for pattern in regexes:
-            match = re.match(pattern, file.name)
-            if not match:
-                continue
-
-            values = match.groupdict()
-            # pattern w/ no groups
-            if not values:
-                return None, None
-            # pattern w/ 'single' group
-            if "single" in values:
-                return int(values["single"]), None
-            # pattern w/ 'alpha' & 'beta' groups
-            return int(values["alpha"]), int(values["beta"])
-
-        # fall-through
-        raise ValueError(f"Filename does not match any pattern, {file.path}.")
+        found = filename_matching.get_matcher(regexes).match(file.name, count_hit)
+        if not found:
+            raise ValueError(f"Filename does not match any pattern, {file.path}.")
+
+        values = found[1].groupdict()
+        # pattern w/ no groups
+        if not values:
+            return None, None
+        # pattern w/ 'single' group
+        if "single" in values:
+            return int(values["single"]), None
+        # pattern w/ 'alpha' & 'beta' groups
+        return int(values["alpha"]), int(values["beta"])
 
     @staticmethod
     def get_simulation_metadata(  # pylint: disable=R0912
@@ -231,19 +232,53 @@ class DataSimI3FileMetadata(I3FileMetadata):
 
         # get IceProd dataset steering parameters and IceProdMetadata
         try:
-            steering_parameters, ip_metadata = get_steering_params_and_ip_metadata(
+            iceprod = get_steering_params_and_ip_metadata(
                 self.iceprod_dataset_num,
                 self.file.path,
                 self.iceprod_job_index,
                 self.iceprod_conn,
             )
+        except DatasetNotFound:
+            iceprod = None
+
+        return self._add_iceprod_metadata(metadata, iceprod)
 
+    async def generate_async(self) -> types.Metadata:
+        """Gather the file's metadata, querying IceProd while the file is read."""
+        if not self.async_iceprod:
+            return self.generate()
+
+        future = self.async_iceprod.submit(
+            self.iceprod_dataset_num, self.file.path, self.iceprod_job_index
+        )
+        try:
+            metadata = super().generate()  # blocks the event loop, not the query
+        except BaseException:
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            raise
+
+        try:
+            iceprod: Optional[
+                Tuple[SteeringParameters, types.IceProdMetadata]
+            ] = await future
         except DatasetNotFound:
+            iceprod = None
+
+        return self._add_iceprod_metadata(metadata, iceprod)
+
+    def _add_iceprod_metadata(
+        self,
+        metadata: types.Metadata,
+        iceprod: Optional[Tuple[SteeringParameters, types.IceProdMetadata]],
+    ) -> types.Metadata:
+        """Add the IceProd & simulation metadata, if the dataset was found."""
+        if not iceprod:
             logging.warning(
                 f"Dataset {self.iceprod_dataset_num} not found. "
                 f"No IceProd/Simulation metadata recorded for {self.file.path}."
             )
             return metadata
+        steering_parameters, ip_metadata = iceprod
 
         # override self.iceprod_dataset_num w/ iceprod_tool's?
         if ip_metadata["dataset"] != self.iceprod_dataset_num:
@@ -5,9 +5,30 @@ Based on https://github.com/WIPACrepo/iceprod/blob/master/resources/get_file_inf
 
 # pylint: disable=R0903
 
+import asyncio
+import concurrent.futures
+import contextlib
+import copy
 import functools
+import itertools
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+import os
+import threading
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import pymysql
 from file_catalog.schema import types
@@ -16,10 +37,13 @@ from iceprod.core.parser import ExpParser  # type: ignore[import]
 from iceprod.core.serialization import dict_to_dataclasses  # type: ignore[import]
 from rest_tools.client import RestClient  # type: ignore[import]
 
+from ...utils import query_cache
+from . import outfile_templates
+
 try:
-    from typing import TypedDict
+    from typing import Final, TypedDict
 except ImportError:
-    from typing_extensions import TypedDict
+    from typing_extensions import Final, TypedDict  # type: ignore[misc]
 
 
 # --------------------------------------------------------------------------------------
@@ -28,6 +52,20 @@ except ImportError:
 _ICEPROD_V2_DATASET_RANGE = range(20000, 30000)
 _ICEPROD_V1_DATASET_RANGE = range(0, 20000)
 
+ICEPROD1_POOL_SIZE: Final[int] = 2  # idle IceProd v1 DB connections kept
+ICEPROD1_BATCH_SIZE: Final[int] = 1000  # dataset ids per batched query
+ICEPROD_HOST_CONCURRENCY: Final[int] = 4  # concurrent queries per IceProd host
+
+# seconds each kind of query result is cached, see `IceProdConnection`
+ICEPROD_CACHE_TTLS: Final[Dict[str, float]] = {
+    "iceprod1_steering_params": 7 * 24 * 60 * 60,  # IceProd v1 is retired
+    "iceprod2_datasets": 60 * 60,  # new datasets are added
+    "iceprod2_job_config": 24 * 60 * 60,
+    "iceprod2_tasks": 24 * 60 * 60,
+    "iceprod2_task_index": 24 * 60 * 60,
+    query_cache.NEGATIVE: 10 * 60,  # Ex: `DatasetNotFound`
+}
+
 _HTML_TAGS = []
 for tag in ["b", "strong", "i", "em", "mark", "small", "del", "ins", "sub", "sup"]:
     _HTML_TAGS.extend([f"<{tag}>", f"</{tag}>"])
@@ -38,6 +76,8 @@ for tag in ["b", "strong", "i", "em", "mark", "small", "del", "ins", "sub", "sup
 
 SteeringParameters = Dict[str, Union[str, float, int]]
 
+T = TypeVar("T")
+
 
 class _OutFileData(TypedDict):
     url: str
@@ -57,6 +97,16 @@ class _IP2RESTDatasetTask(TypedDict):
     job_id: str
 
 
+class _IP2Task:
+    """A task's ids, in a dataset's task index."""
+
+    __slots__ = ("task_id", "job_id")
+
+    def __init__(self, task_id: str, job_id: str):
+        self.task_id = task_id
+        self.job_id = job_id
+
+
 class DatasetNotFound(Exception):
     """Raise when an IceProd dataset cannot be found."""
 
@@ -70,18 +120,64 @@ class TaskNotFound(Exception):
 
 
 class IceProdConnection:
-    """Interface for connecting to IceProd v1 and v2."""
-
-    def __init__(self, iceprodv1_pass: str, iceprodv2_token: str):
-        if not iceprodv1_pass:
+    """Interface for connecting to IceProd v1 and v2.
+
+    Optionally, query results are also cached in a SQLite database file
+    (`cache_path`), shared by jobs, for `ICEPROD_CACHE_TTLS`. With
+    `stale_while_revalidate`, a result up to that many seconds past its TTL
+    is used while it's re-queried in the background.
+
+    Or, with `bundle_path`, every query is answered from an offline bundle
+    (see `resources/make_iceprod_bundle.py`), w/o connecting to IceProd.
+
+    IceProd v1 DB connections are pooled, per process. Concurrent queries
+    (Ex: from `AsyncIceProd`'s threads) are bounded per IceProd host.
+
+    With `bulk_tasks`, each IceProd v2 dataset's tasks are requested all at
+    once, then looked up locally, instead of requested per job.
+    """
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        iceprodv1_pass: str,
+        iceprodv2_token: str,
+        cache_path: str = "",
+        stale_while_revalidate: float = 0,
+        bundle_path: str = "",
+        bulk_tasks: bool = False,
+    ):
+        self.bulk_tasks = bulk_tasks
+        self.bundle: Optional[query_cache.QueryBundle] = None
+        if bundle_path:
+            self.bundle = query_cache.QueryBundle(bundle_path)
+        elif not iceprodv1_pass:
             raise RuntimeError("Missing IceProd v1 DB password")
         elif not iceprodv2_token:
             raise RuntimeError("Missing IceProd v2 REST token")
 
         self._iceprodv1_pass = iceprodv1_pass
-        self._iceprodv2_rc = RestClient(
-            "https://iceprod2-api.icecube.wisc.edu", iceprodv2_token
-        )
+        self._iceprodv2_token = iceprodv2_token
+        # a `RestClient` isn't thread-safe (its session), so one per thread
+        self._iceprodv2_local = threading.local()
+        self._iceprodv1_pool: List[pymysql.connections.Connection] = []
+        self._iceprodv1_pool_pid = os.getpid()
+        self._iceprodv1_pool_lock = threading.Lock()
+        self._iceprodv1_slots = threading.BoundedSemaphore(ICEPROD_HOST_CONCURRENCY)
+        self._iceprodv2_slots = threading.BoundedSemaphore(ICEPROD_HOST_CONCURRENCY)
+        # {dataset num: steering params}, see `prefetch_iceprod1_steering_params()`
+        # -- each is dropped once looked up
+        self.iceprod1_prefetched: Dict[int, List[Dict[str, Any]]] = {}
+        self.iceprod1_looked_up: Set[int] = set()  # at most the v1 dataset range
+
+        if not cache_path or self.bundle:
+            self.cache: Optional[query_cache.QueryCache] = None
+        else:
+            self.cache = query_cache.QueryCache(
+                cache_path,
+                ICEPROD_CACHE_TTLS,
+                negative_exceptions=(DatasetNotFound,),
+                stale_while_revalidate=stale_while_revalidate,
+            )
 
     def get_iceprodv1_db(self) -> pymysql.connections.Connection:
         """Get a pymsql connection instance for querying the IceProd v1 DB."""
@@ -92,9 +188,87 @@ class IceProdConnection:
             db="i3simprod",
         )
 
+    def _checkout_iceprodv1_db(self) -> pymysql.connections.Connection:
+        with self._iceprodv1_pool_lock:
+            if self._iceprodv1_pool_pid != os.getpid():  # can't share across a fork
+                self._iceprodv1_pool = []
+                self._iceprodv1_pool_pid = os.getpid()
+            conn = self._iceprodv1_pool.pop() if self._iceprodv1_pool else None
+
+        if conn:
+            try:
+                conn.ping(reconnect=True)
+                return conn
+            except pymysql.Error as e:
+                logging.debug(f"Dropping pooled IceProd v1 DB connection: {e}")
+        return self.get_iceprodv1_db()
+
+    def _checkin_iceprodv1_db(self, conn: pymysql.connections.Connection) -> None:
+        with self._iceprodv1_pool_lock:
+            if (
+                self._iceprodv1_pool_pid == os.getpid()
+                and len(self._iceprodv1_pool) < ICEPROD1_POOL_SIZE
+            ):
+                self._iceprodv1_pool.append(conn)
+                return
+        conn.close()
+
+    @contextlib.contextmanager
+    def iceprodv1_cursor(self) -> Iterator[pymysql.cursors.DictCursor]:
+        """Yield a dict cursor on a pooled IceProd v1 DB connection.
+
+        The connection is returned to the pool after, unless there's an error.
+        """
+        with self._iceprodv1_slots:
+            conn = self._checkout_iceprodv1_db()
+            try:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+                try:
+                    yield cursor
+                finally:
+                    cursor.close()
+            except BaseException:
+                conn.close()
+                raise
+            self._checkin_iceprodv1_db(conn)
+
     def get_iceprodv2_rc(self) -> RestClient:
-        """Get a REST client instance for querying the IceProd v2 DB."""
-        return self._iceprodv2_rc
+        """Get the calling thread's REST client for querying the IceProd v2 DB."""
+        rc: Optional[RestClient] = getattr(self._iceprodv2_local, "rc", None)
+        if not rc:
+            rc = RestClient(
+                "https://iceprod2-api.icecube.wisc.edu", self._iceprodv2_token
+            )
+            self._iceprodv2_local.rc = rc
+        return rc
+
+    def iceprodv2_get(self, *args: Any) -> Any:
+        """GET from the IceProd v2 REST API, Ex: `iceprodv2_get(path, params)`."""
+        with self._iceprodv2_slots:
+            return self.get_iceprodv2_rc().request_seq("GET", *args)
+
+    def query(self, kind: str, key: str, query: Callable[[], T]) -> T:
+        """Return the query's result, via the bundle or cache (if any)."""
+        if self.bundle:
+            try:
+                return cast(T, self.bundle.get(kind, key))
+            except KeyError:
+                raise DatasetNotFound(f"Not in IceProd bundle: {kind}/{key}")
+        if not self.cache:
+            return query()
+        return self.cache.get(kind, key, query)
+
+    def close(self) -> None:
+        """Close the pooled connections, and the bundle or cache, if any."""
+        with self._iceprodv1_pool_lock:
+            if self._iceprodv1_pool_pid == os.getpid():
+                for conn in self._iceprodv1_pool:
+                    conn.close()
+            self._iceprodv1_pool = []
+        if self.bundle:
+            self.bundle.close()
+        if self.cache:
+            self.cache.close()
 
 
 # --------------------------------------------------------------------------------------
@@ -135,30 +309,83 @@ class _IceProdQuerier:
 # IceProd v1
 
 
-@functools.lru_cache()
-def _get_iceprod1_dataset_steering_params(
-    iceprod_conn: IceProdConnection, dataset_num: int
-) -> List[Dict[str, Any]]:
-    logging.debug(
-        f"No cache hit for dataset_num={dataset_num}. Querying IceProd1 DB..."
-    )
-
+def _query_iceprod1_steering_params(
+    iceprod_conn: IceProdConnection, dataset_nums: List[int]
+) -> Dict[int, List[Dict[str, Any]]]:
+    """Query the datasets' steering parameters, all in one query."""
+    placeholders = ", ".join(["%s"] * len(dataset_nums))
     sql = (
         "SELECT * FROM steering_parameter "
-        f"WHERE dataset_id = {dataset_num} "
-        "ORDER by name"
+        f"WHERE dataset_id IN ({placeholders}) "
+        "ORDER BY dataset_id, name"
     )
 
-    conn = iceprod_conn.get_iceprodv1_db()
-    cursor = conn.cursor(pymysql.cursors.DictCursor)
-    cursor.execute(sql)
-    results: List[Dict[str, Any]] = cursor.fetchall()  # type: ignore[assignment]
-    cursor.close()
-    conn.close()
+    with iceprod_conn.iceprodv1_cursor() as cursor:
+        cursor.execute(sql, dataset_nums)
+        rows: List[Dict[str, Any]] = cursor.fetchall()  # type: ignore[assignment]
 
+    results: Dict[int, List[Dict[str, Any]]] = {num: [] for num in dataset_nums}
+    for row in rows:
+        results[int(row["dataset_id"])].append(row)
     return results
 
 
+def prefetch_iceprod1_steering_params(
+    iceprod_conn: IceProdConnection, dataset_nums: Iterable[int]
+) -> None:
+    """Query many IceProd v1 datasets' steering parameters, in batches.
+
+    Ex: for the sim files in a batch of paths. Datasets already cached,
+    prefetched, or looked up (or not IceProd v1) are skipped.
+    """
+    if iceprod_conn.bundle:
+        return
+    todo = sorted(
+        num
+        for num in set(dataset_nums)
+        if num in _ICEPROD_V1_DATASET_RANGE
+        and num not in iceprod_conn.iceprod1_prefetched
+        and num not in iceprod_conn.iceprod1_looked_up
+        and not (
+            iceprod_conn.cache
+            and iceprod_conn.cache.is_fresh("iceprod1_steering_params", str(num))
+        )
+    )
+    for i in range(0, len(todo), ICEPROD1_BATCH_SIZE):
+        batch = todo[i : i + ICEPROD1_BATCH_SIZE]
+        logging.debug(f"Prefetching IceProd1 steering parameters for {batch}...")
+        iceprod_conn.iceprod1_prefetched.update(
+            _query_iceprod1_steering_params(iceprod_conn, batch)
+        )
+
+
+@functools.lru_cache()
+def _get_iceprod1_dataset_steering_params(
+    iceprod_conn: IceProdConnection, dataset_num: int
+) -> List[Dict[str, Any]]:
+    def query() -> List[Dict[str, Any]]:
+        results = iceprod_conn.iceprod1_prefetched.get(dataset_num)
+        if results is None:
+            logging.debug(
+                f"No cache hit for dataset_num={dataset_num}. Querying IceProd1 DB..."
+            )
+            results = _query_iceprod1_steering_params(iceprod_conn, [dataset_num])[
+                dataset_num
+            ]
+
+        if not results:
+            raise DatasetNotFound()  # cached for a shorter TTL
+        return results
+
+    try:
+        return iceprod_conn.query("iceprod1_steering_params", str(dataset_num), query)
+    except DatasetNotFound:
+        return []
+    finally:  # now, it's in the `lru_cache` (& the query cache, if any)
+        iceprod_conn.iceprod1_prefetched.pop(dataset_num, None)
+        iceprod_conn.iceprod1_looked_up.add(dataset_num)
+
+
 class _IceProdV1Querier(_IceProdQuerier):
     """Manage IceProd v1 queries."""
 
@@ -216,11 +443,17 @@ def _get_all_iceprod2_datasets(
     iceprod_conn: IceProdConnection,
 ) -> Dict[int, _IP2RESTDataset]:
     """Return dict of datasets keyed by their dataset num."""
-    logging.debug("No cache hit for all datasets. Requesting IceProd2...")
 
-    datasets = iceprod_conn.get_iceprodv2_rc().request_seq(
-        "GET", "/datasets?keys=dataset_id|dataset|jobs_submitted"
-    )
+    def query() -> Dict[str, Dict[str, Any]]:
+        logging.debug("No cache hit for all datasets. Requesting IceProd2...")
+        return cast(
+            Dict[str, Dict[str, Any]],
+            iceprod_conn.iceprodv2_get(
+                "/datasets?keys=dataset_id|dataset|jobs_submitted"
+            ),
+        )
+
+    datasets = iceprod_conn.query("iceprod2_datasets", "", query)
 
     ret: Dict[int, _IP2RESTDataset] = {}
     for info in datasets.values():
@@ -236,9 +469,16 @@ def _get_all_iceprod2_datasets(
 def _get_iceprod2_dataset_job_config(
     iceprod_conn: IceProdConnection, dataset_id: str
 ) -> dataclasses.Job:
-    logging.debug(f"No cache hit for dataset_id={dataset_id}. Requesting IceProd2...")
+    def query() -> Dict[str, Any]:
+        logging.debug(
+            f"No cache hit for dataset_id={dataset_id}. Requesting IceProd2..."
+        )
+        return cast(
+            Dict[str, Any],
+            iceprod_conn.iceprodv2_get(f"/config/{dataset_id}"),
+        )
 
-    ret = iceprod_conn.get_iceprodv2_rc().request_seq("GET", f"/config/{dataset_id}")
+    ret = iceprod_conn.query("iceprod2_job_config", dataset_id, query)
     job_config = dict_to_dataclasses(ret)
 
     if not job_config["steering"]:  # dataclasses.Job sets "steering" to None by default
@@ -253,22 +493,102 @@ def _get_iceprod2_dataset_job_config(
 def _get_iceprod2_dataset_tasks(
     iceprod_conn: IceProdConnection, dataset_id: str, job_index: int
 ) -> Dict[str, _IP2RESTDatasetTask]:
-    logging.debug(
-        f"No cache hit for dataset_id={dataset_id}, job_index={job_index}. "
-        "Requesting IceProd2..."
-    )
+    def query() -> Dict[str, _IP2RESTDatasetTask]:
+        logging.debug(
+            f"No cache hit for dataset_id={dataset_id}, job_index={job_index}. "
+            "Requesting IceProd2..."
+        )
+        return cast(
+            Dict[str, _IP2RESTDatasetTask],
+            iceprod_conn.iceprodv2_get(
+                f"/datasets/{dataset_id}/tasks",
+                {"job_index": job_index, "keys": "name|task_id|job_id|task_index"},
+            ),
+        )
 
-    ret = iceprod_conn.get_iceprodv2_rc().request_seq(
-        "GET",
-        f"/datasets/{dataset_id}/tasks",
-        {"job_index": job_index, "keys": "name|task_id|job_id|task_index"},
-    )
+    ret = iceprod_conn.query("iceprod2_tasks", f"{dataset_id}/{job_index}", query)
 
     task_dicts: Dict[str, _IP2RESTDatasetTask] = {t["name"]: t for t in ret.values()}
 
     return task_dicts
 
 
+# {dataset_id: lock}, so concurrent files don't each request the dataset's tasks
+_TASK_INDEX_LOCKS: Dict[str, threading.Lock] = {}
+_TASK_INDEX_LOCKS_LOCK = threading.Lock()
+
+
+def _get_task_index_lock(dataset_id: str) -> threading.Lock:
+    with _TASK_INDEX_LOCKS_LOCK:
+        return _TASK_INDEX_LOCKS.setdefault(dataset_id, threading.Lock())
+
+
+@functools.lru_cache(maxsize=16)  # each has every task of a dataset
+def _get_iceprod2_dataset_task_index(
+    iceprod_conn: IceProdConnection, dataset_id: str
+) -> Dict[Tuple[int, str], _IP2Task]:
+    """Return every task of the dataset, keyed by job index & task name.
+
+    IceProd's `/datasets/{id}/tasks` isn't paged (it returns every task that
+    matches its filters), so this is one request per dataset--for only the
+    keys needed, to keep the response small. A job that's missing (Ex: its
+    tasks were made after this was cached) is requested on its own, see
+    `_IceProdV2Querier._get_task_info()`.
+    """
+
+    def query() -> List[Tuple[int, str, str, str]]:
+        logging.debug(
+            f"No cache hit for dataset_id={dataset_id}'s tasks. Requesting IceProd2..."
+        )
+        tasks = cast(
+            Dict[str, Dict[str, Any]],
+            iceprod_conn.iceprodv2_get(
+                f"/datasets/{dataset_id}/tasks",
+                {"keys": "name|task_id|job_id|job_index"},
+            ),
+        )
+        # Ex: (job_index, name, task_id, job_id), smaller to cache than dicts
+        return [
+            (int(t["job_index"]), t["name"], t["task_id"], t["job_id"])
+            for t in tasks.values()
+            if t.get("job_index") is not None
+        ]
+
+    rows = iceprod_conn.query("iceprod2_task_index", dataset_id, query)
+
+    return {
+        (job_index, name): _IP2Task(task_id, job_id)
+        for job_index, name, task_id, job_id in rows
+    }
+
+
+@functools.lru_cache()
+def _get_iceprod2_outfile_patterns(
+    iceprod_conn: IceProdConnection,
+    dataset_id: str,
+    dataset_num: int,
+    jobs_submitted: int,
+) -> List[Optional[Pattern[str]]]:
+    """Compile each outfile's URL template into a filepath regex.
+
+    In the same order as `_IceProdV2Querier._get_outfiles()`.
+    """
+    job_config = _get_iceprod2_dataset_job_config(iceprod_conn, dataset_id)
+    options = {
+        **job_config["options"],
+        "dataset": dataset_num,
+        "dataset_id": dataset_id,
+        "jobs_submitted": jobs_submitted,
+    }
+    job_config = {**job_config, "options": options}
+    env = {"parameters": job_config["steering"]["parameters"]}
+
+    return [
+        outfile_templates.compile_path(f_data["url"], job_config, env, f_data["task"])
+        for f_data in _IceProdV2Querier._get_outfiles(job_config)
+    ]
+
+
 class _IceProdV2Querier(_IceProdQuerier):
     """Manage IceProd v2 queries."""
 
@@ -362,9 +682,27 @@ class _IceProdV2Querier(_IceProdQuerier):
             raise TaskNotFound()
 
         logging.debug(f"Grabbing task info ({self.filepath})...")
-        task_dicts = _get_iceprod2_dataset_tasks(
-            self.iceprod_conn, dataset_id, job_index
-        )
+        if self.iceprod_conn.bulk_tasks:
+            try:
+                with _get_task_index_lock(dataset_id):
+                    task_index = _get_iceprod2_dataset_task_index(
+                        self.iceprod_conn, dataset_id
+                    )
+            except DatasetNotFound:  # Ex: not in the bundle, so try the job's tasks
+                pass
+            else:
+                task = task_index.get((job_index, task_name))
+                if task:
+                    return task.task_id, task.job_id
+                # Ex: the index was cached before the job's task existed,
+                # so try the job's tasks
+
+        try:
+            task_dicts = _get_iceprod2_dataset_tasks(
+                self.iceprod_conn, dataset_id, job_index
+            )
+        except DatasetNotFound:  # Ex: not in the bundle
+            raise TaskNotFound()
 
         try:
             return (
@@ -374,6 +712,33 @@ class _IceProdV2Querier(_IceProdQuerier):
         except KeyError:
             raise TaskNotFound()
 
+    def _search_jobs_iters(
+        self,
+        f_data: _OutFileData,
+        pattern: Optional[Pattern[str]],
+        job_search: List[int],
+    ) -> Iterator[Tuple[int, int]]:
+        """Yield each job & iter that could've produced the outfile.
+
+        With the outfile's compiled template, solve for the job & iter first;
+        then, if that's not verified (or there's no solution), fall back to
+        every job & iter--in case the template was compiled wrong.
+        """
+        iter_search = range(f_data["iters"])
+        if pattern:
+            solved = outfile_templates.solve(pattern, self.filepath)
+            if solved:
+                job = solved[outfile_templates.JOB]
+                i = solved[outfile_templates.ITER]
+                if (job is None or job in job_search) and (
+                    i is None or i in iter_search
+                ):
+                    yield from itertools.product(
+                        job_search if job is None else [job],
+                        iter_search if i is None else [i],
+                    )
+        yield from itertools.product(job_search, iter_search)
+
     def _get_outfile_info(
         self, dataset_id: str, job_index: Optional[int], jobs_submitted: int,
     ) -> Tuple[Optional[int], Optional[str], SteeringParameters]:
@@ -384,24 +749,24 @@ class _IceProdV2Querier(_IceProdQuerier):
             job_search = list(range(jobs_submitted))
 
         logging.debug(f"Grabbing dataset job config ({self.filepath})...")
-        job_config = _get_iceprod2_dataset_job_config(self.iceprod_conn, dataset_id,)
-        job_config["options"].update(
-            {
-                "dataset": self.dataset_num,
-                "dataset_id": dataset_id,
-                "jobs_submitted": jobs_submitted,
-            }
-        )
+        cached = _get_iceprod2_dataset_job_config(self.iceprod_conn, dataset_id,)
+        # copy what's modified, so the cached config stays unexpanded for other files
+        job_config = copy.copy(cached)
+        job_config["steering"] = copy.copy(cached["steering"])
+        job_config["steering"]["parameters"] = dict(cached["steering"]["parameters"])
+        job_config["options"] = {
+            **cached["options"],
+            "dataset": self.dataset_num,
+            "dataset_id": dataset_id,
+            "jobs_submitted": jobs_submitted,
+        }
 
         parser = ExpParser()
         env = {"parameters": job_config["steering"]["parameters"]}
 
         def is_filepath_match(f_data: _OutFileData) -> bool:
             url = cast(str, parser.parse(f_data["url"], job_config, env))
-            if "//" not in url:
-                path = url
-            else:
-                path = "/" + url.split("//", 1)[1].split("/", 1)[1]
+            path = outfile_templates.url_path(url)
             logging.debug(
                 f"Looking for outfile ({self.filepath}) "
                 f"({job_config['options']} -> {path})..."
@@ -410,20 +775,25 @@ class _IceProdV2Querier(_IceProdQuerier):
 
         # search each possible file/task from job(s)/iters
         possible_outfiles = _IceProdV2Querier._get_outfiles(job_config)
-        for f_data in reversed(possible_outfiles):
+        patterns = _get_iceprod2_outfile_patterns(
+            self.iceprod_conn, dataset_id, self.dataset_num, jobs_submitted
+        )
+        for f_data, pattern in reversed(list(zip(possible_outfiles, patterns))):
             job_config["options"]["task"] = f_data["task"]
-            # job
-            for job in job_search:
+            for job, i in self._search_jobs_iters(f_data, pattern, job_search):
                 job_config["options"]["job"] = job
-                # iter
-                for i in range(f_data["iters"]):
-                    job_config["options"]["iter"] = i
-                    if is_filepath_match(f_data):
-                        return (
-                            job_config["options"]["job"],
-                            job_config["options"]["task"],
-                            self._expand_steering_parameters(job_config),
+                job_config["options"]["iter"] = i
+                if is_filepath_match(f_data):
+                    if pattern and not outfile_templates.solve(pattern, self.filepath):
+                        logging.warning(
+                            f"Outfile template ({f_data['url']}) was compiled wrong, "
+                            f"its pattern doesn't match {self.filepath}"
                         )
+                    return (
+                        job_config["options"]["job"],
+                        job_config["options"]["task"],
+                        self._expand_steering_parameters(job_config),
+                    )
 
         # cleanup & raise
         logging.warning(f"Outfile ({self.filepath}) could not be matched.")
@@ -493,3 +863,98 @@ def get_steering_params_and_ip_metadata(
     )
 
     return steering_params, ip_metadata
+
+
+# --------------------------------------------------------------------------------------
+# Asyncio interface
+
+
+_AsyncIceProdKey = Tuple[Optional[int], str, Optional[int]]
+
+
+class AsyncIceProd:
+    """Asyncio interface for `get_steering_params_and_ip_metadata()`.
+
+    Each call runs in a worker thread (IceProd's clients block), so the
+    event loop isn't blocked. Concurrent calls for the same file are
+    coalesced ("single-flight"): the first queries IceProd, and the others
+    get its result.
+    """
+
+    def __init__(
+        self,
+        iceprod_conn: IceProdConnection,
+        max_workers: int = 2 * ICEPROD_HOST_CONCURRENCY,
+    ):
+        self.iceprod_conn = iceprod_conn
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="iceprod"
+        )
+        # {(dataset num, filepath, job index): the first caller's future}
+        self._in_flight: Dict[_AsyncIceProdKey, asyncio.Future] = {}
+        # {(dataset num, filepath, job index): its call, started by `prefetch()`}
+        self._prefetched: Dict[_AsyncIceProdKey, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def submit(
+        self, dataset_num: Optional[int], filepath: str, job_index: Optional[int]
+    ) -> "asyncio.Future[Tuple[SteeringParameters, types.IceProdMetadata]]":
+        """Start getting the dataset's steering parameters and `IceProdMetadata`.
+
+        The call is submitted to a worker thread now (unless it's coalesced),
+        so it runs even while the event loop is blocked (Ex: by hashing).
+        If the file was `prefetch()`'d, that call is used instead.
+        """
+        key = (dataset_num, filepath, job_index)  # everything the result depends on
+        prefetched = self._prefetched.pop(key, None)
+        if prefetched:
+            return prefetched
+
+        first = self._in_flight.get(key)
+        if first:
+            self.coalesced += 1
+            return first
+
+        call = functools.partial(
+            get_steering_params_and_ip_metadata,
+            dataset_num,
+            filepath,
+            job_index,
+            self.iceprod_conn,
+        )
+        future = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        self._in_flight[key] = future
+        future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return future
+
+    def prefetch(
+        self, dataset_num: Optional[int], filepath: str, job_index: Optional[int]
+    ) -> None:
+        """Start the file's call now, ahead of its own `submit()`.
+
+        Ex: while the file before it is being hashed.
+        """
+        key = (dataset_num, filepath, job_index)
+        if key in self._prefetched:
+            return
+        future = self.submit(dataset_num, filepath, job_index)
+        # retrieve any error, in case the file is never indexed (Ex: it's skipped)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._prefetched[key] = future
+
+    async def drop_prefetched(self) -> None:
+        """Wait for, then forget, any prefetched calls that weren't used."""
+        futures = list(self._prefetched.values())
+        self._prefetched.clear()
+        if futures:
+            await asyncio.wait(futures)
+
+    async def get_steering_params_and_ip_metadata(
+        self, dataset_num: Optional[int], filepath: str, job_index: Optional[int]
+    ) -> Tuple[SteeringParameters, types.IceProdMetadata]:
+        """Get the dataset's steering parameters and `IceProdMetadata`."""
+        return await self.submit(dataset_num, filepath, job_index)
+
+    def close(self) -> None:
+        """Wait for any in-flight calls, then stop the worker threads."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,235 @@
+"""Reverse-solve IceProd v2 outfile URL templates for the job & iter.
+
+An outfile's URL template (Ex: "$steering(TARGET)/$steering(outfile)") is
+expanded once, with placeholders for `$(job)` & `$(iter)`, then compiled
+into a regex for the outfile's filepath. Matching a filepath then gives
+its job & iter directly, instead of expanding the template for every job
+& iter of the dataset.
+"""
+
+
+import re
+from typing import Any, Dict, Iterator, List, Optional, Pattern, Tuple, cast
+
+from iceprod.core import dataclasses  # type: ignore[import]
+from iceprod.core.parser import ExpParser, GrammarException  # type: ignore[import]
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+JOB: Final[str] = "job"
+ITER: Final[str] = "iter"
+
+# two sets of placeholders, w/ different lengths, to detect length-dependent use
+_PLACEHOLDERS: Final[List[Dict[str, str]]] = [
+    {JOB: "@@job@@", ITER: "@@iter@@"},
+    {JOB: "@@jobjob@@", ITER: "@@iteriter@@"},
+]
+
+_WILDCARD: Final[str] = ".*?"  # for any other job- or iter-dependent expression
+_INT_FORMATTED: Final[str] = r"[ +]*(?P<{}>\d+) *"  # Ex: "%06d" % job, "%-4s" % job
+
+# same as `ExpParser.sprintf_func()`
+_SPRINTF_SPEC = re.compile(r"\%[#0\- +]{0,1}[0-9]*\.{0,1}[0-9]*[csridufegExXo]")
+_PHRASE_START = re.compile(r"\$(\w*)\(")
+
+
+class _Unsupported(Exception):
+    """The template can't be soundly compiled."""
+
+
+def url_path(url: str) -> str:
+    """Return the URL's path (Ex: "gsiftp://host/data/sim/..." -> "/data/sim/...")."""
+    if "//" not in url:
+        return url
+    return "/" + url.split("//", 1)[1].split("/", 1)[1]
+
+
+def _expand(
+    url: str,
+    job_config: dataclasses.Job,
+    env: Dict[str, Any],
+    task: str,
+    placeholders: Dict[str, str],
+) -> str:
+    options = {**job_config["options"], "task": task, **placeholders}
+    expanded = ExpParser().parse(url, {**job_config, "options": options}, env)
+    if not isinstance(expanded, str):
+        raise _Unsupported()
+    return expanded
+
+
+def _split_phrases(text: str) -> Iterator[Tuple[str, Optional[str], str]]:
+    """Yield each literal, and the unexpanded `$name(param)` phrase after it."""
+    while text:
+        start = _PHRASE_START.search(text)
+        if not start:
+            yield text, None, ""
+            return
+        depth = 0
+        for end in range(start.end() - 1, len(text)):
+            depth += {"(": 1, ")": -1}.get(text[end], 0)
+            if not depth:
+                break
+        else:
+            raise _Unsupported()  # unbalanced
+        yield text[: start.start()], start.group(1), text[start.end() : end]
+        text = text[end + 1 :]
+
+
+def _path(expanded: str) -> str:
+    """Like `url_path()`, but w/o splitting on a "//" in an unexpanded phrase.
+
+    Ex: "$eval($(job)//1000*1000)"
+    """
+    first = _PHRASE_START.search(expanded)
+    prefix = expanded[: first.start()] if first else expanded
+    if "//" not in prefix:
+        if "//" in "".join(literal for literal, _, _ in _split_phrases(expanded)):
+            raise _Unsupported()
+        return expanded
+    slash = prefix.find("/", prefix.index("//") + 2)
+    if slash < 0:
+        raise _Unsupported()  # the host isn't fully expanded
+    return expanded[slash:]
+
+
+def _split_args(param: str) -> List[str]:
+    """Split on the commas that aren't in a nested phrase."""
+    args, depth, arg = [], 0, ""
+    for char in param:
+        if char == "," and not depth:
+            args.append(arg)
+            arg = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        arg += char
+    return args + [arg]
+
+
+class _Compiler:
+    """Compile an expanded template (w/ placeholders) into a regex."""
+
+    def __init__(self, placeholders: Dict[str, str]):
+        self.placeholders = placeholders
+        self.groups = 0
+
+    def _group(self, var: str) -> str:
+        self.groups += 1
+        return f"{var}_{self.groups}"
+
+    def _has_placeholder(self, text: str) -> bool:
+        return any(p in text for p in self.placeholders.values())
+
+    def _placeholder_var(self, text: str) -> Optional[str]:
+        for var, placeholder in self.placeholders.items():
+            if text.strip() == placeholder:
+                return var
+        return None
+
+    def literal(self, text: str) -> str:
+        """Compile a literal, which may have placeholders."""
+        split = re.split(
+            "(" + "|".join(re.escape(p) for p in self.placeholders.values()) + ")",
+            text,
+        )
+        regex = ""
+        for i, part in enumerate(split):
+            if i % 2:  # a placeholder, Ex: "$(job)" -> "982"
+                var = cast(str, self._placeholder_var(part))
+                regex += rf"(?P<{self._group(var)}>\d+)"
+            else:
+                regex += re.escape(part)
+        return regex
+
+    def sprintf(self, param: str) -> str:
+        """Compile an unexpanded `$sprintf(param)` w/ placeholder argument(s)."""
+        quote = param[:1]
+        if quote in "'\"":
+            end = param.find(quote, 1)
+            fmt = param[1:end]
+            args = _split_args(param[end + 1 :])[1:]
+        else:
+            fmt, *args = _split_args(param)
+        specs = _SPRINTF_SPEC.findall(fmt)
+        if "%%" in fmt or len(specs) != len(args):
+            raise _Unsupported()
+
+        literals = _SPRINTF_SPEC.split(fmt)
+        regex = re.escape(literals[0])
+        for spec, arg, literal in zip(specs, args, literals[1:]):
+            var = self._placeholder_var(arg)
+            if var and spec[-1] in "dius":
+                regex += _INT_FORMATTED.format(self._group(var))
+            elif self._has_placeholder(arg):
+                regex += _WILDCARD
+            else:  # a constant
+                try:
+                    regex += re.escape(ExpParser().sprintf_func(f"'{spec}',{arg}"))
+                except GrammarException as e:
+                    raise _Unsupported() from e
+            regex += re.escape(literal)
+        return regex
+
+    def compile(self, text: str) -> str:
+        """Compile the expanded template."""
+        if "[" in text and self._has_placeholder(text):
+            raise _Unsupported()  # a lookup w/ the job or iter
+
+        regex = ""
+        for literal, name, param in _split_phrases(text):
+            regex += self.literal(literal)
+            if name is None:
+                continue
+            if not self._has_placeholder(param):  # also unexpanded w/o placeholders
+                regex += re.escape(f"${name}({param})")
+            elif name == "sprintf":
+                regex += self.sprintf(param)
+            else:  # Ex: "$eval($(job)//1000*1000)"
+                regex += _WILDCARD
+        return regex
+
+
+def compile_path(
+    url: str, job_config: dataclasses.Job, env: Dict[str, Any], task: str
+) -> Optional[Pattern[str]]:
+    """Return a regex for the outfile's filepath, w/ groups for its job & iter.
+
+    Return `None` if the template can't be soundly compiled, Ex: the job is
+    used in a lookup.
+    """
+    regexes = []
+    try:
+        for placeholders in _PLACEHOLDERS:
+            expanded = _expand(url, job_config, env, task, placeholders)
+            regexes.append(_Compiler(placeholders).compile(_path(expanded)))
+    except (_Unsupported, GrammarException, IndexError, ValueError):
+        return None
+
+    if regexes[0] != regexes[1]:  # Ex: "$len($(job))"
+        return None
+    return re.compile(regexes[0])
+
+
+def solve(pattern: Pattern[str], filepath: str) -> Optional[Dict[str, Optional[int]]]:
+    """Return the filepath's job & iter, or `None` if it's not the outfile's.
+
+    A job/iter is `None` if it's not in the template or is ambiguous--Ex: it
+    was formatted twice, and the two parsed values disagree.
+    """
+    match = pattern.fullmatch(filepath)
+    if not match:
+        return None
+
+    solved: Dict[str, Optional[int]] = {}
+    for var in [JOB, ITER]:
+        values = {
+            int(value)
+            for group, value in match.groupdict().items()
+            if group.rsplit("_", 1)[0] == var
+        }
+        solved[var] = values.pop() if len(values) == 1 else None
+    return solved
@@ -6,15 +6,27 @@ import re
 import tarfile
 import typing
 import xml
-from typing import Any, Dict, List, Optional, Pattern
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import xmltodict  # type: ignore[import]
-import yaml
 
-from .metadata import basic, real, simulation
+from .metadata import basic, i3, real, simulation
 from .metadata.simulation.data_sim import DataSimI3FileMetadata
-from .metadata.simulation.iceprod_tools import IceProdConnection
-from .utils import utils
+from .metadata.simulation.iceprod_tools import (
+    AsyncIceProd,
+    IceProdConnection,
+    prefetch_iceprod1_steering_params,
+)
+from .utils import (
+    checksum_cache,
+    dir_metadata_cache,
+    events_cache,
+    filename_matching,
+    utils,
+)
+
+_L2DirCacheEntry = Tuple[int, Dict[str, Any]]
 
 
 class MetadataManager:  # pylint: disable=R0903
@@ -26,37 +38,108 @@ class MetadataManager:  # pylint: disable=R0903
         basic_only: bool = False,
         iceprodv2_rc_token: str = "",
         iceprodv1_db_pass: str = "",
+        checksum_cache_path: str = "",
+        checksum_cache_xattr: bool = False,
+        hash_mode: str = "auto",
+        events_cache_path: str = "",
+        i3_frame_scan: bool = False,
+        l2_dir_cache_size: int = 16,
+        l2_dir_cache_dir: str = "",
+        adaptive_patterns: bool = False,
+        pattern_stats_path: str = "",
+        iceprod_cache_path: str = "",
+        iceprod_cache_swr: float = 0,
+        iceprod_bundle_path: str = "",
+        iceprod_bulk_tasks: bool = False,
     ):
         self.dir_path = ""
         self.site = site
         self.basic_only = basic_only
-        self.real_l2_dir_metadata: Dict[str, Dict[str, Any]] = {}
-        self.sim_regexes: List[Pattern[str]] = []
-        if not iceprodv1_db_pass and not iceprodv2_rc_token:
+        self.hash_mode = hash_mode
+        self.i3_frame_scan = i3_frame_scan
+        self.real_l2_dir_metadata: Dict[str, Any] = {}
+        # LRU of parsed L2 dirs' metadata: {dir_path: (dir's st_mtime_ns, metadata)}
+        self.l2_dir_cache: "OrderedDict[str, _L2DirCacheEntry]" = OrderedDict()
+        self.l2_dir_cache_size = l2_dir_cache_size
+        self.l2_dir_cache_hits = 0
+        self.l2_dir_cache_misses = 0
+        self.sim_matcher: Optional[filename_matching.PatternMatcher] = None
+        self.adaptive_patterns = adaptive_patterns
+        self.pattern_stats_path = pattern_stats_path
+        if not iceprodv1_db_pass and not iceprodv2_rc_token and not iceprod_bundle_path:
             self.iceprod_conn: Optional[IceProdConnection] = None
+            self.async_iceprod: Optional[AsyncIceProd] = None
+        else:
+            self.iceprod_conn = IceProdConnection(
+                iceprodv1_db_pass,
+                iceprodv2_rc_token,
+                cache_path=iceprod_cache_path,
+                stale_while_revalidate=iceprod_cache_swr,
+                bundle_path=iceprod_bundle_path,
+                bulk_tasks=iceprod_bulk_tasks,
+            )
+            self.async_iceprod = AsyncIceProd(self.iceprod_conn)
+        if not checksum_cache_path and not checksum_cache_xattr:
+            self.checksum_cache: Optional[checksum_cache.ChecksumCache] = None
+        else:
+            self.checksum_cache = checksum_cache.ChecksumCache(
+                checksum_cache_path, checksum_cache_xattr
+            )
+        if not events_cache_path:
+            self.events_cache: Optional[events_cache.EventsCache] = None
+        else:
+            self.events_cache = events_cache.EventsCache(events_cache_path)
+        if not l2_dir_cache_dir:
+            self.l2_dir_disk_cache: Optional[dir_metadata_cache.DirMetadataCache] = None
         else:
-            self.iceprod_conn = IceProdConnection(iceprodv1_db_pass, iceprodv2_rc_token)
+            self.l2_dir_disk_cache = dir_metadata_cache.DirMetadataCache(
+                l2_dir_cache_dir
+            )
 
-    def _new_file_basic_only(self, filepath: str) -> basic.BasicFileMetadata:
+    def _new_file_basic_only(self, file: utils.FileInfo) -> basic.BasicFileMetadata:
         """Return basic metadata-file object for files.
 
         Factory method.
         """
-        file = utils.FileInfo(filepath)
         logging.debug(f"Gathering basic metadata for {file.name}...")
         return basic.BasicFileMetadata(file, self.site)
 
+    @staticmethod
+    def _is_l2_dir_metadata_source(filename: str) -> bool:
+        """Return whether the file is one of an L2 directory's metadata files."""
+        return bool(
+            re.match(r"level2.*meta\.xml$", filename)
+            or "_GapsTxt.tar" in filename
+            or "GCD" in filename
+        )
+
     def _real_prep_l2_dir_metadata(self) -> None:
-        """Get metadata files for later processing with individual i3 files."""
+        """Get metadata files for later processing with individual i3 files.
+
+        Use the on-disk cache, if there is one, and the metadata files are
+        unchanged since they were cached.
+        """
+        with os.scandir(self.dir_path) as dir_entries:
+            source_entries = [
+                e
+                for e in dir_entries
+                if e.is_file() and self._is_l2_dir_metadata_source(e.name)
+            ]
+
+        sources: dir_metadata_cache.Sources = []
+        if self.l2_dir_disk_cache:
+            sources = dir_metadata_cache.sources_of(source_entries)
+            cached = self.l2_dir_disk_cache.get(self.dir_path, sources)
+            if cached is not None:
+                self.real_l2_dir_metadata = cached
+                return
+
         self.real_l2_dir_metadata = {}
         dir_meta_xml = None
-        gaps_files = {}  # gaps_files[<filename w/o extension>]
+        gaps_files = real.gaps.GapsFiles()  # gaps_files[<filename w/o extension>]
         gcd_files = {}  # gcd_files[<run id w/o leading zeros>]
 
-        for dir_entry in os.scandir(self.dir_path):
-            if not dir_entry.is_file():
-                continue
-
+        for dir_entry in source_entries:
             # Meta XML (one per directory)
             # Ex. level2_meta.xml, level2pass2_meta.xml
             if re.match(r"level2.*meta\.xml$", dir_entry.name):
@@ -74,21 +157,11 @@ class MetadataManager:  # pylint: disable=R0903
 
             # Gaps Files (one per i3 file)
             # Ex. Run00130484_GapsTxt.tar
+            # (only indexed here, a gaps file is parsed when it's needed)
             elif "_GapsTxt.tar" in dir_entry.name:
                 try:
-                    with tarfile.open(dir_entry.path) as tar:
-                        for tar_obj in tar:
-                            # pylint: disable=C0325
-                            iobytes = tar.extractfile(tar_obj)
-                            if not iobytes:
-                                continue
-                            file_dict = yaml.safe_load(iobytes)
-                            # Ex. Level2_IC86.2017_data_Run00130484_Subrun00000000_00000188_gaps.txt
-                            no_extension = tar_obj.name.split("_gaps.txt")[0]
-                            gaps_files[no_extension] = file_dict
-                            logging.debug(
-                                f"Grabbed gaps file for '{no_extension}', {dir_entry.name}."
-                            )
+                    gaps_files.index_tar(dir_entry.path)
+                    logging.debug(f"Indexed gaps files in {dir_entry.name}.")
                 except tarfile.ReadError:
                     pass
 
@@ -105,20 +178,45 @@ class MetadataManager:  # pylint: disable=R0903
         self.real_l2_dir_metadata["gaps_files"] = gaps_files
         self.real_l2_dir_metadata["gcd_files"] = gcd_files
 
-    def _new_file_real(self, filepath: str) -> basic.BasicFileMetadata:
+        if self.l2_dir_disk_cache:
+            self.l2_dir_disk_cache.put(
+                self.dir_path, sources, self.real_l2_dir_metadata
+            )
+
+    def _use_l2_dir_metadata(self, dir_path: str) -> None:
+        """Set `real_l2_dir_metadata` for `dir_path`, parsing it if needed.
+
+        Parsed directories are kept in a bounded LRU cache. An entry is
+        re-parsed if the directory's mtime changed (a file was added,
+        removed, or renamed).
+        """
+        mtime = os.stat(dir_path).st_mtime_ns
+        cached = self.l2_dir_cache.get(dir_path)
+        if cached and cached[0] == mtime:
+            self.l2_dir_cache_hits += 1
+            self.l2_dir_cache.move_to_end(dir_path)
+            self.dir_path = dir_path
+            self.real_l2_dir_metadata = cached[1]
+            return
+
+        self.l2_dir_cache_misses += 1
+        self.dir_path = dir_path
+        self._real_prep_l2_dir_metadata()
+        self.l2_dir_cache[dir_path] = (mtime, self.real_l2_dir_metadata)
+        self.l2_dir_cache.move_to_end(dir_path)
+        while len(self.l2_dir_cache) > max(self.l2_dir_cache_size, 1):
+            self.l2_dir_cache.popitem(last=False)
+
+    def _new_file_real(self, file: utils.FileInfo) -> basic.BasicFileMetadata:
         """Return different metadata-file objects for `/data/exp/` files.
 
         Factory method.
         """
-        file = utils.FileInfo(filepath)
-
+        level, year_run_subrun_part = real.filename_patterns.classify(file.name)
         # L2
-        if real.l2.L2FileMetadata.is_valid_filename(file.name):
+        if level == utils.ProcessingLevel.L2:
             # get directory's metadata
-            file_dir_path = os.path.dirname(os.path.abspath(file.path))
-            if (not self.real_l2_dir_metadata) or (file_dir_path != self.dir_path):
-                self.dir_path = file_dir_path
-                self._real_prep_l2_dir_metadata()
+            self._use_l2_dir_metadata(os.path.dirname(os.path.abspath(file.path)))
             try:
                 no_extension = file.name.split(".i3")[0]
                 gaps = self.real_l2_dir_metadata["gaps_files"][no_extension]
@@ -131,35 +229,122 @@ class MetadataManager:  # pylint: disable=R0903
                 gcd = ""
             logging.debug(f"Gathering L2 metadata for {file.name}...")
             return real.l2.L2FileMetadata(
-                file, self.site, self.real_l2_dir_metadata["dir_meta_xml"], gaps, gcd
+                file,
+                self.site,
+                self.real_l2_dir_metadata["dir_meta_xml"],
+                gaps,
+                gcd,
+                year_run_subrun_part,
             )
         # PFFilt
-        if real.pffilt.PFFiltFileMetadata.is_valid_filename(file.name):
+        if level == utils.ProcessingLevel.PFFilt:
             logging.debug(f"Gathering PFFilt metadata for {file.name}...")
-            return real.pffilt.PFFiltFileMetadata(file, self.site)
+            return real.pffilt.PFFiltFileMetadata(file, self.site, year_run_subrun_part)
         # PFDST
-        if real.pfdst.PFDSTFileMetadata.is_valid_filename(file.name):
+        if level == utils.ProcessingLevel.PFDST:
             logging.debug(f"Gathering PFDST metadata for {file.name}...")
-            return real.pfdst.PFDSTFileMetadata(file, self.site)
+            return real.pfdst.PFDSTFileMetadata(file, self.site, year_run_subrun_part)
         # PFRaw
-        if real.pfraw.PFRawFileMetadata.is_valid_filename(file.name):
+        if level == utils.ProcessingLevel.PFRaw:
             logging.debug(f"Gathering PFRaw metadata for {file.name}...")
-            return real.pfraw.PFRawFileMetadata(file, self.site)
+            return real.pfraw.PFRawFileMetadata(file, self.site, year_run_subrun_part)
         #
         # If no match, fall-through to basic.BasicFileMetadata...
-        return self._new_file_basic_only(filepath)
+        return self._new_file_basic_only(file)
+
+    def _prep_sim_regexes(self) -> filename_matching.PatternMatcher:
+        """Compile & index the simulation filename patterns, once."""
+        if not self.sim_matcher:
+            self.sim_matcher = filename_matching.PatternMatcher(
+                simulation.filename_patterns.regex_patterns,
+                adaptive=self.adaptive_patterns,
+            )
+        return self.sim_matcher
 
-    def _new_file_simulation(self, filepath: str) -> basic.BasicFileMetadata:
+    def preload(self) -> None:
+        """Do one-time setup now, instead of lazily with the first file.
+
+        Ex: when starting a long-lived worker process.
+        """
+        if self.basic_only:
+            return
+        self._prep_sim_regexes()
+        try:
+            from icecube import dataclasses, dataio  # type: ignore[import] # noqa: F401 # pylint: disable=C0415,E0401,W0611
+        except ImportError:
+            logging.debug("icecube is not available to preload")
+
+    def prefetch_iceprod(self, filepaths: List[str]) -> None:
+        """Query IceProd v1 for all the sim files' datasets, in one batch.
+
+        Instead of one query per dataset, as each file is indexed.
+        """
+        if self.basic_only or not self.iceprod_conn:
+            return
+        sim_matcher = self._prep_sim_regexes()
+        dataset_nums = set()
+        for path in filepaths:
+            if not MetadataManager._is_data_sim_filepath(path):
+                continue
+            file = utils.FileInfo(path)  # not stat'd
+            if not DataSimI3FileMetadata.is_valid_filename(file.name):
+                continue
+            try:
+                dataset_num, _ = DataSimI3FileMetadata.parse_iceprod_dataset_job_ids(
+                    sim_matcher, file, count_hit=False
+                )
+            except ValueError:
+                continue  # raised again when the file is indexed
+            if dataset_num is not None:
+                dataset_nums.add(dataset_num)
+        if dataset_nums:
+            prefetch_iceprod1_steering_params(self.iceprod_conn, dataset_nums)
+
+    def prefetch_iceprod_async(self, filepath: str) -> None:
+        """Start the sim file's IceProd lookup early, via `AsyncIceProd`.
+
+        So it runs while the file(s) before it are indexed.
+        """
+        if self.basic_only or not self.async_iceprod:
+            return
+        if not MetadataManager._is_data_sim_filepath(filepath):
+            return
+        file = utils.FileInfo(filepath)  # not stat'd
+        if not DataSimI3FileMetadata.is_valid_filename(file.name):
+            return
+        try:
+            dataset_num, job_index = DataSimI3FileMetadata.parse_iceprod_dataset_job_ids(
+                self._prep_sim_regexes(), file, count_hit=False
+            )
+        except ValueError:
+            return  # raised again when the file is indexed
+        self.async_iceprod.prefetch(dataset_num, filepath, job_index)
+
+    def close(self) -> None:
+        """Close any cache connections, and write any pattern stats."""
+        if self.pattern_stats_path and self.sim_matcher:
+            try:
+                filename_matching.add_stats_to_yaml(
+                    self.sim_matcher.stats(), self.pattern_stats_path
+                )
+            except OSError as e:
+                logging.warning(f"Could not write pattern stats: {e}")
+            self.sim_matcher.hits = [0] * len(self.sim_matcher.hits)  # added once
+        if self.async_iceprod:
+            self.async_iceprod.close()
+        if self.iceprod_conn:
+            self.iceprod_conn.close()
+        if self.checksum_cache:
+            self.checksum_cache.close()
+        if self.events_cache:
+            self.events_cache.close()
+
+    def _new_file_simulation(self, file: utils.FileInfo) -> basic.BasicFileMetadata:
         """Return different metadata-file objects for `/data/sim/` files.
 
         Factory method.
         """
-        file = utils.FileInfo(filepath)
-
-        # read-in regex file
-        if not self.sim_regexes:
-            for regex in simulation.filename_patterns.regex_patterns:
-                self.sim_regexes.append(re.compile(regex))
+        sim_matcher = self._prep_sim_regexes()
 
         if not self.iceprod_conn:
             raise Exception("Missing IceProd Connection Instance.")
@@ -167,10 +352,10 @@ class MetadataManager:  # pylint: disable=R0903
         if DataSimI3FileMetadata.is_valid_filename(file.name):
             logging.debug(f"Gathering Sim metadata for {file.name}...")
             return DataSimI3FileMetadata(
-                file, self.site, self.sim_regexes, self.iceprod_conn
+                file, self.site, sim_matcher, self.iceprod_conn, self.async_iceprod
             )
 
-        return self._new_file_basic_only(filepath)
+        return self._new_file_basic_only(file)
 
     @staticmethod
     def _is_data_sim_filepath(filepath: str) -> bool:
@@ -180,22 +365,39 @@ class MetadataManager:  # pylint: disable=R0903
     def _is_data_exp_filepath(filepath: str) -> bool:
         return filepath.startswith("/data/exp/")
 
-    def new_file(self, filepath: str) -> basic.BasicFileMetadata:
+    def new_file(
+        self, filepath: Union[str, utils.FileInfo]
+    ) -> basic.BasicFileMetadata:
         """Return different metadata-file objects for files.
 
+        Pass in a `utils.FileInfo` to reuse its stat result.
+
         Factory method.
         """
+        if isinstance(filepath, utils.FileInfo):
+            file = filepath
+            filepath = file.path
+        else:
+            file = utils.FileInfo(filepath)
+
         if self.basic_only:
-            return self._new_file_basic_only(filepath)
+            metadata_file = self._new_file_basic_only(file)
 
         elif MetadataManager._is_data_sim_filepath(filepath):
-            return self._new_file_simulation(filepath)
+            metadata_file = self._new_file_simulation(file)
 
         elif MetadataManager._is_data_exp_filepath(filepath):
-            return self._new_file_real(filepath)
+            metadata_file = self._new_file_real(file)
 
         else:
             raise RuntimeError(
                 f"Unaccounted for filepath type: {filepath}. "
                 "Run with --basic-only for basic metadata collection."
             )
+
+        metadata_file.checksum_cache = self.checksum_cache
+        metadata_file.hash_mode = self.hash_mode
+        if isinstance(metadata_file, i3.I3FileMetadata):
+            metadata_file.events_cache = self.events_cache
+            metadata_file.frame_scan = self.i3_frame_scan
+        return metadata_file
@@ -0,0 +1,139 @@
+"""Persistent cache of files' checksums, keyed by their stat identity.
+
+Re-indexing unchanged files (Ex: `--patch` runs, restored files, re-runs of
+a partially-failed DAG) does not need to re-hash them. A cached checksum is
+only used if the file's identity is unchanged since it was hashed:
+
+    (st_dev, st_ino, st_size, st_mtime_ns, st_ctime_ns)
+
+Two backends, either or both:
+    - SQLite: a database file (Ex: in the staging dir), safe for concurrent
+      worker processes
+    - xattr: a `user.` extended attribute stored on the file itself
+      (`st_ctime` is excluded from this key, since setting an xattr updates it)
+"""
+
+
+import logging
+import os
+import sqlite3
+from typing import Optional, Tuple
+
+from .sqlite_cache import SQLiteCache
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+XATTR_NAME: Final[str] = "user.fc_indexer.sha512"
+
+
+def stat_identity(stat: os.stat_result) -> Tuple[int, int, int, int, int]:
+    """Return the fields which identify an unchanged file."""
+    return (
+        stat.st_dev,
+        stat.st_ino,
+        stat.st_size,
+        stat.st_mtime_ns,
+        stat.st_ctime_ns,
+    )
+
+
+class ChecksumCache(SQLiteCache):
+    """Look up & store SHA512 checksums by the file's stat identity.
+
+    Any error from a backend is logged and treated as a cache miss--the
+    cache never stops a file from being indexed.
+    """
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS checksums (
+        st_dev INTEGER NOT NULL,
+        st_ino INTEGER NOT NULL,
+        st_size INTEGER NOT NULL,
+        st_mtime_ns INTEGER NOT NULL,
+        st_ctime_ns INTEGER NOT NULL,
+        sha512 TEXT NOT NULL,
+        path TEXT NOT NULL,
+        PRIMARY KEY (st_dev, st_ino)
+    )"""
+
+    def __init__(self, db_path: str = "", use_xattr: bool = False):
+        super().__init__(db_path)
+        self.use_xattr = use_xattr
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[str]:
+        """Return the cached checksum, if the file is unchanged."""
+        sha512 = None
+        if self.use_xattr:
+            sha512 = self._get_xattr(path, stat)
+        if not sha512 and self.db_path:
+            sha512 = self._get_sqlite(stat)
+
+        if sha512:
+            self.hits += 1
+            logging.debug(f"Checksum cache hit for {path}.")
+        else:
+            self.misses += 1
+        return sha512
+
+    def put(self, path: str, stat: os.stat_result, sha512: str) -> None:
+        """Store the checksum of the file, as it was when `stat` was taken."""
+        if self.use_xattr:
+            self._put_xattr(path, stat, sha512)
+        if self.db_path:
+            self._put_sqlite(path, stat, sha512)
+
+    # SQLite ---------------------------------------------------------------------------
+
+    def _get_sqlite(self, stat: os.stat_result) -> Optional[str]:
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT sha512 FROM checksums WHERE st_dev=? AND st_ino=? "
+                    "AND st_size=? AND st_mtime_ns=? AND st_ctime_ns=?",
+                    stat_identity(stat),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logging.warning(f"Checksum cache ({self.db_path}) lookup failed: {e}")
+            return None
+        return str(row[0]) if row else None
+
+    def _put_sqlite(self, path: str, stat: os.stat_result, sha512: str) -> None:
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO checksums VALUES (?, ?, ?, ?, ?, ?, ?)",
+                stat_identity(stat) + (sha512, path),
+            )
+        except sqlite3.Error as e:
+            logging.warning(f"Checksum cache ({self.db_path}) insert failed: {e}")
+
+    # xattr ----------------------------------------------------------------------------
+
+    @staticmethod
+    def _xattr_value(stat: os.stat_result, sha512: str) -> bytes:
+        return f"{stat.st_size}:{stat.st_mtime_ns}:{sha512}".encode()
+
+    def _get_xattr(self, path: str, stat: os.stat_result) -> Optional[str]:
+        try:
+            value = os.getxattr(path, XATTR_NAME, follow_symlinks=False)
+        except (OSError, AttributeError):  # not set, not supported, or not Linux
+            return None
+        sha512 = value.decode(errors="replace").rsplit(":", 1)[-1]
+        if value != self._xattr_value(stat, sha512):  # the file has changed
+            return None
+        return sha512
+
+    def _put_xattr(self, path: str, stat: os.stat_result, sha512: str) -> None:
+        try:
+            os.setxattr(
+                path, XATTR_NAME, self._xattr_value(stat, sha512), follow_symlinks=False
+            )
+        except (OSError, AttributeError) as e:
+            logging.debug(f"Could not set checksum xattr on {path}: {e}")
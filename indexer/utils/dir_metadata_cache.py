@@ -0,0 +1,100 @@
+"""Persistent cache of parsed directory metadata, shared by indexer jobs.
+
+Many jobs (Ex: one per Condor job) index files from the same directory,
+and each would otherwise re-parse the directory's metadata files (Ex: an
+L2 run directory's `level2*meta.xml`, gaps tarballs, & GCD listing). So,
+the parsed metadata is pickled, one file per directory, in a shared cache
+directory.
+
+A cached entry is only used if the directory's metadata files are the
+same: same names, mtimes, and sizes. Cache files are written atomically,
+so concurrent jobs never read a partial entry. Only point this at a cache
+directory that's writable by trusted users--cache files are unpickled.
+"""
+
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+CACHE_VERSION: Final[int] = 1  # bump when the metadata's format changes
+
+# the metadata files' (name, st_mtime_ns, st_size), sorted by name
+Sources = List[Tuple[str, int, int]]
+
+
+def sources_of(dir_entries: List["os.DirEntry[str]"]) -> Sources:
+    """Return the identity of a directory's metadata files."""
+    sources = []
+    for dir_entry in dir_entries:
+        stat = dir_entry.stat()
+        sources.append((dir_entry.name, stat.st_mtime_ns, stat.st_size))
+    return sorted(sources)
+
+
+class DirMetadataCache:
+    """Look up & store a directory's parsed metadata by its metadata files.
+
+    Any I/O or unpickling error is logged and treated as a cache miss.
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_path(self, dir_path: str) -> str:
+        digest = hashlib.sha256(dir_path.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pickle")
+
+    def get(self, dir_path: str, sources: Sources) -> Optional[Dict[str, Any]]:
+        """Return the directory's cached metadata, if its sources are unchanged."""
+        try:
+            with open(self._cache_path(dir_path), "rb") as file:
+                entry = pickle.load(file)
+        except FileNotFoundError:
+            entry = None
+        except Exception as e:  # pylint: disable=W0703
+            logging.warning(f"Dir metadata cache lookup failed for {dir_path}: {e}")
+            entry = None
+
+        if (
+            not isinstance(entry, dict)
+            or entry.get("version") != CACHE_VERSION
+            or entry.get("dir_path") != dir_path
+            or entry.get("sources") != sources
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["metadata"]  # type: ignore[no-any-return]
+
+    def put(self, dir_path: str, sources: Sources, metadata: Dict[str, Any]) -> None:
+        """Store the directory's metadata, parsed from `sources`."""
+        entry = {
+            "version": CACHE_VERSION,
+            "dir_path": dir_path,
+            "sources": sources,
+            "metadata": metadata,
+        }
+        tmp_path = ""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            with open(fd, "wb") as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.chmod(tmp_path, 0o644)  # readable by other jobs (mkstemp's is 0o600)
+            os.replace(tmp_path, self._cache_path(dir_path))
+        except Exception as e:  # pylint: disable=W0703
+            logging.warning(f"Dir metadata cache insert failed for {dir_path}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
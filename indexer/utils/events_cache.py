@@ -0,0 +1,83 @@
+"""Persistent cache of i3 files' events summaries, keyed by content checksum.
+
+An i3 file's first/last event ids, event count, and content status only
+depend on its content. So, a summary is looked up by the file's SHA512
+checksum, and is valid for any path/copy with that content.
+
+Only "good" summaries are cached; a "bad" status may be due to something
+other than the content (Ex: an I/O error mid-read).
+"""
+
+
+import logging
+import sqlite3
+from typing import Optional
+
+from file_catalog.schema import types
+
+from .sqlite_cache import SQLiteCache
+
+
+class EventsCache(SQLiteCache):
+    """Look up & store i3 events summaries by SHA512 checksum.
+
+    Any database error is logged and treated as a cache miss.
+    """
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS events (
+        sha512 TEXT PRIMARY KEY,
+        first_event INTEGER,
+        last_event INTEGER,
+        event_count INTEGER NOT NULL,
+        status TEXT NOT NULL
+    )"""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, sha512: str) -> Optional[types.EventsData]:
+        """Return the cached events summary for the content."""
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT first_event, last_event, event_count, status "
+                    "FROM events WHERE sha512=?",
+                    (sha512,),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error as e:
+            logging.warning(f"Events cache ({self.db_path}) lookup failed: {e}")
+            row = None
+
+        if not row:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {
+            "first_event": row[0],
+            "last_event": row[1],
+            "event_count": row[2],
+            "status": row[3],
+        }
+
+    def put(self, sha512: str, events_data: types.EventsData) -> None:
+        """Store the events summary for the content, if it's "good"."""
+        if events_data["status"] != "good":
+            return
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?)",
+                (
+                    sha512,
+                    events_data["first_event"],
+                    events_data["last_event"],
+                    events_data["event_count"],
+                    events_data["status"],
+                ),
+            )
+        except sqlite3.Error as e:
+            logging.warning(f"Events cache ({self.db_path}) insert failed: {e}")
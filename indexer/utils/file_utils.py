@@ -17,15 +17,17 @@ def commonpath(paths: List[str]) -> str:
         raise ValueError(f'{e}: {", ".join(p for p in paths)}') from e
 
 
-def is_processable_path(path: str) -> bool:
+def is_processable_path(path: str, lstat: Optional[os.stat_result] = None) -> bool:
     """Return `True` if `path` is processable.
 
     AKA, not a symbolic link, a socket, a FIFO, a device, nor char device.
 
+    Pass in `lstat` if `path` was already `os.lstat()`'d.
+
     Raises:
         FileNotFoundError - if `path` does not exist
     """
-    mode = os.lstat(path).st_mode
+    mode = (lstat or os.lstat(path)).st_mode
     ok = not (
         stat.S_ISLNK(mode)
         or stat.S_ISSOCK(mode)
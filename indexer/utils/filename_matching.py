@@ -0,0 +1,679 @@
+"""Match a filename against a long, ordered list of regex patterns.
+
+Trying each pattern in turn (first match wins) means a miss costs a
+`re.match()` per pattern. Instead, a pattern's leading literal text
+(Ex: "Level2_" in `r"Level2_(IC\\d+\\.\\d\\d\\d\\d)_corsika..."`) is indexed in a
+trie, so a filename is only tried against the patterns whose literal
+prefix it starts with, plus those with no literal prefix (Ex: a leading
+group with alternation). Candidates are still tried in their original
+order, so the result is the same as the linear scan.
+
+Also, filenames come in relatively few "shapes" where only the digits
+differ (Ex: "corsika.######.######.i#"). The first filename of a shape is
+matched as above, then its shape is memoized along with the winning
+pattern and any earlier patterns that could match *some* filename of that
+shape. The next filename of that shape only tries those patterns (usually,
+just the winner). To find those, each pattern is "widened" so that it also
+matches "#" wherever it matches a digit; a pattern whose widened version
+doesn't match a shape can't match any filename of that shape.
+
+Optionally (`adaptive=True`), the candidates are tried most-hit first,
+instead of in their original order. A pattern is only moved ahead of an
+earlier one if no (ASCII) filename could match both, which is checked by
+exploring the two patterns' NFAs together; so, the first match is the same.
+The same NFAs find patterns that are shadowed by earlier patterns, for
+reports (see `PatternMatcher.shadowed_by()`).
+"""
+
+
+import fcntl
+import functools
+import os
+import re
+import tempfile
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Match,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+import yaml
+
+try:
+    from re import _compiler as sre_compile  # type: ignore[attr-defined]
+    from re import _parser as sre_parse  # type: ignore[attr-defined]
+except ImportError:  # Python < 3.11
+    import sre_compile
+    import sre_parse
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+SHAPE_MEMO_SIZE: Final[int] = 20000  # max memoized shapes, per matcher
+REORDER_INTERVAL: Final[int] = 1000  # matches between reorderings (adaptive mode)
+
+_SHAPE_TABLE: Final[Dict[int, int]] = str.maketrans("0123456789", "#" * 10)
+_HASH: Final[int] = ord("#")
+_DIGITS_MASK: Final[int] = sum(1 << ord(d) for d in "0123456789")
+
+# matches a single character (widened, if needed)
+_CHAR_OPS = {sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY}
+# these can't be (simply) widened
+_UNWIDENABLE_OPS = {
+    sre_parse.ASSERT_NOT,
+    sre_parse.GROUPREF,
+    sre_parse.GROUPREF_EXISTS,
+    getattr(sre_parse, "ATOMIC_GROUP", None),  # Python 3.11+
+    getattr(sre_parse, "POSSESSIVE_REPEAT", None),  # ``
+}
+_WIDENABLE_AT_CODES = {
+    sre_parse.AT_BEGINNING,
+    sre_parse.AT_BEGINNING_STRING,
+    sre_parse.AT_END,
+    sre_parse.AT_END_STRING,
+}
+
+
+def shape(filename: str) -> str:
+    """Return the filename with each digit redacted as "#"."""
+    return filename.translate(_SHAPE_TABLE)
+
+
+def _literal_prefix(parsed: Any) -> Tuple[str, bool]:
+    """Return the literal text every match must start with.
+
+    Also, return whether all of `parsed` is literal (so the prefix may
+    continue after it).
+    """
+    prefix = ""
+    for op, av in parsed:
+        if op == sre_parse.LITERAL:
+            prefix += chr(av)
+        elif op == sre_parse.SUBPATTERN and not av[1] and not av[2]:  # no flags
+            sub_prefix, complete = _literal_prefix(av[-1])
+            prefix += sub_prefix
+            if not complete:
+                return prefix, False
+        else:
+            return prefix, False
+    return prefix, True
+
+
+def literal_prefix(pattern: Pattern[str]) -> str:
+    """Return the literal text every `pattern.match()` must start with."""
+    if pattern.flags & re.IGNORECASE:
+        return ""
+    return _literal_prefix(sre_parse.parse(pattern.pattern, pattern.flags))[0]
+
+
+_char_masks: Dict[Tuple[str, int], int] = {}
+
+
+def _parser_state(parsed: Any) -> Any:
+    """Return the parsed pattern's state (flags, groups, etc.)."""
+    return getattr(parsed, "state", None) or parsed.pattern  # Python 3.7: `.pattern`
+
+
+def _char_mask(parsed: Any, op: Any, av: Any) -> int:
+    """Return the bitmask of the ASCII characters a single-character item matches."""
+    state = _parser_state(parsed)
+    key = (f"{op} {av}", state.flags)
+    if key not in _char_masks:
+        item = sre_compile.compile(sre_parse.SubPattern(state, [(op, av)]))
+        _char_masks[key] = sum(1 << c for c in range(128) if item.match(chr(c)))
+    return _char_masks[key]
+
+
+def _widen(parsed: Any) -> bool:
+    """Widen (in place) each single-character item that matches a digit to
+    also match "#".
+
+    Return `False` if the pattern can't be widened.
+    """
+    for index, (op, av) in enumerate(parsed.data):
+        if op in _CHAR_OPS:
+            mask = _char_mask(parsed, op, av)
+            if mask & (1 << _HASH) or not mask & _DIGITS_MASK:
+                continue
+            if op == sre_parse.LITERAL:
+                av = [(sre_parse.LITERAL, av)]
+            elif op != sre_parse.IN or av[0][0] == sre_parse.NEGATE:
+                return False  # Ex: [^#]
+            parsed.data[index] = (sre_parse.IN, av + [(sre_parse.LITERAL, _HASH)])
+        elif op in _UNWIDENABLE_OPS:
+            return False
+        elif op == sre_parse.AT:
+            if av not in _WIDENABLE_AT_CODES:  # Ex: \b
+                return False
+        elif op == sre_parse.SUBPATTERN:
+            if not _widen(av[-1]):
+                return False
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            if not _widen(av[2]):
+                return False
+        elif op == sre_parse.BRANCH:
+            if not all(_widen(branch) for branch in av[1]):
+                return False
+        elif op == sre_parse.ASSERT:
+            if not _widen(av[1]):
+                return False
+        else:
+            return False
+    return True
+
+
+def widen(pattern: Pattern[str]) -> Optional[Pattern[str]]:
+    """Return a pattern that matches the shapes of all the filenames
+    `pattern` matches.
+
+    Return `None` if the pattern can't be widened (Ex: backreferences).
+    """
+    parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    if not _widen(parsed):
+        return None
+    return sre_compile.compile(parsed, pattern.flags)  # type: ignore[no-any-return]
+
+
+class _Unsupported(Exception):
+    """Raised when a pattern has a construct that `_NFA` can't represent."""
+
+
+# special NFA states
+_ANY: Final[int] = -1  # matched -- anything may follow
+_END: Final[int] = -2  # matched, if the filename ends here (or at a final "\n")
+_END_NL: Final[int] = -3  # matched, if the filename ends here
+_MATCHED: Final[FrozenSet[int]] = frozenset([_ANY, _END, _END_NL])
+_NEWLINE: Final[int] = ord("\n")
+_MAX_REPEAT_EXPANSION: Final[int] = 64
+_MAX_OVERLAP_STATES: Final[int] = 10000
+_BROAD: Final[int] = 62  # a character class of at least this many is a "wildcard"
+
+
+class _NFA:
+    """An epsilon-NFA for `pattern.match()`, over ASCII characters."""
+
+    def __init__(self, pattern: Pattern[str]):
+        self.epsilons: List[List[int]] = []
+        self.edges: List[List[Tuple[int, int]]] = []  # [(char bitmask, node)]
+        self._steps: Dict[Tuple[FrozenSet[int], int], FrozenSet[int]] = {}
+        self._masks: Optional[Set[int]] = None
+        self.start = self._node()
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+        self.epsilons[self._build(parsed, self.start)].append(_ANY)
+
+    def _node(self) -> int:
+        self.epsilons.append([])
+        self.edges.append([])
+        return len(self.edges) - 1
+
+    def _build(self, parsed: Any, node: int) -> int:  # pylint: disable=R0912
+        """Add the sequence after `node`, then return its last node."""
+        for op, av in parsed.data:
+            if op in _CHAR_OPS:
+                nxt = self._node()
+                self.edges[node].append((_char_mask(parsed, op, av), nxt))
+                node = nxt
+            elif op == sre_parse.AT and av == sre_parse.AT_END:  # $
+                self.epsilons[node].append(_END)
+                node = self._node()  # nothing non-empty can follow
+            elif op == sre_parse.AT and av == sre_parse.AT_END_STRING:  # \Z
+                self.epsilons[node].append(_END_NL)
+                node = self._node()  # ``
+            elif op == sre_parse.SUBPATTERN and not av[1] and not av[2]:
+                node = self._build(av[-1], node)
+            elif op == sre_parse.BRANCH:
+                end = self._node()
+                for branch in av[1]:
+                    self.epsilons[self._build(branch, node)].append(end)
+                node = end
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+                low, high, sub = av
+                optional = 0 if high == sre_parse.MAXREPEAT else high - low
+                if max(low, optional) > _MAX_REPEAT_EXPANSION:
+                    raise _Unsupported(av)
+                for _ in range(low):
+                    node = self._build(sub, node)
+                if high == sre_parse.MAXREPEAT:
+                    loop = self._node()
+                    self.epsilons[node].append(loop)
+                    self.epsilons[self._build(sub, loop)].append(loop)
+                    node = loop
+                else:
+                    exits = []
+                    for _ in range(optional):
+                        exits.append(node)
+                        node = self._build(sub, node)
+                    for exit_ in exits:
+                        self.epsilons[exit_].append(node)
+            else:
+                raise _Unsupported(op)
+        return node
+
+    def masks(self) -> Set[int]:
+        """Return all the character bitmasks."""
+        if self._masks is None:
+            self._masks = {mask for edges in self.edges for mask, _ in edges}
+        return self._masks
+
+    def closure(self, states: Iterable[int]) -> FrozenSet[int]:
+        """Return the states, plus those reachable by epsilon moves."""
+        closure = set(states)
+        stack = [s for s in closure if s >= 0]
+        while stack:
+            for nxt in self.epsilons[stack.pop()]:
+                if nxt not in closure:
+                    closure.add(nxt)
+                    if nxt >= 0:
+                        stack.append(nxt)
+        return frozenset(closure)
+
+    def step(self, states: FrozenSet[int], char: int) -> FrozenSet[int]:
+        """Return the states after reading the character (cached, like a DFA)."""
+        key = (states, char)
+        if key not in self._steps:
+            self._steps[key] = self._step(states, char)
+        return self._steps[key]
+
+    def _step(self, states: FrozenSet[int], char: int) -> FrozenSet[int]:
+        nxt = set()
+        for state in states:
+            if state == _ANY:
+                nxt.add(_ANY)
+            elif state == _END:
+                if char == _NEWLINE:
+                    nxt.add(_END_NL)
+            elif state >= 0:
+                nxt.update(t for mask, t in self.edges[state] if mask >> char & 1)
+        return self.closure(nxt)
+
+
+def _char_classes(masks: Set[int]) -> List[int]:
+    """Return one character per class of ASCII characters the masks can't tell apart.
+
+    Only one character per class needs to be tried.
+    """
+    parts = [(1 << 128) - 1]
+    for mask in masks | {1 << _NEWLINE}:
+        parts = [p for part in parts for p in (part & mask, part & ~mask) if p]
+    return [(part & -part).bit_length() - 1 for part in parts]
+
+
+def may_overlap(nfa_a: Optional[_NFA], nfa_b: Optional[_NFA]) -> bool:
+    """Return whether some ASCII filename could match both patterns.
+
+    Conservatively, `True` if unsure (Ex: a pattern has no NFA).
+    """
+    if not nfa_a or not nfa_b:
+        return True
+
+    classes = _char_classes(nfa_a.masks() | nfa_b.masks())
+
+    start = (nfa_a.closure([nfa_a.start]), nfa_b.closure([nfa_b.start]))
+    seen = {start}
+    queue = [start]
+    while queue:
+        states_a, states_b = queue.pop()
+        if states_a & _MATCHED and states_b & _MATCHED:
+            return True
+        for char in classes:
+            nxt = (nfa_a.step(states_a, char), nfa_b.step(states_b, char))
+            if nxt[0] and nxt[1] and nxt not in seen:
+                if len(seen) > _MAX_OVERLAP_STATES:
+                    return True
+                seen.add(nxt)
+                queue.append(nxt)
+    return False
+
+
+def covers(nfas: Sequence[_NFA], nfa: _NFA) -> Optional[bool]:
+    """Return whether every ASCII filename `nfa` matches is matched by one of `nfas`.
+
+    `None` if unsure (too many states to explore).
+    """
+    classes = _char_classes(nfa.masks().union(*(n.masks() for n in nfas)))
+
+    start = (
+        nfa.closure([nfa.start]),
+        tuple(n.closure([n.start]) for n in nfas),
+    )
+    seen = {start}
+    queue = [start]
+    while queue:
+        states, others = queue.pop()
+        if any(_ANY in o for o in others):
+            continue  # anything that follows is matched
+        if states & _MATCHED and not any(o & _MATCHED for o in others):
+            return False
+        for char in classes:
+            nxt_states = nfa.step(states, char)
+            if not nxt_states:
+                continue
+            nxt = (nxt_states, tuple(n.step(o, char) for n, o in zip(nfas, others)))
+            if nxt not in seen:
+                if len(seen) > _MAX_OVERLAP_STATES:
+                    return None
+                seen.add(nxt)
+                queue.append(nxt)
+    return True
+
+
+def _nfa(pattern: Pattern[str]) -> Optional[_NFA]:
+    try:
+        return _NFA(pattern)
+    except _Unsupported:
+        return None
+
+
+def _wildcards(parsed: Any, risks: List[str]) -> List[bool]:
+    """Return whether each of the sequence's items is a wildcard repeat.
+
+    Groups are flattened into the sequence. A wildcard repeat is an
+    unbounded repeat of a single, broad character class (Ex: `.*`, `\\S+`).
+    Also, add any nested unbounded repeats to `risks`.
+    """
+    items = []
+    for op, av in parsed.data:
+        if op == sre_parse.SUBPATTERN:
+            items.extend(_wildcards(av[-1], risks))
+            continue
+        wildcard = False
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            _, high, sub = av
+            inner = sub
+            while len(inner.data) == 1 and inner.data[0][0] == sre_parse.SUBPATTERN:
+                inner = inner.data[0][1][-1]
+            if len(inner.data) == 1 and inner.data[0][0] in _CHAR_OPS:
+                mask = _char_mask(inner, *inner.data[0])
+                broad = bin(mask).count("1") >= _BROAD
+                wildcard = high == sre_parse.MAXREPEAT and broad
+            elif (
+                high == sre_parse.MAXREPEAT
+                and len(inner.data) == 1
+                and inner.data[0][0] in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT)
+                and inner.data[0][1][1] == sre_parse.MAXREPEAT
+            ):
+                risks.append("nested unbounded repeats (Ex: `(a+)+`)")
+            else:
+                _wildcards(sub, risks)
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                _wildcards(branch, risks)
+        items.append(wildcard)
+    return items
+
+
+def backtracking_risks(pattern: Pattern[str]) -> List[str]:
+    """Return the pattern's (heuristic) excessive-backtracking risks.
+
+    Ex: a leading `.*`, which scans to the filename's end then backtracks,
+    and several `.*` in a row, which can backtrack O(n^k) on a failed match.
+    """
+    risks: List[str] = []
+    parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    items = _wildcards(parsed, risks)
+    if items and items[0]:
+        risks.append("leading wildcard repeat (Ex: `.*`)")
+    if sum(items) > 1:
+        risks.append(
+            f"{sum(items)} wildcard repeats: a failed match may backtrack"
+            f" O(n^{sum(items)})"
+        )
+    return risks
+
+
+class _PrefixTrie:
+    """Indexes (ints), by prefix."""
+
+    _END = ""  # key for the indexes of prefixes ending at a node
+
+    def __init__(self) -> None:
+        self._root: Dict[str, Any] = {}
+        self._no_prefix: List[int] = []
+
+    def add(self, prefix: str, index: int) -> None:
+        """Add the index by its prefix (which may be empty)."""
+        if not prefix:
+            self._no_prefix.append(index)
+            return
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(_PrefixTrie._END, []).append(index)
+
+    def find(self, text: str) -> List[int]:
+        """Return the indexes whose prefix `text` starts with, sorted."""
+        indexes = list(self._no_prefix)
+        node = self._root
+        for char in text:
+            node = node.get(char)  # type: ignore[assignment]
+            if node is None:
+                break
+            indexes.extend(node.get(_PrefixTrie._END, []))
+        indexes.sort()
+        return indexes
+
+
+# {shape: (winning pattern's index (if any), indexes to try, in order)}
+_ShapeMemoEntry = Tuple[Optional[int], Tuple[int, ...]]
+
+
+class PatternMatcher:
+    """Find the first pattern (in order) that matches a filename."""
+
+    def __init__(
+        self, patterns: Sequence[Union[str, Pattern[str]]], adaptive: bool = False
+    ):
+        self.patterns: List[Pattern[str]] = [re.compile(p) for p in patterns]
+        self._prefixes = [literal_prefix(p) for p in self.patterns]
+        self._trie = _PrefixTrie()
+        self._shape_trie = _PrefixTrie()
+        for i, prefix in enumerate(self._prefixes):
+            self._trie.add(prefix, i)
+            self._shape_trie.add(shape(prefix), i)
+
+        self.hits = [0] * len(self.patterns)
+        self.adaptive = adaptive
+        self._rank: Optional[List[int]] = None  # {index: position to be tried}
+        self._matches_since_reorder = 0
+        self._nfas: Dict[int, Optional[_NFA]] = {}
+        self._overlaps: Dict[Tuple[int, int], bool] = {}
+
+        self._widened: Optional[List[Optional[Pattern[str]]]] = None  # lazy
+        self._shape_memo: Dict[str, _ShapeMemoEntry] = {}
+        self.shape_memo_hits = 0
+        self.shape_memo_misses = 0
+
+    def candidates(self, filename: str) -> List[int]:
+        """Return the indexes of the patterns that could match, in order."""
+        return self._trie.find(filename)
+
+    def _may_overlap(self, i: int, j: int) -> bool:
+        """Return whether some ASCII filename could match both patterns."""
+        prefix_i, prefix_j = self._prefixes[i], self._prefixes[j]
+        if not prefix_i.startswith(prefix_j) and not prefix_j.startswith(prefix_i):
+            return False
+        if (i, j) not in self._overlaps:
+            for k in (i, j):
+                if k not in self._nfas:
+                    self._nfas[k] = _nfa(self.patterns[k])
+            self._overlaps[(i, j)] = may_overlap(self._nfas[i], self._nfas[j])
+        return self._overlaps[(i, j)]
+
+    def reorder(self) -> None:
+        """Order the candidates by hits, where it keeps the same first match.
+
+        A pattern is moved ahead of a less-hit pattern only if they can't
+        both match the same (ASCII) filename.
+        """
+        order = list(range(len(self.patterns)))
+        position = list(range(len(self.patterns)))
+        for i in sorted(
+            (i for i, hits in enumerate(self.hits) if hits),
+            key=lambda i: (-self.hits[i], i),
+        ):
+            pos = position[i]
+            while pos:
+                ahead = order[pos - 1]
+                if self.hits[ahead] >= self.hits[i] or self._may_overlap(ahead, i):
+                    break
+                order[pos - 1], order[pos] = i, ahead
+                position[ahead], pos = pos, pos - 1
+            position[i] = pos
+        self._rank = position
+        self._matches_since_reorder = 0
+
+    def shadowed_by(self, index: int) -> Optional[List[int]]:
+        """Return the earlier patterns that, together, match every (ASCII)
+        filename that pattern `index` matches.
+
+        So, pattern `index` can never win. Return `[]` if it's not
+        shadowed, and `None` if unsure.
+        """
+        earlier = [i for i in range(index) if self._may_overlap(i, index)]
+        for k in earlier + [index]:
+            if k not in self._nfas:
+                self._nfas[k] = _nfa(self.patterns[k])
+        nfa = self._nfas[index]
+        nfas = [self._nfas[i] for i in earlier]
+        if not nfa or not all(nfas):
+            return None
+        for i, nfa_i in zip(earlier, nfas):  # first, try each alone
+            if covers([nfa_i], nfa):  # type: ignore[list-item]
+                return [i]
+        covered = covers(nfas, nfa)  # type: ignore[arg-type]
+        if covered is None:
+            return None
+        return earlier if covered and earlier else []
+
+    def _search(self, filename: str) -> Optional[Tuple[int, Match[str]]]:
+        candidates = self.candidates(filename)
+        if self._rank and filename.isascii():
+            candidates.sort(key=self._rank.__getitem__)
+        for i in candidates:
+            match = self.patterns[i].match(filename)
+            if match:
+                return i, match
+        return None
+
+    def _memoize_shape(self, shape_: str, winner: Optional[int]) -> None:
+        """Memoize the winner, and the earlier patterns that could match the shape."""
+        if self._widened is None:
+            self._widened = [widen(p) for p in self.patterns]
+
+        to_try = []
+        for i in self._shape_trie.find(shape_):
+            if winner is not None and i >= winner:
+                break
+            widened = self._widened[i]
+            if not widened or widened.match(shape_):
+                to_try.append(i)
+        if winner is not None:
+            to_try.append(winner)
+
+        if len(self._shape_memo) < SHAPE_MEMO_SIZE:
+            self._shape_memo[shape_] = (winner, tuple(to_try))
+
+    def match(
+        self, filename: str, count_hit: bool = True
+    ) -> Optional[Tuple[int, Match[str]]]:
+        """Return the first matching pattern's index, and its match.
+
+        Pass `count_hit=False` for a lookahead (Ex: prefetching), so the
+        filename's hit is only counted when it's indexed.
+        """
+        found = self._match(filename)
+        if not count_hit:
+            return found
+        if found:
+            self.hits[found[0]] += 1
+        if self.adaptive:
+            self._matches_since_reorder += 1
+            if self._matches_since_reorder >= REORDER_INTERVAL:
+                self.reorder()
+        return found
+
+    def _match(self, filename: str) -> Optional[Tuple[int, Match[str]]]:
+        shape_ = shape(filename)
+        memoized = self._shape_memo.get(shape_)
+
+        if not memoized:
+            self.shape_memo_misses += 1
+            found = self._search(filename)
+            self._memoize_shape(shape_, found[0] if found else None)
+            return found
+
+        self.shape_memo_hits += 1
+        winner, to_try = memoized
+        for i in to_try:
+            match = self.patterns[i].match(filename)
+            if match:
+                return i, match
+        if winner is None:  # no other pattern could match
+            return None
+        return self._search(filename)  # the winner depends on the digits
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hits per pattern, most-hit first."""
+        order = sorted(range(len(self.patterns)), key=lambda i: (-self.hits[i], i))
+        return {self.patterns[i].pattern: self.hits[i] for i in order}
+
+
+def add_stats_to_yaml(stats: Dict[str, int], yaml_path: str) -> None:
+    """Add the hits per pattern to the YAML file's, most-hit first.
+
+    The update is locked (on a sidecar ".lock" file), so processes can
+    share the file. The file is replaced, not rewritten in place, so a
+    writer killed midway leaves the previous totals intact.
+    """
+    with open(f"{yaml_path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(yaml_path) as file:
+                totals: Dict[str, int] = yaml.safe_load(file) or {}
+        except FileNotFoundError:
+            totals = {}
+        for pattern, hits in stats.items():
+            totals[pattern] = totals.get(pattern, 0) + hits
+
+        fd, tmp_path = tempfile.mkstemp(
+            suffix=".tmp", dir=os.path.dirname(os.path.abspath(yaml_path))
+        )
+        try:
+            with open(fd, "w") as file:
+                yaml.safe_dump(
+                    dict(sorted(totals.items(), key=lambda kv: -kv[1])),
+                    file,
+                    sort_keys=False,
+                    width=2 ** 31,  # don't wrap long patterns
+                )
+            os.chmod(tmp_path, 0o644)  # mkstemp's is 0o600
+            os.replace(tmp_path, yaml_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+@functools.lru_cache(maxsize=8)
+def _get_matcher(patterns: Tuple[Union[str, Pattern[str]], ...]) -> PatternMatcher:
+    return PatternMatcher(patterns)
+
+
+def get_matcher(
+    patterns: Union[PatternMatcher, Sequence[Union[str, Pattern[str]]]]
+) -> PatternMatcher:
+    """Return a (cached) `PatternMatcher` for the patterns."""
+    if isinstance(patterns, PatternMatcher):
+        return patterns
+    return _get_matcher(tuple(patterns))
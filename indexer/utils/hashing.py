@@ -0,0 +1,151 @@
+"""Hash a file's contents with reusable buffers.
+
+Chunks are read with `readinto()` into preallocated buffers, so no bytes
+object is allocated (and copied) per chunk. Each chunk is also handed, as
+a `memoryview`, to any "consumers"--these must not hold on to the view,
+since its buffer is reused for the next chunk.
+
+Read modes:
+    - "readinto": one buffer, read then hash
+    - "mmap": hash straight out of the page cache (best for local disk)
+    - "overlap": two buffers, a background thread reads the next chunk
+      while the current one is hashed (hashlib releases the GIL)
+    - "auto": "overlap" for files spanning a few chunks, otherwise "readinto"
+"""
+
+
+import hashlib
+import io
+import mmap
+import os
+import queue
+import threading
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+from . import io_policy
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+HASH_MODES: Final[List[str]] = ["auto", "readinto", "mmap", "overlap"]
+
+Consumer = Callable[[memoryview], None]
+
+
+def _process(
+    sha: "hashlib._Hash", consumers: Sequence[Consumer], view: memoryview
+) -> None:
+    sha.update(view)
+    for consume in consumers:
+        consume(view)
+
+
+def _hash_readinto(
+    file: io.RawIOBase,
+    sha: "hashlib._Hash",
+    consumers: Sequence[Consumer],
+    bufsize: int,
+) -> None:
+    buf = bytearray(bufsize)
+    with memoryview(buf) as view:
+        while True:
+            n_bytes = file.readinto(view)
+            if not n_bytes:
+                return
+            with view[:n_bytes] as chunk:
+                _process(sha, consumers, chunk)
+
+
+def _hash_mmap(
+    file: io.RawIOBase,
+    sha: "hashlib._Hash",
+    consumers: Sequence[Consumer],
+    bufsize: int,
+) -> None:
+    fileno = file.fileno()
+    if not os.fstat(fileno).st_size:  # empty files can't be mapped
+        return
+    with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise"):  # py3.8+
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mapped) as view:
+            for i in range(0, len(view), bufsize):
+                with view[i : i + bufsize] as chunk:
+                    _process(sha, consumers, chunk)
+
+
+def _hash_overlap(
+    file: io.RawIOBase,
+    sha: "hashlib._Hash",
+    consumers: Sequence[Consumer],
+    bufsize: int,
+) -> None:
+    empties: "queue.Queue[Optional[bytearray]]" = queue.Queue()
+    fulls: "queue.Queue[Union[Tuple[bytearray, int], BaseException]]" = queue.Queue()
+    for _ in range(2):
+        empties.put(bytearray(bufsize))
+
+    def read_ahead() -> None:
+        try:
+            while True:
+                buf = empties.get()
+                if buf is None:  # the hashing side quit early
+                    return
+                n_bytes = file.readinto(buf)
+                fulls.put((buf, n_bytes))
+                if not n_bytes:
+                    return
+        except BaseException as e:  # pylint: disable=W0703
+            fulls.put(e)
+
+    reader = threading.Thread(target=read_ahead, daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = fulls.get()
+            if isinstance(item, BaseException):
+                raise item
+            buf, n_bytes = item
+            if not n_bytes:
+                return
+            with memoryview(buf) as view, view[:n_bytes] as chunk:
+                _process(sha, consumers, chunk)
+            empties.put(buf)
+    finally:
+        empties.put(None)
+        reader.join()
+
+
+_HASHERS = {
+    "readinto": _hash_readinto,
+    "mmap": _hash_mmap,
+    "overlap": _hash_overlap,
+}
+
+
+def sha512_file(
+    path: Union[str, "os.PathLike[str]"],
+    consumers: Sequence[Consumer] = (),
+    mode: str = "auto",
+    bufsize: int = 0,
+) -> str:
+    """Return the SHA512 checksum of the file, feeding each chunk to `consumers`.
+
+    If `bufsize` is not given, use the file's filesystem's read size (see
+    `io_policy.read_size()`).
+    """
+    if mode not in HASH_MODES:
+        raise ValueError(f"Invalid hash mode: {mode} (choose from {HASH_MODES})")
+
+    sha = hashlib.new("sha512")
+    with io_policy.open_sequential(path) as file:
+        if not bufsize:
+            bufsize = io_policy.read_size(file.fileno())
+        if mode == "auto":
+            big = os.fstat(file.fileno()).st_size > 2 * bufsize
+            mode = "overlap" if big else "readinto"
+        _HASHERS[mode](file, sha, consumers, bufsize)  # type: ignore[arg-type]
+    return sha.hexdigest()
@@ -0,0 +1,464 @@
+"""Streaming scanner for i3 frame streams (no icecube imports).
+
+Walks the I3Frame (v6) framing of a (possibly compressed) i3 byte
+stream, and collects the events summary (first/last event id & count)
+from each frame's `I3EventHeader`. Everything else is skipped without
+being deserialized.
+
+Bytes are pushed in (`I3FrameScanner.feed()`), so the same buffers used
+for checksumming a file can drive the scan--the file is only read once.
+Otherwise, `scan_file()` reads the file itself: seeking past every object
+but the header for an uncompressed file, or streaming it if compressed.
+
+Frame layout (little-endian):
+    "[i3]"                  4-byte tag
+    version                 uint32 (6)
+    stream                  1-byte stop id (Ex: b"P", b"Q")
+    n_entries               uint32
+    n_entries x:
+        key                 uint32 length + chars
+        type name           uint32 length + chars
+        buffer              uint32 length + serialized object
+    crc                     uint32
+
+The serialized `I3EventHeader` object (boost portable-binary archive) is
+not decoded field-by-field. Instead, `EventHeaderDecoder` learns where the
+event id lives from a reference (`dataio`) read, keyed by the archive's
+class-info preamble. Until it has, the scan only reports the event count.
+
+`dataio` mixes the keys of earlier frames into later ones (Ex: a Q frame's
+`I3EventHeader` into a P frame w/o its own), except after a frame's stream
+re-arrives (Ex: a new G frame drops the Q frames before it). So, a stream
+where a frame w/o an `I3EventHeader` may have one mixed in is not
+summarized (see `finish()`).
+
+This is only checked against real files where `icecube` is installed
+(see the tests), so the indexer only uses it with `--i3-frame-scan`.
+"""
+
+
+import bz2
+import io
+import logging
+import os
+import struct
+import zlib
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
+
+from file_catalog.schema import types
+
+from . import io_policy
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+_TAG: Final[bytes] = b"[i3]"
+_SUPPORTED_VERSION: Final[int] = 6
+_HEADER_SIZE: Final[int] = 13  # tag + version + stream + n_entries
+_UINT32 = struct.Struct("<I")
+_SEEK_SCAN_BUFSIZE: Final[int] = 262144  # 256 KiB, bigger objects are seeked past
+
+EVENT_HEADER_KEY: Final[bytes] = b"I3EventHeader"
+
+# the number of header buffers kept around for learning the decoder's layout
+N_LEARNING_SAMPLES: Final[int] = 64
+MIN_LEARNING_SAMPLES: Final[int] = 8  # fewer could match by coincidence
+
+
+class I3StreamError(Exception):
+    """Raised when an i3 byte stream cannot be scanned."""
+
+
+# --------------------------------------------------------------------------------------
+# Decompression
+
+
+class _Decompressor:
+    """Incremental decompressor, which handles multi-member/stream files."""
+
+    def __init__(self, factory: Callable[[], object]):
+        self._factory = factory
+        self._dcmp = factory()
+
+    def decompress(self, data: Union[bytes, memoryview]) -> bytes:
+        """Decompress `data`, restarting for each concatenated member."""
+        out = []
+        while data:
+            if getattr(self._dcmp, "eof", False):  # the previous member ended
+                self._dcmp = self._factory()
+            out.append(self._dcmp.decompress(data))  # type: ignore[attr-defined]
+            if not getattr(self._dcmp, "eof", False):
+                break
+            data = self._dcmp.unused_data  # type: ignore[attr-defined]
+        return b"".join(out)
+
+
+def _zstd_factory() -> Optional[Callable[[], object]]:
+    try:
+        import zstandard  # type: ignore[import]  # pylint: disable=C0415
+    except ImportError:
+        return None
+    return lambda: zstandard.ZstdDecompressor().decompressobj()
+
+
+def get_decompressor(
+    filename: str,
+) -> Optional[Callable[[Union[bytes, memoryview]], bytes]]:
+    """Return a streaming-decompress callable for the i3 file's extension.
+
+    Return `None` if the compression is not supported (here).
+    """
+    if filename.endswith(".i3"):
+        return bytes
+    if filename.endswith(".i3.gz"):
+        gzip_wbits = zlib.MAX_WBITS | 16
+        return _Decompressor(lambda: zlib.decompressobj(gzip_wbits)).decompress
+    if filename.endswith(".i3.bz2"):
+        return _Decompressor(bz2.BZ2Decompressor).decompress
+    if filename.endswith(".i3.zst"):
+        factory = _zstd_factory()
+        if not factory:
+            logging.debug("zstandard is not installed, cannot stream-scan .i3.zst")
+            return None
+        return _Decompressor(factory).decompress
+    return None
+
+
+# --------------------------------------------------------------------------------------
+# I3EventHeader decoding
+
+
+class EventHeaderDecoder:
+    """Find the event id in serialized `I3EventHeader` buffers.
+
+    The offset of the event id is learned per archive layout (see
+    `learn()`), where a layout is identified by the class-info preamble
+    which precedes the object's data.
+    """
+
+    def __init__(self) -> None:
+        self._offsets: Dict[bytes, int] = {}
+
+    @staticmethod
+    def _layout(buf: bytes) -> Optional[bytes]:
+        """Return the buffer's class-info preamble (export key + version)."""
+        i = buf.find(EVENT_HEADER_KEY)
+        if i < 0:
+            return None
+        return bytes(buf[: i + len(EVENT_HEADER_KEY) + 8])
+
+    def decode(self, buf: bytes) -> Optional[int]:
+        """Return the event id, or `None` if the layout is not (yet) known."""
+        offset = self._offsets.get(self._layout(buf) or b"")
+        if offset is None or len(buf) < offset + 4:
+            return None
+        return int(_UINT32.unpack_from(buf, offset)[0])
+
+    def learn(self, bufs: List[bytes], event_ids: List[int]) -> bool:
+        """Learn the event id offset(s) from `bufs` and their known `event_ids`.
+
+        Return `True` if every buffer's layout is now known.
+        """
+        if len(bufs) < MIN_LEARNING_SAMPLES or len(bufs) != len(event_ids):
+            return False
+
+        by_layout: Dict[bytes, List[int]] = {}
+        for i, buf in enumerate(bufs):
+            layout = self._layout(buf)
+            if layout is None:
+                return False
+            by_layout.setdefault(layout, []).append(i)
+
+        for layout, indexes in by_layout.items():
+            length = min(len(bufs[i]) for i in indexes)
+            for offset in range(len(layout), length - 3):
+                if all(
+                    _UINT32.unpack_from(bufs[i], offset)[0] == event_ids[i]
+                    for i in indexes
+                ):
+                    self._offsets[layout] = offset
+                    break
+            else:
+                return False
+        return True
+
+
+# --------------------------------------------------------------------------------------
+# Frame scanning
+
+
+class I3FrameScanner:  # pylint: disable=R0902
+    """Push-based scanner for the events summary of an i3 byte stream."""
+
+    def __init__(
+        self,
+        decompress: Callable[[Union[bytes, memoryview]], bytes],
+        decoder: EventHeaderDecoder,
+    ):
+        self._decompress = decompress
+        self._decoder = decoder
+        self._buf = bytearray()
+        self._pos = 0  # parse position in `_buf`
+        self._skip = 0  # bytes of a skipped object still to be discarded
+        self._state = "frame"
+        self._entries_left = 0
+        self._key = b""
+        self._frame_has_header = False
+        self._frame_stream = b""
+        self._last_frame_on: Dict[bytes, int] = {}  # {stream: frame number}
+        self._last_header_frame = 0
+
+        self.error: Optional[Exception] = None
+        self.n_frames = 0
+        self.event_count = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        self.undecoded = 0  # header buffers whose layout was not known
+        self.mixed_frames = 0  # frames w/o a header, that dataio would mix one into
+        self.samples: List[bytes] = []  # header buffers, for learning
+
+    @staticmethod
+    def for_file(
+        filename: str, decoder: EventHeaderDecoder
+    ) -> Optional["I3FrameScanner"]:
+        """Return a scanner for the file, if its compression is supported."""
+        decompress = get_decompressor(filename)
+        if not decompress:
+            return None
+        return I3FrameScanner(decompress, decoder)
+
+    def feed(self, raw: Union[bytes, memoryview]) -> None:
+        """Feed the next chunk of the raw (compressed) file.
+
+        `raw` is not referenced after returning, so it may be a reused buffer.
+        """
+        if self.error:
+            return
+        try:
+            self._feed_decompressed(self._decompress(raw))
+        except Exception as e:  # pylint: disable=W0703
+            self.error = e
+
+    def _feed_decompressed(self, data: bytes) -> None:
+        if self._skip:
+            if len(data) <= self._skip:
+                self._skip -= len(data)
+                return
+            data = data[self._skip :]
+            self._skip = 0
+        self._buf += data
+        self._parse()
+        del self._buf[: self._pos]  # compact once per chunk, not per item
+        self._pos = 0
+
+    def _take(self, size: int) -> Optional[bytes]:
+        if len(self._buf) - self._pos < size:
+            return None
+        chunk = bytes(self._buf[self._pos : self._pos + size])
+        self._pos += size
+        return chunk
+
+    def _take_sized(self) -> Optional[bytes]:
+        """Take a uint32-length-prefixed string, if it's all buffered."""
+        if len(self._buf) - self._pos < 4:
+            return None
+        size = _UINT32.unpack_from(self._buf, self._pos)[0]
+        if len(self._buf) - self._pos < 4 + size:
+            return None
+        chunk = bytes(self._buf[self._pos + 4 : self._pos + 4 + size])
+        self._pos += 4 + size
+        return chunk
+
+    def _next_entry(self) -> None:
+        self._entries_left -= 1
+        self._state = "key" if self._entries_left else "crc"
+
+    def _parse(self) -> None:  # pylint: disable=R0912
+        while True:
+            if self._state == "frame":
+                header = self._take(_HEADER_SIZE)
+                if header is None:
+                    return
+                if header[:4] != _TAG:
+                    raise I3StreamError(f"Bad frame tag: {header[:4]!r}")
+                version = _UINT32.unpack_from(header, 4)[0]
+                if version != _SUPPORTED_VERSION:
+                    raise I3StreamError(f"Unsupported frame version: {version}")
+                self._entries_left = _UINT32.unpack_from(header, 9)[0]
+                self.start_frame(header[8:9])
+                self._state = "key" if self._entries_left else "crc"
+
+            elif self._state == "key":
+                key = self._take_sized()
+                if key is None:
+                    return
+                self._key = key
+                self._state = "type"
+
+            elif self._state == "type":
+                if self._take_sized() is None:
+                    return
+                self._state = "object"
+
+            elif self._state == "object":
+                if self._key == EVENT_HEADER_KEY:
+                    obj = self._take_sized()
+                    if obj is None:
+                        return
+                    self.record_header(obj)
+                else:  # skip w/o buffering
+                    if len(self._buf) - self._pos < 4:
+                        return
+                    size = _UINT32.unpack_from(self._buf, self._pos)[0]
+                    available = len(self._buf) - self._pos - 4
+                    if available < size:
+                        self._skip = size - available
+                        self._pos = len(self._buf)
+                        self._next_entry()
+                        return
+                    self._pos += 4 + size
+                self._next_entry()
+
+            elif self._state == "crc":
+                if self._take(4) is None:
+                    return
+                self.end_frame()
+                self._state = "frame"
+
+    def start_frame(self, stream: bytes) -> None:
+        """Count the frame."""
+        self.n_frames += 1
+        self._frame_has_header = False
+        self._frame_stream = stream
+
+    def end_frame(self) -> None:
+        """Note if `dataio` would mix a header into the frame w/o one."""
+        last_on_stream = self._last_frame_on.get(self._frame_stream, 0)
+        if self._frame_has_header:
+            self._last_header_frame = self.n_frames
+        elif self._last_header_frame and (
+            self._frame_stream == b"P"
+            or not last_on_stream  # the stream's first frame
+            or last_on_stream > self._last_header_frame  # not dropped by its stream
+        ):
+            self.mixed_frames += 1
+        self._last_frame_on[self._frame_stream] = self.n_frames
+
+    def record_header(self, buf: bytes) -> None:
+        """Count the event & record its event id."""
+        self._frame_has_header = True
+        self.event_count += 1
+        if len(self.samples) < N_LEARNING_SAMPLES:
+            self.samples.append(buf)
+        event_id = self._decoder.decode(buf)
+        if event_id is None:
+            self.undecoded += 1
+            return
+        if self.first is None or event_id < self.first:
+            self.first = event_id
+        if self.last is None or event_id > self.last:
+            self.last = event_id
+
+    def finish(self) -> types.EventsData:
+        """Return the events summary of a completely scanned stream.
+
+        Raises `I3StreamError` if the stream could not be (fully) scanned,
+        including if any event ids could not be decoded, or if `dataio`
+        would count frames w/o their own header.
+        """
+        if self.error:
+            raise I3StreamError(f"Scan failed: {self.error!r}") from self.error
+        if len(self._buf) > self._pos or self._skip or self._state != "frame":
+            raise I3StreamError("Stream ended mid-frame")
+        if self.undecoded:
+            raise I3StreamError(
+                f"{self.undecoded} I3EventHeader(s) have an unknown layout"
+            )
+        if self.mixed_frames:
+            raise I3StreamError(
+                f"{self.mixed_frames} frame(s) w/o an I3EventHeader may have one mixed in"
+            )
+        return {
+            "first_event": self.first,
+            "last_event": self.last,
+            "event_count": self.event_count,
+            "status": "good",
+        }
+
+
+# --------------------------------------------------------------------------------------
+# Scanning a file directly
+
+
+def _read_exact(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise I3StreamError("Stream ended mid-frame")
+    return data
+
+
+def _read_sized(file: BinaryIO) -> bytes:
+    return _read_exact(file, _UINT32.unpack(_read_exact(file, 4))[0])
+
+
+def _scan_seekable(file: BinaryIO, scanner: I3FrameScanner) -> None:
+    """Walk the frames, only reading the event headers & seeking past the rest."""
+    file_size = os.fstat(file.fileno()).st_size
+    while True:
+        header = file.read(_HEADER_SIZE)
+        if not header:
+            return
+        if len(header) != _HEADER_SIZE:
+            raise I3StreamError("Stream ended mid-frame")
+        if header[:4] != _TAG:
+            raise I3StreamError(f"Bad frame tag: {header[:4]!r}")
+        version = _UINT32.unpack_from(header, 4)[0]
+        if version != _SUPPORTED_VERSION:
+            raise I3StreamError(f"Unsupported frame version: {version}")
+        scanner.start_frame(header[8:9])
+
+        for _ in range(_UINT32.unpack_from(header, 9)[0]):
+            key = _read_sized(file)
+            _read_sized(file)  # type name
+            size = _UINT32.unpack(_read_exact(file, 4))[0]
+            if key == EVENT_HEADER_KEY:
+                scanner.record_header(_read_exact(file, size))
+            else:
+                file.seek(size, io.SEEK_CUR)
+        _read_exact(file, 4)  # crc
+        scanner.end_frame()
+
+        if file.tell() > file_size:  # seeked beyond the end
+            raise I3StreamError("Stream ended mid-frame")
+
+
+def scan_file(path: str, decoder: EventHeaderDecoder) -> Optional[I3FrameScanner]:
+    """Scan the i3 file's frames for its events summary (see `finish()`).
+
+    Return `None` if the file's compression is not supported. Errors are
+    kept in the scanner's `error` (like with `I3FrameScanner.feed()`).
+    """
+    scanner = I3FrameScanner.for_file(os.path.basename(path), decoder)
+    if not scanner:
+        return None
+
+    try:
+        with io_policy.open_sequential(path) as raw:
+            if path.endswith(".i3"):
+                file = io.BufferedReader(raw, _SEEK_SCAN_BUFSIZE)
+                _scan_seekable(file, scanner)
+            else:
+                buf = bytearray(io_policy.read_size(raw.fileno()))
+                with memoryview(buf) as view:
+                    while True:
+                        n_bytes = raw.readinto(view)
+                        if not n_bytes:
+                            break
+                        with view[:n_bytes] as chunk:
+                            scanner.feed(chunk)
+    except Exception as e:  # pylint: disable=W0703
+        scanner.error = e
+    return scanner
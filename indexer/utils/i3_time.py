@@ -0,0 +1,139 @@
+"""Convert IceCube DAQ times (`I3Time`) to `datetime.datetime`, w/o icecube.
+
+An `I3Time` is a year plus a DAQ time: the number of 0.1 ns ticks since
+the start of the year (UTC). DAQ time counts every elapsed SI second,
+including leap seconds, so calendar times after a leap second are one
+second earlier than the naive `year start + DAQ time`.
+
+Like `I3Time.date_time`, datetimes are naive (UTC) and sub-microsecond
+ticks are truncated. A `datetime` can't represent a leap second itself
+(23:59:60), so an instant within one is clamped to 23:59:59.999999.
+"""
+
+
+import datetime
+import functools
+from typing import Iterable, List, Tuple
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+DAQ_TICKS_PER_SECOND: Final[int] = 10 ** 10
+_DAQ_TICKS_PER_MICROSECOND: Final[int] = 10 ** 4
+
+# the days at whose end (23:59:60 UTC) a leap second was inserted
+LEAP_SECOND_DAYS: Final[List[datetime.date]] = [
+    datetime.date(1972, 6, 30),
+    datetime.date(1972, 12, 31),
+    datetime.date(1973, 12, 31),
+    datetime.date(1974, 12, 31),
+    datetime.date(1975, 12, 31),
+    datetime.date(1976, 12, 31),
+    datetime.date(1977, 12, 31),
+    datetime.date(1978, 12, 31),
+    datetime.date(1979, 12, 31),
+    datetime.date(1981, 6, 30),
+    datetime.date(1982, 6, 30),
+    datetime.date(1983, 6, 30),
+    datetime.date(1985, 6, 30),
+    datetime.date(1987, 12, 31),
+    datetime.date(1989, 12, 31),
+    datetime.date(1990, 12, 31),
+    datetime.date(1992, 6, 30),
+    datetime.date(1993, 6, 30),
+    datetime.date(1994, 6, 30),
+    datetime.date(1995, 12, 31),
+    datetime.date(1997, 6, 30),
+    datetime.date(1998, 12, 31),
+    datetime.date(2005, 12, 31),
+    datetime.date(2008, 12, 31),
+    datetime.date(2012, 6, 30),
+    datetime.date(2015, 6, 30),
+    datetime.date(2016, 12, 31),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def leap_second_starts(year: int) -> Tuple[int, ...]:
+    """Return the DAQ seconds (since the year's start) when leap seconds began."""
+    starts: List[int] = []
+    for day in LEAP_SECOND_DAYS:
+        if day.year == year:
+            since_new_year = day - datetime.date(year, 1, 1) + datetime.timedelta(1)
+            # DAQ time also counted this year's earlier leap seconds
+            starts.append(int(since_new_year.total_seconds()) + len(starts))
+    return tuple(starts)
+
+
+def _to_utc_seconds(year: int, daq_seconds: int) -> Tuple[int, bool]:
+    """Return the UTC (leap-less) seconds since the year's start.
+
+    Also, return whether the instant is within a leap second.
+    """
+    in_leap_second = False
+    utc_seconds = daq_seconds
+    for start in leap_second_starts(year):
+        if daq_seconds > start:
+            utc_seconds -= 1
+        elif daq_seconds == start:
+            in_leap_second = True
+    return utc_seconds, in_leap_second
+
+
+def daq_time_to_datetime(year: int, daq_time: int) -> datetime.datetime:
+    """Convert an `I3Time`'s year & DAQ time to `datetime.datetime`."""
+    daq_seconds, ticks = divmod(daq_time, DAQ_TICKS_PER_SECOND)
+    utc_seconds, in_leap_second = _to_utc_seconds(year, daq_seconds)
+    if in_leap_second:
+        return datetime.datetime(year, 1, 1) + datetime.timedelta(
+            seconds=utc_seconds - 1, microseconds=999999
+        )
+    return datetime.datetime(year, 1, 1) + datetime.timedelta(
+        seconds=utc_seconds, microseconds=ticks // _DAQ_TICKS_PER_MICROSECOND
+    )
+
+
+def daq_times_to_datetimes(
+    years: Iterable[int], daq_times: Iterable[int]
+) -> List[datetime.datetime]:
+    """Convert many `I3Time`s' years & DAQ times to `datetime.datetime`s.
+
+    Use NumPy's `datetime64` arithmetic, if NumPy is installed.
+    """
+    years, daq_times = list(years), list(daq_times)
+    if len(years) != len(daq_times):
+        raise ValueError(
+            f"Mismatched lengths: {len(years)} years & {len(daq_times)} DAQ times"
+        )
+
+    try:
+        import numpy  # type: ignore[import] # pylint: disable=C0415
+    except ImportError:
+        return [daq_time_to_datetime(y, t) for y, t in zip(years, daq_times)]
+
+    years_arr = numpy.asarray(years, dtype=numpy.int64)
+    daq_seconds, ticks = numpy.divmod(
+        numpy.asarray(daq_times, dtype=numpy.int64), DAQ_TICKS_PER_SECOND
+    )
+    micros = ticks // _DAQ_TICKS_PER_MICROSECOND
+
+    utc_seconds = daq_seconds.copy()
+    in_leap_second = numpy.zeros(len(years), dtype=bool)
+    for year in set(years) & {d.year for d in LEAP_SECOND_DAYS}:
+        this_year = years_arr == year
+        for start in leap_second_starts(year):
+            utc_seconds -= this_year & (daq_seconds > start)
+            in_leap_second |= this_year & (daq_seconds == start)
+    utc_seconds -= in_leap_second
+    micros[in_leap_second] = 999999
+
+    new_years = (years_arr - 1970).astype("datetime64[Y]").astype("datetime64[us]")
+    datetimes = (
+        new_years
+        + utc_seconds.astype("timedelta64[s]")
+        + micros.astype("timedelta64[us]")
+    )
+    return list(datetimes.tolist())
@@ -0,0 +1,108 @@
+"""I/O policy for reading files: read sizes & page-cache hints.
+
+The indexer streams through each file once, so:
+    - reads are sized for the file's filesystem (Ex: a GPFS block or a
+      Lustre stripe, vs. a local disk's 4 KiB block),
+    - the kernel is told reads are sequential (more read-ahead),
+    - the next file in the queue is hinted to be read soon, and
+    - a finished file's pages are dropped from the page cache, so indexing
+      does not evict everyone else's cached data on a shared node.
+
+All hints are best-effort: they're skipped where `posix_fadvise` is not
+available, and errors are ignored.
+"""
+
+
+import io
+import logging
+import os
+import stat
+from typing import Dict, Optional, Union
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+MIN_READ_SIZE: Final[int] = 4194304  # 4 MiB
+MAX_READ_SIZE: Final[int] = 67108864  # 64 MiB
+PREFETCH_SIZE: Final[int] = 2 * MIN_READ_SIZE  # only hint the start of big files
+
+_read_sizes: Dict[int, int] = {}  # by st_dev
+_OPEN_FLAGS: Final[int] = (
+    os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_NONBLOCK", 0)
+)
+
+
+def read_size(fd: int) -> int:
+    """Return the read size for the open file, given its filesystem.
+
+    This is a multiple of the filesystem's preferred I/O size, and at least
+    `MIN_READ_SIZE` (but not beyond `MAX_READ_SIZE`).
+    """
+    fstat = os.fstat(fd)
+    st_dev = fstat.st_dev
+    if st_dev not in _read_sizes:
+        try:
+            preferred = max(fstat.st_blksize, os.fstatvfs(fd).f_bsize)
+        except (OSError, AttributeError):
+            preferred = 0
+        if preferred <= 0:
+            size = MIN_READ_SIZE
+        else:
+            size = preferred * -(-MIN_READ_SIZE // preferred)  # round up
+            size = min(size, max(MAX_READ_SIZE, preferred))
+        logging.debug(f"Read size for device {st_dev}: {size} bytes")
+        _read_sizes[st_dev] = size
+    return _read_sizes[st_dev]
+
+
+def _fadvise(fd: int, offset: int, length: int, advice_name: str) -> None:
+    advice = getattr(os, advice_name, None)
+    if advice is None or not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, offset, length, advice)
+    except OSError:
+        pass
+
+
+def open_sequential(
+    path: Union[str, "os.PathLike[str]"], buffered: bool = False
+) -> Union[io.FileIO, io.BufferedReader]:
+    """Open the file for reading start-to-finish.
+
+    Use `buffered=True` for readers making many small reads (Ex: `tarfile`).
+    """
+    file = io.FileIO(path, "rb")
+    _fadvise(file.fileno(), 0, 0, "POSIX_FADV_SEQUENTIAL")
+    if buffered:
+        return io.BufferedReader(file, buffer_size=read_size(file.fileno()))
+    return file
+
+
+def prefetch(path: str, lstat: Optional[os.stat_result] = None) -> None:
+    """Hint that the (start of the) regular file will be read soon."""
+    try:
+        if not stat.S_ISREG((lstat or os.lstat(path)).st_mode):
+            return
+        fd = os.open(path, _OPEN_FLAGS)
+    except OSError:
+        return
+    try:
+        _fadvise(fd, 0, PREFETCH_SIZE, "POSIX_FADV_WILLNEED")
+    finally:
+        os.close(fd)
+
+
+def evict(path: str) -> None:
+    """Hint that the file's cached pages are no longer needed."""
+    try:
+        fd = os.open(path, _OPEN_FLAGS)
+    except OSError:
+        return
+    try:
+        _fadvise(fd, 0, 0, "POSIX_FADV_DONTNEED")
+    finally:
+        os.close(fd)
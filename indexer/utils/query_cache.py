@@ -0,0 +1,248 @@
+"""Persistent read-through cache of (remote) query results, shared by jobs.
+
+Each query's result is pickled in a SQLite database (Ex: in a shared
+directory), keyed by the query's kind & key, along with when it was
+fetched. A result is fresh for its kind's TTL. Some exceptions (Ex:
+`DatasetNotFound`) can be cached too--"negative" results, with their own
+(usually shorter) TTL--so, a missing thing isn't re-queried by every job.
+
+Optionally, a stale result (up to `stale_while_revalidate` seconds past its
+TTL) is returned right away, while a background thread re-fetches it.
+
+A finished cache can also be compacted into a read-only `QueryBundle`
+(Ex: for cluster jobs that shouldn't query remotely at all).
+
+The database uses a rollback journal (not WAL), so jobs on different
+hosts can share it on a network filesystem (w/ working POSIX locks). For
+many jobs, prefer a `QueryBundle`, which needs no locking at all.
+
+Only point this at a database that's writable by trusted users--cached
+results are unpickled.
+"""
+
+
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Type, TypeVar
+
+from .sqlite_cache import SQLITE_TIMEOUT, SQLiteCache
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+T = TypeVar("T")
+
+NEGATIVE: Final[str] = "negative"  # the TTLs' key for cached exceptions
+
+
+class QueryCache(SQLiteCache):
+    """Look up, or fetch & store, query results by their kind & key.
+
+    Any database or unpickling error is logged and treated as a cache miss.
+    """
+
+    SCHEMA = """CREATE TABLE IF NOT EXISTS results (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        fetched REAL NOT NULL,
+        negative INTEGER NOT NULL,
+        result BLOB NOT NULL,
+        PRIMARY KEY (kind, key)
+    )"""
+
+    def __init__(  # pylint: disable=R0913
+        self,
+        db_path: str,
+        ttls: Dict[str, float],
+        negative_exceptions: Tuple[Type[Exception], ...] = (),
+        stale_while_revalidate: float = 0,
+    ):
+        super().__init__(db_path)
+        self.ttls = ttls  # {kind: seconds}, plus `NEGATIVE`
+        self.negative_exceptions = negative_exceptions
+        self.stale_while_revalidate = stale_while_revalidate
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._revalidating: Set[Tuple[str, str]] = set()
+        self._revalidating_lock = threading.Lock()
+        self._threads: Dict[Tuple[str, str], threading.Thread] = {}
+
+    def _lookup(self, kind: str, key: str) -> Optional[Tuple[float, bool, Any]]:
+        """Return the cached result's fetch time, negative-ness, & result."""
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT fetched, negative, result FROM results "
+                    "WHERE kind=? AND key=?",
+                    (kind, key),
+                )
+                .fetchone()
+            )
+            if not row:
+                return None
+            return row[0], bool(row[1]), pickle.loads(row[2])
+        except Exception as e:  # pylint: disable=W0703
+            logging.warning(f"Query cache ({self.db_path}) lookup failed: {e}")
+            return None
+
+    def _store(
+        self, conn: sqlite3.Connection, kind: str, key: str, negative: bool, result: Any
+    ) -> None:
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (
+                    kind,
+                    key,
+                    time.time(),
+                    int(negative),
+                    pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL),
+                ),
+            )
+        except Exception as e:  # pylint: disable=W0703
+            logging.warning(f"Query cache ({self.db_path}) insert failed: {e}")
+
+    def _fetch(
+        self, conn: sqlite3.Connection, kind: str, key: str, fetch: Callable[[], T]
+    ) -> T:
+        """Fetch & store the result (or a negative exception), then return it."""
+        try:
+            result = fetch()
+        except self.negative_exceptions as e:
+            self._store(conn, kind, key, True, e)
+            raise
+        self._store(conn, kind, key, False, result)
+        return result
+
+    def _revalidate(self, kind: str, key: str, fetch: Callable[[], Any]) -> None:
+        """Re-fetch & store the result, in the background."""
+
+        def revalidate() -> None:
+            # sqlite3 connections can't be shared across threads
+            conn = sqlite3.connect(
+                self.db_path, timeout=SQLITE_TIMEOUT, isolation_level=None
+            )
+            try:
+                self._fetch(conn, kind, key, fetch)
+                logging.debug(f"Revalidated query cache's {kind}/{key}.")
+            except Exception as e:  # pylint: disable=W0703
+                logging.warning(f"Could not revalidate query cache's {kind}/{key}: {e}")
+            finally:
+                conn.close()
+                with self._revalidating_lock:
+                    self._revalidating.discard((kind, key))
+
+        with self._revalidating_lock:
+            if (kind, key) in self._revalidating:
+                return
+            self._revalidating.add((kind, key))
+        thread = threading.Thread(target=revalidate, daemon=True)
+        self._threads = {k: t for k, t in self._threads.items() if t.is_alive()}
+        self._threads[(kind, key)] = thread
+        thread.start()
+
+    def is_fresh(self, kind: str, key: str) -> bool:
+        """Return whether the query's result is cached, & within its TTL."""
+        cached = self._lookup(kind, key)
+        if not cached:
+            return False
+        fetched, negative, _ = cached
+        return time.time() - fetched < self.ttls[NEGATIVE if negative else kind]
+
+    def get(self, kind: str, key: str, fetch: Callable[[], T]) -> T:
+        """Return the query's cached result, or fetch (& store) it.
+
+        A cached negative result is raised.
+        """
+        cached = self._lookup(kind, key)
+        if cached:
+            fetched, negative, result = cached
+            age = time.time() - fetched
+            ttl = self.ttls[NEGATIVE] if negative else self.ttls[kind]
+            if age < ttl:
+                self.hits += 1
+                if negative:
+                    raise result
+                return result  # type: ignore[no-any-return]
+            if not negative and age < ttl + self.stale_while_revalidate:
+                self.stale_hits += 1
+                self._revalidate(kind, key, fetch)
+                return result  # type: ignore[no-any-return]
+
+        self.misses += 1
+        return self._fetch(self._connection(), kind, key, fetch)
+
+    def close(self) -> None:
+        """Wait for any revalidations, then close the database connection."""
+        for thread in list(self._threads.values()):
+            thread.join()
+        self._threads.clear()
+        super().close()
+
+
+class QueryBundle:
+    """Answer queries only from a read-only snapshot of a `QueryCache`.
+
+    TTLs don't apply. Each process opens its own connection.
+    """
+
+    def __init__(self, db_path: str):
+        if not os.path.isfile(db_path):
+            raise FileNotFoundError(db_path)
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if not self._conn or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(
+                f"file:{self.db_path}?mode=ro&immutable=1",
+                uri=True,
+                check_same_thread=False,
+            )
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get(self, kind: str, key: str) -> Any:
+        """Return the query's result, or raise its negative result.
+
+        Raise `KeyError` if the query isn't in the bundle.
+        """
+        row = (
+            self._connection()
+            .execute(
+                "SELECT negative, result FROM results WHERE kind=? AND key=?",
+                (kind, key),
+            )
+            .fetchone()
+        )
+        if not row:
+            raise KeyError(f"{kind}/{key}")
+        if row[0]:
+            raise pickle.loads(row[1])
+        return pickle.loads(row[1])
+
+    def close(self) -> None:
+        """Close the database connection, if any."""
+        if self._conn and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+def compact(db_path: str, bundle_path: str) -> None:
+    """Write the cache's database as a single-file bundle, for `QueryBundle`."""
+    if os.path.exists(bundle_path):
+        os.remove(bundle_path)
+    conn = sqlite3.connect(db_path, timeout=SQLITE_TIMEOUT, isolation_level=None)
+    try:
+        conn.execute("VACUUM INTO ?", (bundle_path,))
+    finally:
+        conn.close()
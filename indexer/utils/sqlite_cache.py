@@ -0,0 +1,59 @@
+"""Base for the indexer's local SQLite-backed caches."""
+
+
+import os
+import sqlite3
+from typing import Optional
+
+try:
+    from typing import Final
+except ImportError:
+    from typing_extensions import Final  # type: ignore[misc]
+
+
+SQLITE_TIMEOUT: Final[int] = 60  # seconds, for waiting on other processes' writes
+
+
+class SQLiteCache:
+    """Hold a per-process connection to a SQLite database file.
+
+    Safe to share across worker processes: each process opens its own
+    connection (connections can't cross a fork). Within a process, the
+    connection may be used by any thread (SQLite serializes them).
+
+    The database uses a rollback journal, so it's also safe to share
+    across hosts (Ex: in a staging dir on a network filesystem). WAL needs
+    shared memory, so it only works for processes on one host; a cache
+    that's only ever local may set `JOURNAL_MODE = "WAL"`.
+    """
+
+    SCHEMA = ""  # "CREATE TABLE IF NOT EXISTS ..." statement(s)
+    JOURNAL_MODE = "DELETE"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this process's connection."""
+        if not self._conn or self._conn_pid != os.getpid():
+            self._conn = sqlite3.connect(
+                self.db_path,
+                timeout=SQLITE_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            self._conn.execute(f"PRAGMA journal_mode={self.JOURNAL_MODE}")
+            # NORMAL is only durable w/ WAL
+            synchronous = "NORMAL" if self.JOURNAL_MODE == "WAL" else "FULL"
+            self._conn.execute(f"PRAGMA synchronous={synchronous}")
+            self._conn.executescript(self.SCHEMA)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def close(self) -> None:
+        """Close the database connection, if any."""
+        if self._conn and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
@@ -9,13 +9,23 @@ from typing import Dict, Optional
 class FileInfo:  # pylint: disable=R0903
     """Wrapper around common file information.
 
-    Similar to os.DirEntry.
+    `stat()` is only called once, and a stat result already in hand (Ex:
+    from traversal's `os.lstat()`) can be given up front.
     """
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, stat_result: Optional[os.stat_result] = None):
         self.path = filepath
         self.name = os.path.basename(self.path)
-        self.stat = lambda: os.stat(self.path)
+        self._stat = stat_result
+
+    def stat(self) -> os.stat_result:
+        """Return the (cached) stat result.
+
+        Symbolic links are never indexed, so this is the same as an `lstat`.
+        """
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
 
 
 class IceCubeSeasonException(Exception):
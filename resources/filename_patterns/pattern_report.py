@@ -0,0 +1,215 @@
+"""Benchmark & analyze the indexer's filename-pattern lists.
+
+Run the /data/exp/ and /data/sim/ pattern lists, in order (first match
+wins), over the filenames of a traverse file (one filepath per line) or
+of the unit tests' fixtures. Report each pattern's match time and hits,
+the patterns never hit, the patterns fully shadowed by earlier ones, and
+the patterns at risk of excessive backtracking.
+
+Ex: python pattern_report.py --fixtures
+Ex: python pattern_report.py --traverse-file /data/user/eevans/data-sim-2020-12-03
+"""
+
+
+import argparse
+import ast
+import importlib.util
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterator, List, Optional, Pattern
+
+import coloredlogs  # type: ignore[import]
+import yaml
+from indexer.metadata.real import filename_patterns as exp_filename_patterns
+from indexer.metadata.simulation import filename_patterns as sim_filename_patterns
+from indexer.metadata.simulation.data_sim import DataSimI3FileMetadata
+from indexer.utils import filename_matching
+
+try:
+    from typing import TypedDict
+except ImportError:
+    from typing_extensions import TypedDict
+
+TESTS_DIR = os.path.join(os.path.dirname(__file__), "../../tests/unit/")
+SIM_FIXTURES = os.path.join(TESTS_DIR, "simulation/filepath_data.py")
+EXP_FIXTURES = os.path.join(TESTS_DIR, "real/test_data_exp_filename_parsing.py")
+
+EXP_LEVELS = ["L2", "PFFilt", "PFDST", "PFRaw"]  # in order of precedence
+
+
+class _PatternStats(TypedDict):
+    pattern: str
+    tries: int
+    hits: int
+    ns: int  # total match time
+
+
+class PatternList:
+    """An ordered pattern list, and its stats."""
+
+    def __init__(self, name: str, patterns: List[str]):
+        self.name = name
+        self.patterns: List[Pattern[str]] = [re.compile(p) for p in patterns]
+        self.stats: List[_PatternStats] = [
+            {"pattern": p, "tries": 0, "hits": 0, "ns": 0} for p in patterns
+        ]
+
+    def match(self, filename: str, repeat: int) -> Optional[int]:
+        """Return the index of the first matching pattern, timing each tried."""
+        for i, pattern in enumerate(self.patterns):
+            start = time.perf_counter_ns()
+            for _ in range(repeat):
+                match = pattern.match(filename)
+            self.stats[i]["ns"] += (time.perf_counter_ns() - start) // repeat
+            self.stats[i]["tries"] += 1
+            if match:
+                self.stats[i]["hits"] += 1
+                return i
+        return None
+
+    def report(self, top: int) -> Dict[str, object]:
+        """Log & return the report."""
+        total_ns = sum(s["ns"] for s in self.stats)
+        logging.info(
+            f"== {self.name}: {len(self.patterns)} patterns,"
+            f" {sum(s['hits'] for s in self.stats)} hits, {total_ns / 1e6:.2f} ms"
+        )
+
+        by_time = sorted(range(len(self.stats)), key=lambda i: -self.stats[i]["ns"])
+        for i in by_time[:top]:
+            stats = self.stats[i]
+            per_try = stats["ns"] / stats["tries"] / 1e3 if stats["tries"] else 0
+            logging.info(
+                f"#{i:<4} {stats['ns'] / 1e6:8.2f} ms ({per_try:6.2f} us/try)"
+                f" {stats['hits']:>7} hits - {stats['pattern']}"
+            )
+
+        never_hit = [i for i, s in enumerate(self.stats) if not s["hits"]]
+        logging.info(f"Never hit: {len(never_hit)} patterns {never_hit}")
+
+        matcher = filename_matching.PatternMatcher(self.patterns)
+        shadowed, unsure = {}, []
+        for i in range(len(self.patterns)):
+            shadowed_by = matcher.shadowed_by(i)
+            if shadowed_by is None:
+                unsure.append(i)
+            elif shadowed_by:
+                shadowed[i] = shadowed_by
+                logging.warning(
+                    f"#{i} is shadowed by {shadowed_by} - {self.patterns[i].pattern}"
+                )
+        if unsure:
+            logging.info(f"Shadowing unknown (unsupported regex): {unsure}")
+
+        risks = {}
+        for i, pattern in enumerate(self.patterns):
+            risks_ = filename_matching.backtracking_risks(pattern)
+            if risks_:
+                risks[i] = risks_
+                logging.warning(f"#{i} {', '.join(risks_)} - {pattern.pattern}")
+
+        return {
+            "stats": self.stats,
+            "never_hit": never_hit,
+            "shadowed": shadowed,
+            "shadowing_unknown": unsure,
+            "backtracking_risks": risks,
+        }
+
+
+def _fixture_filepaths() -> Iterator[str]:
+    """Yield the filenames in the unit tests' fixtures."""
+    spec = importlib.util.spec_from_file_location("filepath_data", SIM_FIXTURES)
+    if not spec or not spec.loader:
+        raise ImportError(f"Can't load {SIM_FIXTURES}")
+    filepath_data = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(filepath_data)
+    yield from filepath_data.EXAMPLES.keys()  # type: ignore[attr-defined]
+
+    # the exp filenames are literals in the tests
+    with open(EXP_FIXTURES) as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            if re.fullmatch(r"[\w.\-]+\.(i3|tar)[\w.]*", node.value):
+                yield f"/data/exp/{node.value}"
+
+
+def _traverse_filepaths(traverse_file: str) -> Iterator[str]:
+    with open(traverse_file) as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+
+def main() -> None:
+    """Benchmark & analyze the filename patterns."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark & analyze the /data/exp/ and /data/sim/ filename"
+        " patterns: per-pattern match time & hits, never-hit patterns, patterns"
+        " shadowed by earlier ones, and excessive-backtracking risks",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--traverse-file", help="a file of filepaths, one per line (Ex: a chunk)"
+    )
+    source.add_argument(
+        "--fixtures",
+        default=False,
+        action="store_true",
+        help="use the unit tests' example filenames",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="times to repeat each match, for timing"
+    )
+    parser.add_argument(
+        "--top", type=int, default=20, help="number of slowest patterns to list"
+    )
+    parser.add_argument("--yaml", default="", help="also write the report to a file")
+    parser.add_argument("-l", "--log", default="INFO", help="the output logging level")
+    args = parser.parse_args()
+    coloredlogs.install(level=args.log)
+
+    exp_bases = PatternList(
+        "/data/exp/ base patterns",
+        [getattr(exp_filename_patterns, lvl)["base_pattern"] for lvl in EXP_LEVELS],
+    )
+    exp_levels = [
+        PatternList(
+            f"/data/exp/ {lvl} patterns",
+            getattr(exp_filename_patterns, lvl)["patterns"],
+        )
+        for lvl in EXP_LEVELS
+    ]
+    sim = PatternList("/data/sim/ patterns", sim_filename_patterns.regex_patterns)
+
+    filepaths = (
+        _fixture_filepaths()
+        if args.fixtures
+        else _traverse_filepaths(args.traverse_file)
+    )
+    count = 0
+    for count, filepath in enumerate(filepaths, start=1):
+        filename = os.path.basename(filepath)
+        # like MetadataManager, route by the filepath
+        if filepath.startswith("/data/exp/"):
+            level = exp_bases.match(filename, args.repeat)
+            if level is not None:
+                exp_levels[level].match(filename, args.repeat)
+        elif filepath.startswith("/data/sim/"):
+            if DataSimI3FileMetadata.is_valid_filename(filename):
+                sim.match(filename, args.repeat)
+    logging.info(f"Matched {count} filepaths.")
+
+    report = {pl.name: pl.report(args.top) for pl in [exp_bases, *exp_levels, sim]}
+    if args.yaml:
+        with open(args.yaml, "w") as f:
+            yaml.safe_dump(report, f, sort_keys=False)
+        logging.info(f"Wrote report to {args.yaml}.")
+
+
+if __name__ == "__main__":
+    main()
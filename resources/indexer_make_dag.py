@@ -37,7 +37,10 @@ class IndexerArgs(TypedDict):
     cpus: int
     iceprodv2_rc_token: str
     iceprodv1_db_pass: str
+    iceprod_bundle: str
+    iceprod_bulk_tasks: bool
     dryrun_indexer: bool
+    checksum_cache_xattr: bool
 
 
 # --------------------------------------------------------------------------------------
@@ -104,10 +107,17 @@ def make_condor_file(
                 transfer_input_files.append(indexer_args["blacklist"])
 
             # /data/sim/-type arguments
-            if indexer_args["iceprodv1_db_pass"] and indexer_args["iceprodv2_rc_token"]:
+            if indexer_args["iceprod_bundle"]:  # jobs won't connect to IceProd
+                sim_args = f"--iceprod-bundle {indexer_args['iceprod_bundle']}"
+                transfer_input_files.append(indexer_args["iceprod_bundle"])
+            elif (
+                indexer_args["iceprodv1_db_pass"] and indexer_args["iceprodv2_rc_token"]
+            ):
                 sim_args = f"--iceprodv1-db-pass {indexer_args['iceprodv1_db_pass']} --iceprodv2-rc-token {indexer_args['iceprodv2_rc_token']}"
             else:
                 sim_args = ""
+            if sim_args and indexer_args["iceprod_bulk_tasks"]:
+                sim_args += " --iceprod-bulk-tasks"
 
             # --timeout & --retries
             timeout_retries_args = ""
@@ -118,6 +128,9 @@ def make_condor_file(
 
             # flags
             dryrun = "--dryrun" if indexer_args["dryrun_indexer"] else ""
+            checksum_cache = (
+                "--checksum-cache-xattr" if indexer_args["checksum_cache_xattr"] else ""
+            )
 
             # write executable
             executable = make_executable(path_to_virtualenv)
@@ -125,7 +138,7 @@ def make_condor_file(
             # write
             file.write(
                 f"""executable = {os.path.abspath(executable)}
-arguments = python {os.path.abspath(indexer_args['path_to_indexer'])} -s WIPAC --paths-file $(PATHS_FILE) -t {indexer_args['token']} {timeout_retries_args} {blacklist_arg} --log INFO --processes {indexer_args['cpus']} {sim_args} {dryrun}
+arguments = python {os.path.abspath(indexer_args['path_to_indexer'])} -s WIPAC --paths-file $(PATHS_FILE) -t {indexer_args['token']} {timeout_retries_args} {blacklist_arg} --log INFO --processes {indexer_args['cpus']} {sim_args} {dryrun} {checksum_cache}
 output = {scratch}/$(JOBNUM).out
 error = {scratch}/$(JOBNUM).err
 log = {scratch}/$(JOBNUM).log
@@ -303,6 +316,26 @@ def main() -> None:
     )
     parser.add_argument("--iceprodv2-rc-token", default="", help="IceProd2 REST token")
     parser.add_argument("--iceprodv1-db-pass", default="", help="IceProd1 SQL password")
+    parser.add_argument(
+        "--iceprod-bundle",
+        type=get_full_path,
+        help="offline IceProd bundle (from resources/make_iceprod_bundle.py) to "
+        "transfer to each job, instead of giving jobs IceProd credentials",
+    )
+    parser.add_argument(
+        "--iceprod-bulk-tasks",
+        default=False,
+        action="store_true",
+        help="have the indexer get each IceProd2 dataset's tasks in one request "
+        "(make the bundle, if any, w/ `--bulk-tasks` too)",
+    )
+    parser.add_argument(
+        "--checksum-cache-xattr",
+        default=False,
+        action="store_true",
+        help="have the indexer cache checksums in each file's `user.` xattrs, "
+        "so re-running the DAG does not re-hash unchanged files",
+    )
 
     args = parser.parse_args()
     for arg, val in vars(args).items():
@@ -335,7 +368,10 @@ def main() -> None:
         "cpus": args.cpus,
         "iceprodv2_rc_token": args.iceprodv2_rc_token,
         "iceprodv1_db_pass": args.iceprodv1_db_pass,
+        "iceprod_bundle": args.iceprod_bundle,
+        "iceprod_bulk_tasks": args.iceprod_bulk_tasks,
         "dryrun_indexer": args.dryrun_indexer,
+        "checksum_cache_xattr": args.checksum_cache_xattr,
     }
     make_condor_file(
         scratch, args.memory, indexer_args, args.path_to_virtualenv, args.local_storage
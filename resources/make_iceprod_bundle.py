@@ -0,0 +1,137 @@
+"""Make an offline IceProd bundle for the /data/sim/ files in paths files.
+
+Query IceProd (v1 & v2) for exactly what indexing the files needs--the
+steering parameters, dataset list, job configs, & task tables--then write
+it all to one compact, read-only SQLite file. Run this before submitting
+the DAG; then, jobs given `--iceprod-bundle` never connect to IceProd.
+
+Ex: python make_iceprod_bundle.py --dir-of-paths-files ./paths/
+    --iceprodv1-db-pass *** --iceprodv2-rc-token *** --out iceprod-bundle.sqlite
+"""
+
+
+import argparse
+import logging
+import os
+import stat
+import tempfile
+from collections import Counter
+from typing import Iterator, List, Set, Tuple
+
+import coloredlogs  # type: ignore[import]
+from indexer import classification
+from indexer.metadata.simulation import iceprod_tools
+from indexer.utils import query_cache
+
+
+def _sim_filepaths(paths_files: List[str]) -> Iterator[str]:
+    for paths_file in paths_files:
+        with open(paths_file) as f:
+            for line in f:
+                if line.startswith("/data/sim/"):
+                    yield line.strip()
+
+
+def query_all(
+    iceprod_conn: iceprod_tools.IceProdConnection,
+    filepaths: Iterator[str],
+    processes: int,
+) -> "Counter[str]":
+    """Make every IceProd query that indexing the filepaths would."""
+    counts: "Counter[str]" = Counter()
+    queried: Set[Tuple[int, int]] = set()
+
+    classifications = list(classification.classify_paths(filepaths, processes))
+    iceprod_tools.prefetch_iceprod1_steering_params(
+        iceprod_conn,
+        (
+            c.parsed_ids[0]
+            for c in classifications
+            if c.kind == classification.Kind.SIMULATION
+            and c.parsed_ids
+            and c.parsed_ids[0] is not None
+        ),
+    )
+
+    for c in classifications:
+        if c.kind != classification.Kind.SIMULATION or not c.parsed_ids:
+            counts["skipped"] += 1
+            continue
+        dataset_num, job_index = c.parsed_ids
+        # files from the same job make the same queries
+        if dataset_num is not None and job_index is not None:
+            if (dataset_num, job_index) in queried:
+                counts["same job"] += 1
+                continue
+            queried.add((dataset_num, job_index))
+
+        try:
+            iceprod_tools.get_steering_params_and_ip_metadata(
+                dataset_num, c.path, job_index, iceprod_conn
+            )
+            counts["queried"] += 1
+        except iceprod_tools.DatasetNotFound:
+            counts["dataset not found"] += 1
+        except Exception as e:  # pylint: disable=W0703
+            logging.warning(f"Could not query for {c.path}: {e}")
+            counts["errors"] += 1
+
+    return counts
+
+
+def main() -> None:
+    """Query IceProd, then write the bundle."""
+    parser = argparse.ArgumentParser(
+        description="Make an offline IceProd bundle with everything needed to index "
+        "the /data/sim/ files in the paths files, for the indexer's --iceprod-bundle",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--dir-of-paths-files",
+        help="the directory containing the paths files, one per job (Ex: chunks)",
+    )
+    source.add_argument("--paths-files", nargs="+", help="the paths files")
+    parser.add_argument("--out", required=True, help="the bundle file to write")
+    parser.add_argument("--iceprodv2-rc-token", required=True, help="IceProd2 token")
+    parser.add_argument(
+        "--iceprodv1-db-pass", required=True, help="IceProd1 SQL password"
+    )
+    parser.add_argument(
+        "--bulk-tasks",
+        default=False,
+        action="store_true",
+        help="record each IceProd2 dataset's tasks in one query, for jobs run w/ "
+        "--iceprod-bulk-tasks",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1, help="processes for classifying paths"
+    )
+    parser.add_argument("-l", "--log", default="INFO", help="the output logging level")
+    args = parser.parse_args()
+    coloredlogs.install(level=args.log)
+
+    if args.dir_of_paths_files:
+        paths_files = sorted(p.path for p in os.scandir(args.dir_of_paths_files))
+    else:
+        paths_files = args.paths_files
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # record exactly the queries made, then compact them into the bundle
+        iceprod_conn = iceprod_tools.IceProdConnection(
+            args.iceprodv1_db_pass,
+            args.iceprodv2_rc_token,
+            cache_path=os.path.join(tmpdir, "queries.sqlite"),
+            bulk_tasks=args.bulk_tasks,
+        )
+        counts = query_all(iceprod_conn, _sim_filepaths(paths_files), args.processes)
+        iceprod_conn.close()
+        logging.info(f"Files: {dict(counts)}")
+
+        query_cache.compact(os.path.join(tmpdir, "queries.sqlite"), args.out)
+    os.chmod(args.out, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    logging.info(f"Wrote {args.out} ({os.path.getsize(args.out)} bytes).")
+
+
+if __name__ == "__main__":
+    main()
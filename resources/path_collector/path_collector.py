@@ -9,16 +9,19 @@ Currently the process of fast-forwarding is convoluted if
 the use case is anything other than a condor restart.
 """
 
+import collections
+import itertools
 import logging
 import os
 import shutil
 import subprocess
 import sys
 from datetime import datetime as dt
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
 import bitmath  # type: ignore[import]
 import coloredlogs  # type: ignore[import]
+import yaml
 
 sys.path.append(".")
 from common_args import (  # isort:skip  # noqa # pylint: disable=E0401,C0413,C0411
@@ -125,7 +128,32 @@ def _get_chunks_dir(traverse_staging_dir: str) -> str:
     return os.path.join(traverse_staging_dir, "traverse-chunks/")
 
 
-def _chunk(traverse_staging_dir: str, chunk_size: int, traverse_file: str) -> None:
+def _get_chunks_classes_file(traverse_staging_dir: str) -> str:
+    return os.path.join(traverse_staging_dir, "traverse-chunks.yaml")
+
+
+def _classify(traverse_file: str, workers: int) -> Iterator[List[str]]:
+    """Yield each filepath's annotations (cost class & processing level)."""
+    from indexer import classification  # pylint: disable=C0415
+
+    with open(traverse_file, "r") as f:
+        for classified in classification.classify_paths(
+            (ln.strip() for ln in f), processes=workers
+        ):
+            annotations = [f"cost:{classified.cost_class.value}"]
+            if classified.processing_level:
+                annotations.append(f"level:{classified.processing_level.value}")
+            if classified.parsed_ids is None and classified.processing_level:
+                annotations.append("unknown-format")
+            yield annotations
+
+
+def _chunk(
+    traverse_staging_dir: str,
+    chunk_size: int,
+    traverse_file: str,
+    classify_workers: int = 0,
+) -> None:
     """Chunk the traverse file up by approx equal aggregate file size.
 
     Assumes: `chunk_size` >> any one file's size
@@ -136,6 +164,10 @@ def _chunk(traverse_staging_dir: str, chunk_size: int, traverse_file: str) -> No
 
     Example:
     `traverse_staging_dir/chunks/chunk-1645`
+
+    If `classify_workers`, also classify each filepath (like the indexer
+    will) and write each chunk's counts of cost classes & processing
+    levels to `traverse_staging_dir/traverse-chunks.yaml`.
     """
     chunks_dir = _get_chunks_dir(traverse_staging_dir)
 
@@ -152,17 +184,32 @@ def _chunk(traverse_staging_dir: str, chunk_size: int, traverse_file: str) -> No
         id_: int
         size: int
         lines: List[str]
+        classes: "collections.Counter[str]"
+
+    chunks_classes: Dict[str, Dict[str, Any]] = {}
 
     def _write_chunk_file(chunk: _Chunk) -> str:
         fname = f"chunk-{chunk['id_']}"
         with open(os.path.join(chunks_dir, fname), "w") as chunk_f:
             chunk_f.writelines(chunk["lines"])
+        if classify_workers:
+            chunks_classes[fname] = {
+                "size": chunk["size"],
+                "paths": len(chunk["lines"]),
+                **dict(sorted(chunk["classes"].items())),
+            }
         return fname
 
-    chunk: _Chunk = {"id_": 1, "size": 0, "lines": []}
+    classifications: Iterator[List[str]] = (
+        _classify(traverse_file, classify_workers)
+        if classify_workers
+        else itertools.repeat([])
+    )
+
+    chunk: _Chunk = {"id_": 1, "size": 0, "lines": [], "classes": collections.Counter()}
     total_f_size = 0
     with open(traverse_file, "r") as f:
-        for fpath_line in f:
+        for fpath_line, annotations in zip(f, classifications):
             try:
                 f_size = int(os.stat(fpath_line.strip()).st_size)
             except FileNotFoundError:
@@ -172,6 +219,7 @@ def _chunk(traverse_staging_dir: str, chunk_size: int, traverse_file: str) -> No
                 continue
             # append & increment
             chunk["lines"].append(fpath_line)
+            chunk["classes"].update(annotations)
             chunk["size"] += f_size
             total_f_size += f_size
             # time to chunk?
@@ -179,11 +227,24 @@ def _chunk(traverse_staging_dir: str, chunk_size: int, traverse_file: str) -> No
                 _write_chunk_file(chunk)
                 # reset for next chunking
                 next_id = chunk["id_"] + 1
-                chunk = {"id_": next_id, "size": 0, "lines": []}
+                chunk = {
+                    "id_": next_id,
+                    "size": 0,
+                    "lines": [],
+                    "classes": collections.Counter(),
+                }
     # chunk whatever is left over
     if chunk["lines"]:
         _write_chunk_file(chunk)
 
+    if classify_workers:
+        with open(_get_chunks_classes_file(traverse_staging_dir), "w") as classes_f:
+            yaml.safe_dump(chunks_classes, classes_f, sort_keys=False)
+        logging.info(
+            f"Wrote chunks' classifications @"
+            f" {_get_chunks_classes_file(traverse_staging_dir)}."
+        )
+
     logging.info(
         f"Chunked traverse into {chunk['id_']} chunk-files"
         f" ~{bitmath.best_prefix(chunk_size).format('{value:.2f} {unit}')}"
@@ -223,6 +284,7 @@ def write_all_filepaths_to_files(  # pylint: disable=R0913
     chunk_size: int,
     excluded_paths: List[str],
     ff_traverse_file: Optional[str],
+    classify: bool = False,
 ) -> None:
     """Write all filepaths (rooted from `traverse_root`) to multiple files."""
     traverse_staging_dir = _get_traverse_staging_dir(staging_dir, traverse_root)
@@ -275,7 +337,7 @@ def write_all_filepaths_to_files(  # pylint: disable=R0913
         raise RuntimeError(f"Unknown type of fast-forward file {ff_traverse_file}")
 
     logging.info(f"Chunking {fname}...")
-    _chunk(traverse_staging_dir, chunk_size, fname)
+    _chunk(traverse_staging_dir, chunk_size, fname, workers if classify else 0)
 
     # cleanup
     logging.warning("Cleaning up. Deleting traverse.* files...")
@@ -310,6 +372,10 @@ def _figure_fast_forwarding(traverse_staging_dir: str) -> str:
     if os.path.exists(_get_chunks_dir(traverse_staging_dir)):
         logging.warning(f"rm -r {_get_chunks_dir(traverse_staging_dir)}...")
         shutil.rmtree(_get_chunks_dir(traverse_staging_dir))
+    # rm traverse-chunks.yaml
+    if os.path.exists(_get_chunks_classes_file(traverse_staging_dir)):
+        logging.warning(f"rm {_get_chunks_classes_file(traverse_staging_dir)}...")
+        os.remove(_get_chunks_classes_file(traverse_staging_dir))
     # rm *.tmp
     for fpath in [
         os.path.join(traverse_staging_dir, fn)
@@ -373,6 +439,13 @@ def main() -> None:
         help="max number of workers. **Potentially bypassed if also using --fast-forward**",
         required=True,
     )
+    parser.add_argument(
+        "--classify",
+        default=False,
+        action="store_true",
+        help="also classify each filepath (like the indexer will) and count each"
+        " chunk's cost classes & processing levels (needs the indexer package)",
+    )
     args = parser.parse_args()
     # print args
     for arg, val in vars(args).items():
@@ -405,6 +478,7 @@ def main() -> None:
         args.chunk_size,
         args.exclude,
         ff_traverse_file,
+        args.classify,
     )
 
     logging.info("Done.")
@@ -0,0 +1,92 @@
+"""Test the persistent checksum cache."""
+
+# pylint: disable=W0212
+
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from indexer.metadata.basic import BasicFileMetadata
+from indexer.metadata_manager import MetadataManager
+from indexer.utils import checksum_cache, utils
+
+
+def _touch(path: Path, data: bytes) -> str:
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_sqlite(tmp_path: Path) -> None:
+    """Test that a cached checksum is only used for an unchanged file."""
+    fpath = _touch(tmp_path / "foo", b"abc")
+    cache = checksum_cache.ChecksumCache(str(tmp_path / "cache.sqlite"))
+
+    assert cache.get(fpath, os.stat(fpath)) is None
+    cache.put(fpath, os.stat(fpath), "bar")
+    assert cache.get(fpath, os.stat(fpath)) == "bar"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a new connection (Ex: the next run) sees the entry
+    cache.close()
+    assert checksum_cache.ChecksumCache(cache.db_path).get(fpath, os.stat(fpath))
+
+    # modified -> invalidated
+    st = os.stat(fpath)
+    os.utime(fpath, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert cache.get(fpath, os.stat(fpath)) is None
+
+
+def test_sqlite_journal_mode(tmp_path: Path) -> None:
+    """Test that the database doesn't use WAL, even if it was created w/ it."""
+    db_path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")  # Ex: by an older version
+    conn.close()
+
+    cache = checksum_cache.ChecksumCache(db_path)
+    cache.put(_touch(tmp_path / "foo", b"abc"), os.stat(tmp_path / "foo"), "bar")
+    journal_mode = cache._connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "delete"  # WAL needs a single host's shared memory
+    assert not Path(f"{db_path}-wal").exists()
+
+
+def test_xattr(tmp_path: Path) -> None:
+    """Test the xattr backend, where supported."""
+    fpath = _touch(tmp_path / "foo", b"abc")
+    try:
+        os.setxattr(fpath, "user.test", b"")
+    except (OSError, AttributeError):
+        pytest.skip("user xattrs are not supported here")
+
+    cache = checksum_cache.ChecksumCache(use_xattr=True)
+    cache.put(fpath, os.stat(fpath), "bar")
+    assert cache.get(fpath, os.stat(fpath)) == "bar"
+
+    _touch(tmp_path / "foo", b"abcd")
+    assert cache.get(fpath, os.stat(fpath)) is None
+
+
+def test_basic_metadata_uses_cache(tmp_path: Path) -> None:
+    """Test that BasicFileMetadata only hashes on a cache miss."""
+    fpath = _touch(tmp_path / "foo", b"abc" * 1000)
+    sha512 = hashlib.sha512(b"abc" * 1000).hexdigest()
+    manager = MetadataManager(
+        "WIPAC", basic_only=True, checksum_cache_path=str(tmp_path / "c.sqlite")
+    )
+
+    # miss -> hash & store
+    metadata_file = manager.new_file(fpath)
+    assert metadata_file.checksum_cache is manager.checksum_cache
+    assert metadata_file.sha512sum() == sha512
+
+    # hit -> no hashing
+    with patch.object(BasicFileMetadata, "_hash_file") as hash_file:
+        assert manager.new_file(fpath).sha512sum() == sha512
+        hash_file.assert_not_called()
+
+    # no cache
+    metadata_file = BasicFileMetadata(utils.FileInfo(fpath), "WIPAC")
+    assert metadata_file.sha512sum() == sha512
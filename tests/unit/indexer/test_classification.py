@@ -0,0 +1,91 @@
+"""Test classifying file paths in batches."""
+
+from typing import Iterator, List
+
+import pytest
+from indexer import classification
+from indexer.classification import Classification, CostClass, Kind
+from indexer.utils import utils
+
+L2_DIR = "/data/exp/IceCube/2018/filtered/level2/0820/Run00131410/"
+SIM_DIR = "/data/sim/IceCube/2016/filtered/level2/CORSIKA-in-ice/20263/0000000-0000999/"
+
+CLASSIFICATIONS: List[Classification] = [
+    Classification(
+        L2_DIR + "Level2_IC86.2018_data_Run00131410_Subrun00000000_00000001.i3.zst",
+        Kind.REAL,
+        utils.ProcessingLevel.L2,
+        (2018, 131410, 0, 1),
+    ),
+    Classification(  # a known processing level, but not a known format
+        L2_DIR + "Level2_IC86.2018_data_Run00131410_test1.i3.zst",
+        Kind.REAL,
+        utils.ProcessingLevel.L2,
+        None,
+    ),
+    Classification(
+        L2_DIR + "Level2_IC86.2018_data_Run00131410_0101_71_375_GCD.i3.zst",
+        Kind.BASIC,
+        None,
+        None,
+    ),
+    Classification(
+        "/data/exp/IceCube/2018/unbiased/PFRaw/0820/"
+        "ukey_05815dd9-2411-468c-9bd5-e99b8f759efd_PFRaw_RandomFiltering"
+        "_Run00130470_Subrun00000060_00000000.tar.gz",
+        Kind.REAL,
+        utils.ProcessingLevel.PFRaw,
+        (None, 130470, 60, 0),
+    ),
+    Classification(
+        SIM_DIR + "Level2_IC86.2016_corsika.020263.000001.i3.zst",
+        Kind.SIMULATION,
+        utils.ProcessingLevel.L2,
+        (20263, 1),
+    ),
+    Classification(SIM_DIR + "Level2_IC86.2016.log", Kind.BASIC, None, None),
+    Classification("/home/user/Level2_IC86.2016.i3", Kind.UNACCOUNTED, None, None),
+]
+
+
+@pytest.mark.parametrize("expected", CLASSIFICATIONS)
+def test_classify_path(expected: Classification) -> None:
+    """Test classifying each path."""
+    assert classification.classify_path(expected.path) == expected
+
+
+def test_cost_class() -> None:
+    """Test each classification's cost class."""
+    assert [c.cost_class for c in CLASSIFICATIONS] == [
+        CostClass.I3,
+        CostClass.I3,
+        CostClass.CHECKSUM,
+        CostClass.TARBALL,
+        CostClass.I3,
+        CostClass.CHECKSUM,
+        CostClass.CHECKSUM,
+    ]
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_classify_paths(processes: int) -> None:
+    """Test classifying a stream of paths, in order."""
+    paths = (c.path for c in CLASSIFICATIONS * 3)
+    results = classification.classify_paths(paths, processes=processes, chunksize=2)
+    assert list(results) == CLASSIFICATIONS * 3
+
+
+def test_classify_paths_bounded() -> None:
+    """Test that the paths aren't all read ahead of a slow consumer."""
+    n_read = 0
+
+    def paths() -> Iterator[str]:
+        nonlocal n_read
+        for c in CLASSIFICATIONS * 100:
+            n_read += 1
+            yield c.path
+
+    results = classification.classify_paths(paths(), processes=2, chunksize=2)
+    assert next(results) == CLASSIFICATIONS[0]
+    assert n_read <= 2 * 2 * 2  # this batch & the next
+    assert len(list(results)) == len(CLASSIFICATIONS) * 100 - 1
@@ -0,0 +1,63 @@
+"""Test the persistent events-summary cache."""
+
+from pathlib import Path
+from unittest.mock import patch
+
+from file_catalog.schema import types
+from indexer.metadata.i3 import I3FileMetadata
+from indexer.utils import events_cache, utils
+
+EVENTS: types.EventsData = {
+    "first_event": 5,
+    "last_event": 10,
+    "event_count": 6,
+    "status": "good",
+}
+
+
+def test_get_put(tmp_path: Path) -> None:
+    """Test that only good summaries are cached, by checksum."""
+    cache = events_cache.EventsCache(str(tmp_path / "events.sqlite"))
+
+    assert cache.get("abc") is None
+    cache.put("abc", EVENTS)
+    assert cache.get("abc") == EVENTS
+    cache.put("def", {**EVENTS, "status": "bad"})  # type: ignore[misc]
+    assert cache.get("def") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_i3_metadata_uses_cache(tmp_path: Path) -> None:
+    """Test that a cached summary means the i3 file is not scanned."""
+    fpath = tmp_path / "foo.i3"
+    fpath.write_bytes(b"not really an i3 file")
+
+    metadata_file = I3FileMetadata(utils.FileInfo(str(fpath)), "WIPAC", None, "real")
+    metadata_file.events_cache = events_cache.EventsCache(str(tmp_path / "e.sqlite"))
+    metadata_file.events_cache.put(metadata_file.sha512sum(), EVENTS)
+
+    with patch("indexer.utils.i3_frames.scan_file") as scan_file, patch.object(
+        I3FileMetadata, "_read_events_data"
+    ) as read_events_data:
+        assert metadata_file._get_events_data() == EVENTS  # pylint: disable=W0212
+        scan_file.assert_not_called()
+        read_events_data.assert_not_called()
+
+
+def test_i3_metadata_frame_scan_opt_in(tmp_path: Path) -> None:
+    """Test that the frame scanner is only used w/ `frame_scan`."""
+    fpath = tmp_path / "foo.i3"
+    fpath.write_bytes(b"not really an i3 file")
+
+    for frame_scan in [False, True]:
+        metadata_file = I3FileMetadata(
+            utils.FileInfo(str(fpath)), "WIPAC", None, "real"
+        )
+        metadata_file.frame_scan = frame_scan
+        metadata_file.sha512sum()
+        with patch.object(
+            I3FileMetadata, "_read_events_data", return_value=EVENTS
+        ) as read_events_data:
+            assert metadata_file._get_events_data() == EVENTS  # pylint: disable=W0212
+            read_events_data.assert_called_once()  # not an i3 stream, either way
+        assert bool(metadata_file._frame_scanner) == frame_scan  # pylint: disable=W0212
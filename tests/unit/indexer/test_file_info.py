@@ -0,0 +1,28 @@
+"""Test utils.FileInfo's stat caching."""
+
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from indexer.metadata.basic import BasicFileMetadata
+from indexer.utils import utils
+
+
+def test_single_stat(tmp_path: Path) -> None:
+    """Test that a file is stat'd at most once, from traversal to metadata."""
+    fpath = tmp_path / "foo"
+    fpath.write_bytes(b"abc")
+
+    # given a stat result -> no more stats
+    lstat = os.lstat(fpath)
+    with patch("os.stat") as mock_stat:
+        metadata = BasicFileMetadata(utils.FileInfo(str(fpath), lstat), "WIPAC")
+        generated = metadata.generate()
+        mock_stat.assert_not_called()
+    assert generated["file_size"] == 3
+
+    # lazily, then cached
+    file = utils.FileInfo(str(fpath))
+    with patch("os.stat", return_value=lstat) as mock_stat:
+        assert file.stat() is file.stat()
+        mock_stat.assert_called_once()
@@ -0,0 +1,81 @@
+"""Test the file-hashing engine, and benchmark it against a plain read loop."""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+from indexer.utils import hashing
+
+BUFSIZE = 1024
+
+
+def _read_loop_sha512(path: str, bufsize: int = 4194304) -> str:
+    """Hash like `BasicFileMetadata.sha512sum()` used to: a new bytes per chunk."""
+    sha = hashlib.new("sha512")
+    with open(path, "rb", buffering=0) as file:
+        line = file.read(bufsize)
+        while line:
+            sha.update(line)
+            line = file.read(bufsize)
+    return sha.hexdigest()
+
+
+@pytest.mark.parametrize("mode", hashing.HASH_MODES)
+@pytest.mark.parametrize(
+    "size", [0, 1, BUFSIZE - 1, BUFSIZE, BUFSIZE + 1, 5 * BUFSIZE + 3]
+)
+def test_modes(tmp_path: Path, mode: str, size: int) -> None:
+    """Test that every mode gives the same checksum & chunks."""
+    data = os.urandom(size)
+    fpath = tmp_path / "foo"
+    fpath.write_bytes(data)
+
+    chunks: List[bytes] = []
+    sha512 = hashing.sha512_file(
+        fpath, [lambda view: chunks.append(bytes(view))], mode, BUFSIZE
+    )
+
+    assert sha512 == hashlib.sha512(data).hexdigest()
+    assert b"".join(chunks) == data
+    assert all(len(c) <= BUFSIZE for c in chunks)
+
+
+def test_consumer_error(tmp_path: Path) -> None:
+    """Test that a consumer's exception propagates (& the reader thread exits)."""
+    fpath = tmp_path / "foo"
+    fpath.write_bytes(os.urandom(10 * BUFSIZE))
+
+    def consume(_: memoryview) -> None:
+        raise ValueError("bad chunk")
+
+    with pytest.raises(ValueError):
+        hashing.sha512_file(fpath, [consume], "overlap", BUFSIZE)
+
+    with pytest.raises(ValueError):
+        hashing.sha512_file(fpath, [], "bogus")
+
+
+def test_benchmark(tmp_path: Path) -> None:
+    """Benchmark each mode against the plain read loop (use `-s` for the timings)."""
+    fpath = str(tmp_path / "big")
+    with open(fpath, "wb") as file:
+        for _ in range(16):
+            file.write(os.urandom(4194304))  # 64 MiB
+
+    def best_of_3(func: Callable[[], str]) -> float:
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    expected = _read_loop_sha512(fpath)
+    print(f"\nread loop: {best_of_3(lambda: _read_loop_sha512(fpath)):.4f}s")
+    for mode in hashing.HASH_MODES:
+        assert hashing.sha512_file(fpath, mode=mode) == expected
+        seconds = best_of_3(lambda: hashing.sha512_file(fpath, mode=mode))  # noqa: B023
+        print(f"{mode}: {seconds:.4f}s")
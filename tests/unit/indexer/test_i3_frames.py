@@ -0,0 +1,242 @@
+"""Test the streaming i3 frame scanner."""
+
+import bz2
+import gzip
+import struct
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pytest
+from indexer.utils import i3_frames
+
+
+def _sized(data: bytes) -> bytes:
+    return struct.pack("<I", len(data)) + data
+
+
+def _header_buf(event_id: int) -> bytes:
+    """Mimic a serialized I3EventHeader: class-info preamble, then the data."""
+    preamble = b"\x00\x00" + _sized(b"I3EventHeader") + b"\x00\x03\x00\x00\x00"
+    return preamble + b"\x00" * 5 + struct.pack("<III", 1234, 0, event_id)
+
+
+def _frame(objects: Dict[bytes, bytes], stop: bytes = b"P") -> bytes:
+    frame = b"[i3]" + struct.pack("<I", 6) + stop + struct.pack("<I", len(objects))
+    for key, buf in objects.items():
+        frame += _sized(key) + _sized(b"SomeType") + _sized(buf)
+    return frame + b"\xde\xad\xbe\xef"
+
+
+def _stream(event_ids: List[int]) -> bytes:
+    stream = _frame({b"I3Geometry": b"g" * 5000}, b"G")
+    for event_id in event_ids:
+        stream += _frame(
+            {
+                b"I3EventHeader": _header_buf(event_id),
+                b"InIcePulses": b"x" * 3000,
+            }
+        )
+    return stream
+
+
+def _scan(
+    raw: bytes, filename: str, decoder: i3_frames.EventHeaderDecoder, chunk: int
+) -> i3_frames.I3FrameScanner:
+    scanner = i3_frames.I3FrameScanner.for_file(filename, decoder)
+    assert scanner
+    for i in range(0, len(raw), chunk):
+        scanner.feed(raw[i : i + chunk])
+    return scanner
+
+
+EVENT_IDS = [50, 51, 7, 99, 52, 53, 54, 55, 56, 57]
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 4096, 10**6])
+def test_learn_then_decode(chunk: int) -> None:
+    """Test that event ids are decoded after the layout has been learned."""
+    decoder = i3_frames.EventHeaderDecoder()
+    raw = _stream(EVENT_IDS)
+
+    # unknown layout -> only the count is known
+    scanner = _scan(raw, "foo.i3", decoder, chunk)
+    assert scanner.event_count == len(EVENT_IDS)
+    with pytest.raises(i3_frames.I3StreamError):
+        scanner.finish()
+
+    # learn & re-scan
+    assert decoder.learn(scanner.samples, EVENT_IDS)
+    scanner = _scan(raw, "foo.i3", decoder, chunk)
+    assert scanner.finish() == {
+        "first_event": 7,
+        "last_event": 99,
+        "event_count": len(EVENT_IDS),
+        "status": "good",
+    }
+
+
+@pytest.mark.parametrize(
+    "filename,compress",
+    [("foo.i3.gz", gzip.compress), ("foo.i3.bz2", bz2.compress)],
+)
+def test_compressed(filename: str, compress: Callable[[bytes], bytes]) -> None:
+    """Test scanning compressed streams, including multi-member files."""
+    decoder = i3_frames.EventHeaderDecoder()
+    assert decoder.learn([_header_buf(i) for i in EVENT_IDS], EVENT_IDS)
+
+    raw = compress(_stream(EVENT_IDS[:4])) + compress(_stream(EVENT_IDS[4:]))
+    events = _scan(raw, filename, decoder, 1000).finish()
+    assert events["event_count"] == len(EVENT_IDS)
+    assert (events["first_event"], events["last_event"]) == (7, 99)
+
+
+def test_errors() -> None:
+    """Test that bad/truncated streams are not reported as scanned."""
+    decoder = i3_frames.EventHeaderDecoder()
+    assert decoder.learn([_header_buf(i) for i in EVENT_IDS], EVENT_IDS)
+
+    # truncated
+    raw = _stream(EVENT_IDS)
+    with pytest.raises(i3_frames.I3StreamError):
+        _scan(raw[:-10], "foo.i3", decoder, 4096).finish()
+    # wrong frame version
+    raw = raw.replace(b"[i3]" + struct.pack("<I", 6), b"[i3]" + struct.pack("<I", 5))
+    with pytest.raises(i3_frames.I3StreamError):
+        _scan(raw, "foo.i3", decoder, 4096).finish()
+    # not actually compressed
+    with pytest.raises(i3_frames.I3StreamError):
+        _scan(_stream(EVENT_IDS), "foo.i3.bz2", decoder, 4096).finish()
+
+
+def test_learn_needs_enough_samples() -> None:
+    """Test that a layout is not learned from too few samples."""
+    decoder = i3_frames.EventHeaderDecoder()
+    assert not decoder.learn([_header_buf(5)], [5])
+    assert decoder.decode(_header_buf(5)) is None
+
+
+def test_unsupported_extension() -> None:
+    """Test that non-i3 files get no scanner."""
+    decoder = i3_frames.EventHeaderDecoder()
+    assert not i3_frames.I3FrameScanner.for_file("foo.tar.gz", decoder)
+
+
+@pytest.mark.parametrize(
+    "filename,compress",
+    [("foo.i3", bytes), ("foo.i3.gz", gzip.compress), ("foo.i3.bz2", bz2.compress)],
+)
+def test_scan_file(
+    tmp_path: Path, filename: str, compress: Callable[[bytes], bytes]
+) -> None:
+    """Test scanning a file directly (header-only for uncompressed files)."""
+    decoder = i3_frames.EventHeaderDecoder()
+    assert decoder.learn([_header_buf(i) for i in EVENT_IDS], EVENT_IDS)
+    fpath = tmp_path / filename
+
+    fpath.write_bytes(compress(_stream(EVENT_IDS)))
+    scanner = i3_frames.scan_file(str(fpath), decoder)
+    assert scanner
+    assert scanner.finish() == {
+        "first_event": 7,
+        "last_event": 99,
+        "event_count": len(EVENT_IDS),
+        "status": "good",
+    }
+    assert scanner.n_frames == len(EVENT_IDS) + 1
+
+    # truncated mid-object
+    fpath.write_bytes(compress(_stream(EVENT_IDS)[:-1500]))
+    scanner = i3_frames.scan_file(str(fpath), decoder)
+    assert scanner
+    with pytest.raises(i3_frames.I3StreamError):
+        scanner.finish()
+
+
+def test_scan_file_unsupported(tmp_path: Path) -> None:
+    """Test that unsupported files aren't scanned."""
+    fpath = tmp_path / "foo.i3.xz"
+    fpath.write_bytes(b"")
+    assert not i3_frames.scan_file(str(fpath), i3_frames.EventHeaderDecoder())
+
+
+def test_mixed_frames(tmp_path: Path) -> None:
+    """Test that frames dataio would mix a header into aren't summarized."""
+    decoder = i3_frames.EventHeaderDecoder()
+    assert decoder.learn([_header_buf(i) for i in EVENT_IDS], EVENT_IDS)
+
+    # a P frame w/o its own header
+    raw = _stream(EVENT_IDS) + _frame({b"InIcePulses": b"x" * 30})
+    with pytest.raises(i3_frames.I3StreamError):
+        _scan(raw, "foo.i3", decoder, 4096).finish()
+    fpath = tmp_path / "foo.i3"
+    fpath.write_bytes(raw)
+    scanner = i3_frames.scan_file(str(fpath), decoder)
+    assert scanner
+    with pytest.raises(i3_frames.I3StreamError):
+        scanner.finish()
+
+    # a G frame which re-arrives drops the headers before it
+    raw = _stream(EVENT_IDS[:4]) + _stream(EVENT_IDS[4:])
+    assert _scan(raw, "foo.i3", decoder, 4096).finish()["event_count"] == 10
+
+
+def _write_real_i3(path: Path, event_ids: List[int], p_headers: List[bool]) -> None:
+    """Write Q frames w/ headers, each followed by P frames (w/ or w/o headers)."""
+    from icecube import dataclasses, dataio, icetray  # type: ignore[import]
+
+    i3_file = dataio.I3File(str(path), "w")
+    for event_id in event_ids:
+        header = dataclasses.I3EventHeader()
+        header.run_id = 130000
+        header.event_id = event_id
+        q_frame = icetray.I3Frame(icetray.I3Frame.DAQ)
+        q_frame["I3EventHeader"] = header
+        i3_file.push(q_frame)
+        for p_header in p_headers:
+            p_frame = icetray.I3Frame(icetray.I3Frame.Physics)
+            if p_header:
+                p_frame["I3EventHeader"] = header
+            i3_file.push(p_frame)
+    i3_file.close()
+
+
+def _read_real_i3(path: Path) -> List[int]:
+    """Return the event id of each frame w/ an I3EventHeader, like dataio sees."""
+    from icecube import dataio  # type: ignore[import]
+
+    return [
+        int(frame["I3EventHeader"].event_id)
+        for frame in dataio.I3File(str(path))
+        if "I3EventHeader" in frame
+    ]
+
+
+def test_real_i3_files(tmp_path: Path) -> None:
+    """Test the framing & header layout against i3 files written by dataio."""
+    pytest.importorskip("icecube.dataio")
+    decoder = i3_frames.EventHeaderDecoder()
+
+    # learn from one file
+    _write_real_i3(tmp_path / "a.i3", list(range(100, 120)), [True])
+    scanner = i3_frames.scan_file(str(tmp_path / "a.i3"), decoder)
+    assert scanner
+    assert decoder.learn(scanner.samples, _read_real_i3(tmp_path / "a.i3"))
+
+    # then, check others against dataio
+    _write_real_i3(tmp_path / "b.i3", [50, 51, 7, 99, 52], [True, True])
+    scanner = i3_frames.scan_file(str(tmp_path / "b.i3"), decoder)
+    assert scanner
+    event_ids = _read_real_i3(tmp_path / "b.i3")
+    assert scanner.finish() == {
+        "first_event": min(event_ids),
+        "last_event": max(event_ids),
+        "event_count": len(event_ids),
+        "status": "good",
+    }
+
+    # dataio mixes the Q frames' headers into the P frames
+    _write_real_i3(tmp_path / "c.i3", [50, 51, 7, 99, 52], [False])
+    scanner = i3_frames.scan_file(str(tmp_path / "c.i3"), decoder)
+    assert scanner
+    with pytest.raises(i3_frames.I3StreamError):
+        scanner.finish()
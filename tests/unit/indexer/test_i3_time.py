@@ -0,0 +1,99 @@
+"""Test the native I3Time-to-datetime conversion."""
+
+import datetime
+from typing import List, Tuple
+from unittest.mock import patch
+
+import pytest
+from indexer.utils import i3_time
+
+TICKS = i3_time.DAQ_TICKS_PER_SECOND
+DAY = 86400 * TICKS
+
+# (year, daq_time, expected datetime)
+VECTORS: List[Tuple[int, int, datetime.datetime]] = [
+    (2018, 0, datetime.datetime(2018, 1, 1)),
+    # a real L2 file's first & last events' datetimes
+    (2018, 200271112991921930, datetime.datetime(2018, 8, 20, 19, 5, 11, 299192)),
+    (2018, 200272302593894321, datetime.datetime(2018, 8, 20, 19, 7, 10, 259389)),
+    # sub-microsecond ticks are truncated
+    (2019, 9999, datetime.datetime(2019, 1, 1)),
+    (2019, 10000, datetime.datetime(2019, 1, 1, 0, 0, 0, 1)),
+    (2020, 365 * DAY + 5, datetime.datetime(2020, 12, 31)),  # leap year
+    # 2016-12-31 23:59:60
+    (2016, 366 * DAY - 1, datetime.datetime(2016, 12, 31, 23, 59, 59, 999999)),
+    (
+        2016,
+        366 * DAY - TICKS // 2,
+        datetime.datetime(2016, 12, 31, 23, 59, 59, 500000),
+    ),
+    (2016, 366 * DAY, datetime.datetime(2016, 12, 31, 23, 59, 59, 999999)),
+    (2016, 366 * DAY + TICKS - 1, datetime.datetime(2016, 12, 31, 23, 59, 59, 999999)),
+    # 2015-06-30 23:59:60
+    (2015, 181 * DAY, datetime.datetime(2015, 6, 30, 23, 59, 59, 999999)),
+    (2015, 181 * DAY + TICKS, datetime.datetime(2015, 7, 1)),
+    (2015, 200 * DAY + TICKS, datetime.datetime(2015, 7, 20)),
+    # 1972 had two leap seconds
+    (1972, 182 * DAY + TICKS, datetime.datetime(1972, 7, 1)),
+    (1972, 366 * DAY + TICKS, datetime.datetime(1972, 12, 31, 23, 59, 59, 999999)),
+    (1972, 366 * DAY + 2 * TICKS, datetime.datetime(1973, 1, 1)),
+]
+
+
+def test_leap_second_starts() -> None:
+    """Test the DAQ seconds when leap seconds began."""
+    assert i3_time.leap_second_starts(2018) == ()
+    assert i3_time.leap_second_starts(2016) == (366 * 86400,)
+    assert i3_time.leap_second_starts(2015) == (181 * 86400,)
+    assert i3_time.leap_second_starts(1972) == (182 * 86400, 366 * 86400 + 1)
+
+
+@pytest.mark.parametrize("year,daq_time,expected", VECTORS)
+def test_daq_time_to_datetime(
+    year: int, daq_time: int, expected: datetime.datetime
+) -> None:
+    """Test converting one DAQ time."""
+    assert i3_time.daq_time_to_datetime(year, daq_time) == expected
+
+
+def test_daq_times_to_datetimes() -> None:
+    """Test the batch conversion, w/ & w/o NumPy."""
+    years, daq_times, expected = zip(*VECTORS)
+    assert i3_time.daq_times_to_datetimes(years, daq_times) == list(expected)
+    assert i3_time.daq_times_to_datetimes([], []) == []
+
+    with patch.dict("sys.modules", {"numpy": None}):  # ImportError
+        assert i3_time.daq_times_to_datetimes(years, daq_times) == list(expected)
+
+    with pytest.raises(ValueError):
+        i3_time.daq_times_to_datetimes([2018], [])
+
+
+def test_batch_parity() -> None:
+    """Test that the batch conversion matches the scalar one, around leap seconds."""
+    years, daq_times = [], []
+    for year in [1972, 2015, 2016, 2017, 2018]:
+        leap_seconds = [s * TICKS for s in i3_time.leap_second_starts(year)]
+        for boundary in [0, 365 * DAY] + leap_seconds:
+            for offset in [-TICKS, -1, 0, 1, TICKS // 2, TICKS - 1, TICKS, 2 * TICKS]:
+                if boundary + offset >= 0:
+                    years.append(year)
+                    daq_times.append(boundary + offset)
+
+    scalars = [i3_time.daq_time_to_datetime(y, t) for y, t in zip(years, daq_times)]
+    assert i3_time.daq_times_to_datetimes(years, daq_times) == scalars
+    with patch.dict("sys.modules", {"numpy": None}):  # ImportError
+        assert i3_time.daq_times_to_datetimes(years, daq_times) == scalars
+
+
+def test_icecube_parity() -> None:
+    """Test that conversions match `I3Time.date_time`."""
+    dataclasses = pytest.importorskip("icecube.dataclasses")
+
+    for year, daq_time, _ in VECTORS:
+        if any(
+            s <= daq_time // TICKS < s + 1 for s in i3_time.leap_second_starts(year)
+        ):
+            continue  # datetime can't represent a leap second
+        i3_dt = dataclasses.I3Time(year, daq_time).date_time
+        assert i3_time.daq_time_to_datetime(year, daq_time) == i3_dt
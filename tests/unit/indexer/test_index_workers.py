@@ -0,0 +1,79 @@
+"""Test the indexer's (long-lived) worker processes."""
+
+# pylint: disable=W0212
+
+import sqlite3
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, cast
+
+import pytest
+from indexer import index
+
+
+def _flags(checksum_cache: str = "", **overrides: Any) -> index.IndexerFlags:
+    flags: Dict[str, Any] = {
+        "basic_only": True,
+        "patch": True,  # don't check the file catalog
+        "iceprodv2_rc_token": "",
+        "iceprodv1_db_pass": "",
+        "dryrun": True,
+        "checksum_cache": checksum_cache,  # a record of what was indexed
+        "checksum_cache_xattr": False,
+        "hash_mode": "auto",
+        "events_cache": "",
+        "i3_frame_scan": False,
+        "l2_dir_cache": "",
+        "adaptive_patterns": False,
+        "pattern_stats": "",
+        "iceprod_cache": "",
+        "iceprod_cache_swr": 0.0,
+        "iceprod_bundle": "",
+        "iceprod_bulk_tasks": False,
+    }
+    flags.update(overrides)
+    return cast(index.IndexerFlags, flags)
+
+
+@pytest.mark.parametrize("n_processes,max_tasks", [(1, 0), (2, 0), (2, 1)])
+def test_recursively_index(tmp_path: Path, n_processes: int, max_tasks: int) -> None:
+    """Test that every file is indexed, with or without recycled workers."""
+    files: List[Path] = []
+    for subdir in ["alpha", "beta", "beta/gamma"]:
+        (tmp_path / "data" / subdir).mkdir(parents=True)
+        for i in range(3):
+            files.append(tmp_path / "data" / subdir / f"file{i}")
+            files[-1].write_bytes(str(files[-1]).encode())
+    db_path = tmp_path / "checksums.sqlite"
+
+    index._recursively_index(
+        [str(tmp_path / "data")],
+        [str(tmp_path / "data" / "alpha" / "file0")],  # blacklist
+        {"url": "http://localhost:1", "token": "", "timeout": 1, "retries": 0},
+        "WIPAC",
+        _flags(str(db_path)),
+        n_processes,
+        max_tasks,
+    )
+
+    with closing(sqlite3.connect(db_path)) as conn:
+        indexed = sorted(row[0] for row in conn.execute("SELECT path FROM checksums"))
+    assert indexed == sorted(str(f) for f in files[1:])
+
+
+def test_recursively_index_broken_worker(tmp_path: Path) -> None:
+    """Test that a worker that can't be set up errors, instead of hanging."""
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "file0").write_bytes(b"abc")
+
+    with pytest.raises(BrokenProcessPool):
+        index._recursively_index(
+            [str(tmp_path / "data")],
+            [],
+            {"url": "http://localhost:1", "token": "", "timeout": 1, "retries": 0},
+            "WIPAC",
+            # the bundle is opened in `_init_worker()`
+            _flags(basic_only=False, iceprod_bundle=str(tmp_path / "no-bundle")),
+            2,
+        )
@@ -0,0 +1,82 @@
+"""Test the I/O policy helpers."""
+
+# pylint: disable=W0212
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, List
+from unittest.mock import Mock, patch
+
+from indexer import index
+from indexer.utils import io_policy
+
+
+def test_read_size(tmp_path: Path) -> None:
+    """Test that read sizes are multiples of the preferred size, within bounds."""
+    fpath = tmp_path / "foo"
+    fpath.write_bytes(b"abc")
+
+    for blksize, expected in [
+        (4096, io_policy.MIN_READ_SIZE),  # local disk
+        (1048576 * 3, 1048576 * 6),  # Ex: a 3 MiB stripe
+        (16777216, 16777216),  # Ex: GPFS
+        (2 * io_policy.MAX_READ_SIZE, 2 * io_policy.MAX_READ_SIZE),
+    ]:
+        io_policy._read_sizes.clear()
+        fstatvfs = os.fstatvfs
+        with open(fpath, "rb") as file, patch(
+            "os.fstatvfs",
+            lambda fd, bs=blksize: os.statvfs_result(  # type: ignore[misc]
+                (bs,) + tuple(fstatvfs(fd))[1:]
+            ),
+        ):
+            assert io_policy.read_size(file.fileno()) == expected
+    io_policy._read_sizes.clear()
+
+
+def test_hints(tmp_path: Path) -> None:
+    """Test that hints are harmless, even for non-regular or missing files."""
+    fpath = tmp_path / "foo"
+    fpath.write_bytes(b"abc" * 1000)
+
+    with io_policy.open_sequential(fpath, buffered=True) as file:
+        assert file.read() == b"abc" * 1000
+    for path in [str(fpath), str(tmp_path), str(tmp_path / "missing")]:
+        io_policy.prefetch(path)
+        io_policy.evict(path)
+
+    os.mkfifo(tmp_path / "fifo")
+    io_policy.prefetch(str(tmp_path / "fifo"))
+    io_policy.evict(str(tmp_path / "fifo"))  # does not block
+
+
+def test_index_paths_prefetch(tmp_path: Path) -> None:
+    """Test that only the files that'll be indexed are prefetched."""
+    paths = []
+    for name in ["a", "b", "c"]:
+        (tmp_path / name).write_bytes(b"abc")
+        paths.append(str(tmp_path / name))
+    looked_up: List[str] = []
+
+    async def file_exists_in_fc(_: Any, filepath: str) -> bool:
+        looked_up.append(filepath)
+        return filepath.endswith("b")  # already indexed
+
+    async def generate_async() -> Any:
+        return {}
+
+    manager = Mock(async_iceprod=None)
+    manager.new_file.return_value.generate_async = generate_async
+    with patch.object(index, "file_exists_in_fc", file_exists_in_fc), patch.object(
+        io_policy, "prefetch"
+    ) as prefetch, patch.object(index, "sleep"):
+        asyncio.run(index.index_paths(paths, manager, Mock(), dryrun=True))
+
+    assert sorted(looked_up) == paths  # once each
+    assert [c[0][0] for c in prefetch.call_args_list] == [paths[2]]
+    manager.prefetch_iceprod_async.assert_called_once_with(paths[2])
+    assert [c[0][0].path for c in manager.new_file.call_args_list] == [
+        paths[0],
+        paths[2],
+    ]
@@ -2,6 +2,11 @@
 
 # pylint: disable=W0212
 
+import os
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
 from indexer import metadata_manager
 
 
@@ -39,3 +44,123 @@ def test_new_file_logic() -> None:
     assert not metadata_manager.MetadataManager._is_data_exp_filepath("/data/simu/a")
     assert not metadata_manager.MetadataManager._is_data_sim_filepath("/data/expo/b")
     assert not metadata_manager.MetadataManager._is_data_exp_filepath("/data/expo/b")
+
+
+def test_l2_dir_cache(tmp_path: Path) -> None:
+    """Test the LRU cache of L2 directories' metadata."""
+    dirs = [str(tmp_path / d) for d in ["run1", "run2", "run3"]]
+    for dir_path in dirs:
+        os.mkdir(dir_path)
+    manager = metadata_manager.MetadataManager("WIPAC", l2_dir_cache_size=2)
+
+    def use(dir_path: str) -> None:
+        manager._use_l2_dir_metadata(dir_path)
+        assert manager.dir_path == dir_path
+        assert manager.real_l2_dir_metadata is manager.l2_dir_cache[dir_path][1]
+
+    # interleaved dirs are only parsed once
+    for dir_path in [dirs[0], dirs[1], dirs[0], dirs[1], dirs[0]]:
+        use(dir_path)
+    assert (manager.l2_dir_cache_hits, manager.l2_dir_cache_misses) == (3, 2)
+
+    # least-recently used is evicted
+    use(dirs[2])
+    assert list(manager.l2_dir_cache) == [dirs[0], dirs[2]]
+    use(dirs[1])
+    assert (manager.l2_dir_cache_hits, manager.l2_dir_cache_misses) == (3, 4)
+
+    # a changed dir is re-parsed
+    with open(os.path.join(dirs[1], "Run00123456_GapsTxt.tar"), "w"):
+        pass
+    os.utime(dirs[1], ns=(0, 0))  # in case the mtime resolution is coarse
+    use(dirs[1])
+    assert (manager.l2_dir_cache_hits, manager.l2_dir_cache_misses) == (3, 5)
+
+
+def test_l2_dir_disk_cache(tmp_path: Path) -> None:
+    """Test the on-disk cache of L2 directories' metadata, shared by managers."""
+    l2_dir = os.path.join(os.path.dirname(__file__), "../../integration/real/L2")
+    run_dir = tmp_path / "Run00131410"
+    run_dir.mkdir()
+    for fname in os.listdir(l2_dir):
+        if metadata_manager.MetadataManager._is_l2_dir_metadata_source(fname):
+            shutil.copy(os.path.join(l2_dir, fname), run_dir)
+    gaps_key = "Level2_IC86.2018_data_Run00131410_Subrun00000000_00000172"
+
+    def new_manager() -> metadata_manager.MetadataManager:
+        return metadata_manager.MetadataManager(
+            "WIPAC", l2_dir_cache_dir=str(tmp_path / "cache")
+        )
+
+    # parsed, then cached
+    manager = new_manager()
+    manager._use_l2_dir_metadata(str(run_dir))
+    parsed = manager.real_l2_dir_metadata
+    assert parsed["dir_meta_xml"] and parsed["gcd_files"]
+    assert manager.l2_dir_disk_cache
+    assert (manager.l2_dir_disk_cache.hits, manager.l2_dir_disk_cache.misses) == (0, 1)
+
+    # another job (manager) doesn't re-parse
+    manager = new_manager()
+    with patch("indexer.metadata.real.gaps.GapsFiles.index_tar") as index_tar, patch(
+        "xmltodict.parse"
+    ) as parse:
+        manager._use_l2_dir_metadata(str(run_dir))
+        index_tar.assert_not_called()
+        parse.assert_not_called()
+    cached = manager.real_l2_dir_metadata
+    assert cached["dir_meta_xml"] == parsed["dir_meta_xml"]
+    assert cached["gcd_files"] == parsed["gcd_files"]
+    assert cached["gaps_files"][gaps_key] == parsed["gaps_files"][gaps_key]
+    assert manager.l2_dir_disk_cache
+    assert (manager.l2_dir_disk_cache.hits, manager.l2_dir_disk_cache.misses) == (1, 0)
+
+    # a changed metadata file invalidates the entry
+    gaps_tar = run_dir / "Run00131410_GapsTxt.tar"
+    os.utime(gaps_tar, ns=(0, 0))
+    manager = new_manager()
+    manager._use_l2_dir_metadata(str(run_dir))
+    assert manager.l2_dir_disk_cache
+    assert (manager.l2_dir_disk_cache.hits, manager.l2_dir_disk_cache.misses) == (0, 1)
+
+
+@patch("indexer.metadata_manager.prefetch_iceprod1_steering_params")
+def test_prefetch_iceprod(prefetch: Mock) -> None:
+    """Test prefetching w/ the manager's matcher, w/o counting its hits."""
+    manager = metadata_manager.MetadataManager(
+        "WIPAC", iceprodv2_rc_token="token", iceprodv1_db_pass="pass"
+    )
+    manager.prefetch_iceprod(
+        [
+            "/data/sim/IceCube/2011/filtered/level2/CORSIKA-in-ice/10285/00000-00999/"
+            "Level2_IC86.2011_corsika.010285.000000.i3.bz2",
+            "/data/sim/IceCube/2010/generated/CORSIKA-in-ice_000674/00000-00999/"
+            "corsika.000674.000000.i3.gz",
+            "/data/sim/IceCube/2010/generated/foo.txt",
+            "/data/exp/IceCube/2018/filtered/level2/0820/Run00131410/foo.i3.bz2",
+        ]
+    )
+    prefetch.assert_called_once_with(manager.iceprod_conn, {10285, 674})
+    assert manager.sim_matcher and not any(manager.sim_matcher.hits)
+    manager.close()
+
+
+def test_prefetch_iceprod_async() -> None:
+    """Test starting a sim file's IceProd lookup early, via `AsyncIceProd`."""
+    manager = metadata_manager.MetadataManager(
+        "WIPAC", iceprodv2_rc_token="token", iceprodv1_db_pass="pass"
+    )
+    assert manager.async_iceprod
+    with patch.object(manager.async_iceprod, "prefetch") as prefetch:
+        sim_path = (
+            "/data/sim/IceCube/2011/filtered/level2/CORSIKA-in-ice/10285/00000-00999/"
+            "Level2_IC86.2011_corsika.010285.000123.i3.bz2"
+        )
+        manager.prefetch_iceprod_async(sim_path)
+        manager.prefetch_iceprod_async("/data/sim/IceCube/2010/generated/foo.txt")
+        manager.prefetch_iceprod_async(
+            "/data/exp/IceCube/2018/filtered/level2/0820/Run00131410/foo.i3.bz2"
+        )
+    prefetch.assert_called_once_with(10285, sim_path, 123)
+    assert manager.sim_matcher and not any(manager.sim_matcher.hits)
+    manager.close()
@@ -0,0 +1,139 @@
+"""Test the persistent query-results cache."""
+
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from indexer.metadata.simulation import iceprod_tools
+from indexer.utils import query_cache
+
+TTLS = {"foo": 10.0, query_cache.NEGATIVE: 5.0}
+
+
+class _NotFound(Exception):
+    pass
+
+
+def test_fresh_and_expired(tmp_path: Path) -> None:
+    """Test that a result is fetched once per TTL, across cache instances."""
+    fetch = Mock(side_effect=[[1, 2], [3]])
+    db_path = str(tmp_path / "q.sqlite")
+
+    with patch.object(query_cache.time, "time", return_value=100.0):
+        assert query_cache.QueryCache(db_path, TTLS).get("foo", "a", fetch) == [1, 2]
+        cache = query_cache.QueryCache(db_path, TTLS)  # Ex: another job
+        assert cache.get("foo", "a", fetch) == [1, 2]
+    assert fetch.call_count == 1
+    assert (cache.hits, cache.misses) == (1, 0)
+    # no WAL, which needs a single host's shared memory
+    # pylint: disable=W0212
+    journal_mode = cache._connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "delete"
+    assert not (tmp_path / "q.sqlite-wal").exists()
+
+    with patch.object(query_cache.time, "time", return_value=111.0):
+        assert cache.get("foo", "a", fetch) == [3]
+    assert fetch.call_count == 2
+
+
+def test_negative(tmp_path: Path) -> None:
+    """Test that a negative exception is cached, for its own TTL."""
+    fetch = Mock(side_effect=[_NotFound("nope"), "found"])
+    cache = query_cache.QueryCache(str(tmp_path / "q.sqlite"), TTLS, (_NotFound,))
+
+    with patch.object(query_cache.time, "time", return_value=100.0):
+        with pytest.raises(_NotFound):
+            cache.get("foo", "a", fetch)
+        with pytest.raises(_NotFound):
+            cache.get("foo", "a", fetch)
+    assert fetch.call_count == 1
+
+    with patch.object(query_cache.time, "time", return_value=106.0):
+        assert cache.get("foo", "a", fetch) == "found"
+
+    # other exceptions aren't cached
+    fetch = Mock(side_effect=[ValueError(), "bar"])
+    with pytest.raises(ValueError):
+        cache.get("foo", "b", fetch)
+    assert cache.get("foo", "b", fetch) == "bar"
+
+
+def test_stale_while_revalidate(tmp_path: Path) -> None:
+    """Test that a stale result is returned while it's re-fetched."""
+    fetch = Mock(side_effect=["old", "new"])
+    cache = query_cache.QueryCache(
+        str(tmp_path / "q.sqlite"), TTLS, stale_while_revalidate=10
+    )
+
+    with patch.object(query_cache.time, "time", return_value=100.0):
+        assert cache.get("foo", "a", fetch) == "old"
+    with patch.object(query_cache.time, "time", return_value=115.0):
+        assert cache.get("foo", "a", fetch) == "old"
+        cache.close()  # wait for the revalidation
+    assert cache.stale_hits == 1
+    assert fetch.call_count == 2
+
+    with patch.object(query_cache.time, "time", return_value=116.0):
+        assert cache.get("foo", "a", fetch) == "new"  # no more fetches left
+    with patch.object(query_cache.time, "time", return_value=1000.0):
+        with pytest.raises(StopIteration):  # too stale, fetched
+            cache.get("foo", "a", fetch)
+
+
+def test_iceprod_dataset_not_found_cached(tmp_path: Path) -> None:
+    """Test that IceProd v1 datasets not found are remembered across jobs."""
+    cache_path = str(tmp_path / "iceprod.sqlite")
+    # pylint: disable=W0212
+    with patch("pymysql.connect") as connect:
+        connect.return_value.cursor.return_value.fetchall.return_value = []
+
+        for _ in range(2):  # Ex: two jobs
+            iceprod_conn = iceprod_tools.IceProdConnection("pass", "token", cache_path)
+            assert not iceprod_tools._get_iceprod1_dataset_steering_params(
+                iceprod_conn, 12345
+            )
+            iceprod_conn.close()
+
+        assert connect.call_count == 1
+
+
+def test_bundle(tmp_path: Path) -> None:
+    """Test answering queries from a compacted cache, w/o fetching."""
+    cache = query_cache.QueryCache(str(tmp_path / "q.sqlite"), TTLS, (_NotFound,))
+    assert cache.get("foo", "a", lambda: {"b": 1}) == {"b": 1}
+    with pytest.raises(_NotFound):
+        cache.get("foo", "c", Mock(side_effect=_NotFound()))
+    cache.close()
+
+    query_cache.compact(str(tmp_path / "q.sqlite"), str(tmp_path / "bundle.sqlite"))
+    bundle = query_cache.QueryBundle(str(tmp_path / "bundle.sqlite"))
+    assert bundle.get("foo", "a") == {"b": 1}
+    with pytest.raises(_NotFound):
+        bundle.get("foo", "c")
+    with pytest.raises(KeyError):
+        bundle.get("foo", "d")
+    bundle.close()
+
+
+def test_iceprod_bundle(tmp_path: Path) -> None:
+    """Test that an IceProd bundle needs no credentials, nor connections."""
+    cache_path = str(tmp_path / "iceprod.sqlite")
+    cache = query_cache.QueryCache(cache_path, iceprod_tools.ICEPROD_CACHE_TTLS)
+    cache.get("iceprod1_steering_params", "12345", lambda: [{"name": "a"}])
+    cache.close()
+    query_cache.compact(cache_path, str(tmp_path / "bundle.sqlite"))
+
+    # pylint: disable=W0212
+    with patch("pymysql.connect") as connect:
+        iceprod_conn = iceprod_tools.IceProdConnection(
+            "", "", bundle_path=str(tmp_path / "bundle.sqlite")
+        )
+        assert iceprod_tools._get_iceprod1_dataset_steering_params(
+            iceprod_conn, 12345
+        ) == [{"name": "a"}]
+        # not in the bundle, same as not found
+        assert not iceprod_tools._get_iceprod1_dataset_steering_params(
+            iceprod_conn, 12346
+        )
+        iceprod_conn.close()
+        connect.assert_not_called()
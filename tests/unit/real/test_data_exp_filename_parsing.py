@@ -5,6 +5,7 @@ from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import pytest
 from indexer.metadata import real
+from indexer.utils import utils
 
 
 def test_run_number() -> None:
@@ -37,6 +38,31 @@ def test_run_number() -> None:
         assert "No run number found in filename," in str(e.value)
 
 
+def _test_classify(filename: str) -> None:
+    """Test that `classify()` agrees w/ each level's `is_valid_filename()` & parsing."""
+    expected_level, expected_values = None, None
+    for level, metadata_class in [
+        (utils.ProcessingLevel.L2, real.l2.L2FileMetadata),
+        (utils.ProcessingLevel.PFFilt, real.pffilt.PFFiltFileMetadata),
+        (utils.ProcessingLevel.PFDST, real.pfdst.PFDSTFileMetadata),
+        (utils.ProcessingLevel.PFRaw, real.pfraw.PFRawFileMetadata),
+    ]:
+        if metadata_class.is_valid_filename(filename):  # type: ignore[attr-defined]
+            expected_level = level
+            try:
+                expected_values = metadata_class.parse_year_run_subrun_part(
+                    metadata_class.FILENAME_PATTERNS, filename  # type: ignore
+                )
+            except ValueError:
+                pass
+            break
+
+    assert real.filename_patterns.classify(filename) == (
+        expected_level,
+        expected_values,
+    )
+
+
 def _test_filenames_parsing(
     filenames_and_values: Dict[str, Tuple[Optional[int], int, int, int]],
     patterns: List[str],
@@ -52,6 +78,7 @@ def _test_filenames_parsing(
         assert r == values[1]
         assert s == values[2]
         assert p == values[3]
+        _test_classify(filename)
 
 
 def _test_bad_filenames_parsing(bad_filenames: List[str], patterns: List[str]) -> None:
@@ -63,6 +90,7 @@ def _test_bad_filenames_parsing(bad_filenames: List[str], patterns: List[str]) -
                 patterns, filename
             )
         assert "Filename does not match any pattern, " in str(e.value)
+        _test_classify(filename)
 
 
 def _test_valid_filenames(
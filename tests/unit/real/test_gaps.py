@@ -0,0 +1,116 @@
+"""Test indexing & lazily parsing gaps files from `*_GapsTxt.tar` files."""
+
+import gzip
+import os
+import tarfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import patch
+
+import pytest
+import yaml
+from indexer.metadata import real
+
+GAPS_TAR = os.path.join(
+    os.path.dirname(__file__),
+    "../../integration/real/L2/Run00131410_GapsTxt.tar",
+)
+KEY = "Level2_IC86.2018_data_Run00131410_Subrun00000000_00000172"
+
+
+def _eager(tar_path: str) -> Dict[str, Any]:
+    """Parse every gaps file, like the indexer used to."""
+    gaps = {}
+    with tarfile.open(tar_path) as tar:
+        for member in tar:
+            iobytes = tar.extractfile(member)
+            if iobytes:
+                gaps[member.name.split("_gaps.txt")[0]] = yaml.safe_load(iobytes)
+    return gaps
+
+
+def test_lazy() -> None:
+    """Test that gaps files are only parsed when looked up."""
+    gaps_files = real.gaps.GapsFiles()
+    with patch("yaml.safe_load") as safe_load:
+        gaps_files.index_tar(GAPS_TAR)
+        safe_load.assert_not_called()
+
+    eager = _eager(GAPS_TAR)
+    assert sorted(gaps_files) == sorted(eager)
+    assert len(gaps_files) == len(eager)
+    assert gaps_files[KEY] == eager[KEY]
+    assert dict(gaps_files) == eager
+
+    with pytest.raises(KeyError):
+        gaps_files["Level2_IC86.2018_data_Run00131410_Subrun00000000_99999999"]
+
+
+def test_compressed(tmp_path: Path) -> None:
+    """Test that a compressed tarball is parsed up front."""
+    tgz = tmp_path / "Run00131410_GapsTxt.tar"
+    with open(GAPS_TAR, "rb") as file:
+        tgz.write_bytes(gzip.compress(file.read()))
+
+    gaps_files = real.gaps.GapsFiles()
+    gaps_files.index_tar(str(tgz))
+    assert dict(gaps_files) == _eager(GAPS_TAR)
+
+    with pytest.raises(tarfile.ReadError):
+        (tmp_path / "bad_GapsTxt.tar").write_bytes(b"not a tar" * 100)
+        gaps_files.index_tar(str(tmp_path / "bad_GapsTxt.tar"))
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Run: 131410\nFile Livetime: 117.06\n",
+        "First Event of File: 51425386 2018 200268759114415278\r\n",
+        "a: -0\nb: +7\nc: 1.\nd: 7.0 \ne: foo bar.baz\nf: 1 2  3\na: 2\n",
+        # not simple -> YAML
+        "a: 0123\n",
+        "a: yes\n",
+        "no: 1\n",
+        "a: 1e5\n",
+        "a: 1_000\n",
+        "a: .5\n",
+        "a: 2018-08-20\n",
+        "a: 5:30\n",
+        "# comment\na: 1 # comment\n",
+        "a: b\n  c\n",
+        "a:\n",
+        "a: ~\n",
+        "",
+        "---\nFile Livetime: -1\n",
+    ],
+)
+def test_parse_gaps(text: str) -> None:
+    """Test that the gaps parser gives the same results as YAML."""
+    expected = yaml.safe_load(text)
+    assert real.gaps.parse_gaps(text.encode()) == expected
+    assert type(real.gaps.parse_gaps(text.encode())) is type(expected)
+
+
+def test_parse_gaps_benchmark() -> None:
+    """Benchmark the gaps parser against YAML (use `-s` for the timings)."""
+    members = []
+    with tarfile.open(GAPS_TAR) as tar:
+        for member in tar:
+            iobytes = tar.extractfile(member)
+            if iobytes:
+                members.append(iobytes.read())
+    members *= 20
+
+    start = time.perf_counter()
+    expected = [yaml.safe_load(m) for m in members]
+    yaml_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parsed = [real.gaps.parse_gaps(m) for m in members]
+    fast_time = time.perf_counter() - start
+
+    assert parsed == expected
+    print(
+        f"\n{len(members)} gaps files: yaml={yaml_time:.4f}s parse_gaps={fast_time:.4f}s"
+    )
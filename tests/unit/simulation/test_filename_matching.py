@@ -0,0 +1,249 @@
+"""Test the literal-prefix dispatch of filename patterns."""
+
+import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import List, Optional, Pattern
+from unittest.mock import patch
+
+import pytest
+import yaml
+from indexer.metadata.real import filename_patterns as real_filename_patterns
+from indexer.metadata.simulation import filename_patterns
+from indexer.utils import filename_matching
+
+import filepath_data as data
+
+
+def _linear(patterns: List[Pattern[str]], filename: str) -> Optional[int]:
+    """Return the first matching pattern's index, the slow way."""
+    for i, pattern in enumerate(patterns):
+        if pattern.match(filename):
+            return i
+    return None
+
+
+def test_literal_prefix() -> None:
+    """Test finding patterns' leading literal text."""
+    for pattern, prefix in [
+        (r"corsika\.(?P<alpha>\d+)\.i3$", "corsika."),
+        (r"(IC\d+\.\d\d\d\d)_corsika", "IC"),
+        (r"(Level2)_(IC\d+)", "Level2_IC"),
+        (r"((S|s)tep\d+)_genie", ""),
+        (r"Level2a?_IC", "Level2"),
+        (r"MCSN|corsika", ""),
+        (r"(?i)corsika", ""),
+        (r"(?i:corsika)", ""),
+    ]:
+        assert filename_matching.literal_prefix(re.compile(pattern)) == prefix
+
+
+def test_first_match_wins() -> None:
+    """Test that results are the same as trying every pattern in order."""
+    patterns = [re.compile(p) for p in filename_patterns.regex_patterns]
+    matcher = filename_matching.PatternMatcher(patterns)
+
+    filenames = [v["fileinfo"].name for v in data.EXAMPLES.values()]
+    filenames += ["", "green.eggs.ham", "Level2_IC86.2011_shmorsika.010285.i3"]
+    filenames += [f[:-3] for f in filenames] + [f"x{f}" for f in filenames]
+    for fname in filenames:
+        found = matcher.match(fname)
+        assert (found[0] if found else None) == _linear(patterns, fname)
+        # candidates are a subset, in order
+        assert matcher.candidates(fname) == sorted(set(matcher.candidates(fname)))
+
+    # most filenames are only tried against a few candidates
+    assert len(matcher.candidates("corsika.012345.000000.i3")) < len(patterns) / 10
+
+
+def test_widen() -> None:
+    """Test widening patterns to match filenames' shapes."""
+    for pattern, matches, not_matches in [
+        (r"Level2_(?P<a>\d+)\.i3$", ["Level#_###.i#", "Level2_#.i3"], ["Level#_.i#"]),
+        (r".*\.(?P<year>20\d{2})_x", ["a.####_x", "a.2#1#_x"], ["a.###_x"]),
+        (r"[a-z_]+(\d|x)[^a]", ["ab_##", "ab_x#"], ["ab_#a", "##"]),
+    ]:
+        widened = filename_matching.widen(re.compile(pattern))
+        assert widened
+        for fname in matches:
+            assert widened.match(fname)
+        for fname in not_matches:
+            assert not widened.match(fname)
+
+    for pattern in [r"(\d)\1", r"\bfoo", r"foo(?!\d)", r"[^#]"]:
+        assert filename_matching.widen(re.compile(pattern)) is None
+
+
+def test_parser_state() -> None:
+    """Test reading the parser's state, as named on any Python version."""
+    parsed = filename_matching.sre_parse.parse(r"a\d")
+    state = filename_matching._parser_state(parsed)
+    py37 = SimpleNamespace(pattern=state)  # Python 3.7's `SubPattern`
+    assert filename_matching._parser_state(py37) is state
+    assert filename_matching._char_mask(py37, *parsed.data[1]) == sum(
+        1 << ord(d) for d in "0123456789"
+    )
+
+    matcher = filename_matching.PatternMatcher([re.compile(r"a(?P<n>\d+)$")])
+    found = matcher.match("a12")
+    assert found and found[1]["n"] == "12"
+
+
+def test_shape_memo() -> None:
+    """Test that memoized shapes give the same results as the linear scan."""
+    patterns = [
+        re.compile(p)
+        for p in [
+            r"Level2_(?P<a>\d+)\.i3$",
+            r"Level\d_(?P<b>\d)\.i3$",
+            r"(?P<c>\d)\d\.i3$",
+            r"Level\d_(?P<d>\d+)\.i3$",
+            r"(\d)\1_(?P<e>\d+)\.i3$",
+        ]
+    ]
+    matcher = filename_matching.PatternMatcher(patterns)
+
+    filenames = ["Level2_1.i3", "Level3_1.i3", "Level3_12.i3", "Level2_12.i3"]
+    filenames += ["12.i3", "11_5.i3", "12_5.i3", "Level2_1.i4", "Level3_1.i4"]
+    for fname in filenames * 2:
+        found = matcher.match(fname)
+        assert (found[0] if found else None) == _linear(patterns, fname)
+    assert matcher.shape_memo_hits > matcher.shape_memo_misses
+
+    # the real patterns, w/ digits swapped around
+    patterns = [re.compile(p) for p in filename_patterns.regex_patterns]
+    matcher = filename_matching.PatternMatcher(patterns)
+    filenames = [v["fileinfo"].name for v in data.EXAMPLES.values()]
+    for table in [{}, str.maketrans("0123", "9876"), str.maketrans("2", "3")]:
+        for fname in filenames:
+            fname = fname.translate(table)
+            found = matcher.match(fname)
+            assert (found[0] if found else None) == _linear(patterns, fname)
+    assert matcher.shape_memo_hits > matcher.shape_memo_misses
+
+
+def test_may_overlap() -> None:
+    """Test checking if two patterns could match the same filename."""
+    for pattern_a, pattern_b, overlap in [
+        (r"a\d+$", r"a1$", True),
+        (r"a\d+$", r"ab$", False),
+        (r"a$", r"a\n", True),  # "$" also matches before a final newline
+        (r"a\Z", r"a\n", False),
+        (r"a.", r"a\d{3}", True),  # prefix matches
+        (r"(x|y)+_\d{2}\.i3$", r"xy_\d\.i3$", False),
+        (r".*_Run(?P<run>\d+)_", r".*DebugData.*_Run(?P<run>\d+)\.", True),
+        (r"(\d)\1", r"a", True),  # unsupported -> conservative
+    ]:
+        nfa_a = filename_matching._nfa(re.compile(pattern_a))  # pylint: disable=W0212
+        nfa_b = filename_matching._nfa(re.compile(pattern_b))  # pylint: disable=W0212
+        assert filename_matching.may_overlap(nfa_a, nfa_b) == overlap
+        assert filename_matching.may_overlap(nfa_b, nfa_a) == overlap
+
+
+def test_adaptive(tmp_path: Path) -> None:
+    """Test that reordering by hits keeps the same first matches."""
+    patterns = [re.compile(p) for p in filename_patterns.regex_patterns]
+    matcher = filename_matching.PatternMatcher(patterns, adaptive=True)
+    filenames = [v["fileinfo"].name for v in data.EXAMPLES.values()]
+
+    # hit the last patterns most
+    for fname in filenames + filenames[len(filenames) // 2 :] * 20:
+        matcher.match(fname)
+    matcher.reorder()
+    assert matcher._rank != sorted(matcher._rank)  # pylint: disable=W0212
+
+    matcher._shape_memo.clear()  # pylint: disable=W0212
+    for table in [{}, str.maketrans("0123", "9876")]:
+        for fname in filenames:
+            fname = fname.translate(table)
+            found = matcher.match(fname)
+            assert (found[0] if found else None) == _linear(patterns, fname)
+
+    # stats
+    stats = matcher.stats()
+    assert list(stats.values()) == sorted(stats.values(), reverse=True)
+    assert sum(stats.values()) == sum(matcher.hits)
+    yaml_path = str(tmp_path / "stats.yaml")
+    filename_matching.add_stats_to_yaml(stats, yaml_path)
+    filename_matching.add_stats_to_yaml(stats, yaml_path)
+    with open(yaml_path) as file:
+        assert yaml.safe_load(file) == {p: 2 * n for p, n in stats.items()}
+
+    # a writer that fails midway leaves the totals intact
+    with patch.object(yaml, "safe_dump", side_effect=KeyboardInterrupt):
+        with pytest.raises(KeyboardInterrupt):
+            filename_matching.add_stats_to_yaml(stats, yaml_path)
+    with open(yaml_path) as file:
+        assert yaml.safe_load(file) == {p: 2 * n for p, n in stats.items()}
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "stats.yaml",
+        "stats.yaml.lock",
+    ]
+
+
+def test_shadowed_by() -> None:
+    """Test finding patterns shadowed by earlier patterns."""
+    matcher = filename_matching.PatternMatcher(
+        [
+            r"a\d+",
+            r"a1\d*",  # by #0
+            r"b",
+            r"a\d+x",  # by #0 (prefix matches)
+            r"b[0-4]$",  # by #2
+            r"c[0-4]",
+            r"c[5-9]",
+            r"c\d",  # by #5 & #6, together
+            r"d\d$",
+            r"d\d",  # not by #8, "d1x"
+            r"(e)\1",  # unsupported -> unsure
+            r"ee",  # ``
+        ]
+    )
+    assert [matcher.shadowed_by(i) for i in range(len(matcher.patterns))] == [
+        [],
+        [0],
+        [],
+        [0],
+        [2],
+        [],
+        [],
+        [5, 6],
+        [],
+        [],
+        None,
+        None,
+    ]
+
+    # a pattern that's shadowed can never be the first match
+    for i in range(len(matcher.patterns)):
+        if matcher.shadowed_by(i):
+            assert all(
+                _linear(matcher.patterns, f) != i
+                for f in ["a1", "a12x", "b1", "c3", "c7", "ee"]
+            )
+
+
+def test_backtracking_risks() -> None:
+    """Test flagging patterns that may backtrack excessively."""
+    for pattern, risks in [
+        (r"Level2_IC\d+\.\d+\.i3", []),
+        (r"Level2_(\d+)+\.i3", ["nested unbounded repeats (Ex: `(a+)+`)"]),
+        (r"\d+.*_", []),
+        (r".*_Run(?P<run>\d+)_", ["leading wildcard repeat (Ex: `.*`)"]),
+        (
+            r"(.*)Level2(\S+)_Run",
+            [
+                "leading wildcard repeat (Ex: `.*`)",
+                "2 wildcard repeats: a failed match may backtrack O(n^2)",
+            ],
+        ),
+    ]:
+        assert filename_matching.backtracking_risks(re.compile(pattern)) == risks
+
+    # the /data/exp/ base patterns' leading `.*` is flagged
+    assert filename_matching.backtracking_risks(
+        re.compile(real_filename_patterns.L2["base_pattern"])
+    ) == [
+        "leading wildcard repeat (Ex: `.*`)",
+        "3 wildcard repeats: a failed match may backtrack O(n^3)",
+    ]
@@ -2,8 +2,10 @@
 
 # pylint: disable=W0212
 
-from typing import Dict, List, Union
-from unittest.mock import ANY
+import asyncio
+import threading
+from typing import Any, Dict, List, Union
+from unittest.mock import ANY, Mock, patch
 
 import pytest
 from indexer.metadata.simulation import iceprod_tools
@@ -72,3 +74,186 @@ def test_parse_dataset_num_errors() -> None:  # pylint: disable=C0103
     for fpath in errors:
         with pytest.raises(iceprod_tools.DatasetNotFound):
             iceprod_tools._parse_dataset_num_from_dirpath(fpath)
+
+
+def _steering_param(dataset_num: int, name: str) -> Dict[str, Union[int, str]]:
+    return {"dataset_id": dataset_num, "name": name, "value": "x"}
+
+
+@patch("pymysql.connect")
+def test_iceprod1_pooled_connection(connect: Mock) -> None:
+    """Test that IceProd v1 queries reuse a connection, & are parameterized."""
+    cursor = connect.return_value.cursor.return_value
+    iceprod_conn = iceprod_tools.IceProdConnection("pass", "token")
+
+    for dataset_num in [10285, 10410]:
+        cursor.fetchall.return_value = [_steering_param(dataset_num, "a")]
+        assert iceprod_tools._get_iceprod1_dataset_steering_params(
+            iceprod_conn, dataset_num
+        ) == [_steering_param(dataset_num, "a")]
+        cursor.execute.assert_called_with(ANY, [dataset_num])
+
+    connect.assert_called_once()
+    iceprod_conn.close()
+    connect.return_value.close.assert_called_once()
+
+
+@patch("pymysql.connect")
+def test_prefetch_iceprod1_steering_params(connect: Mock) -> None:
+    """Test fetching many datasets' steering parameters in one query."""
+    cursor = connect.return_value.cursor.return_value
+    cursor.fetchall.return_value = [
+        _steering_param(10285, "a"),
+        _steering_param(10285, "b"),
+        _steering_param(10410, "a"),
+    ]
+    iceprod_conn = iceprod_tools.IceProdConnection("pass", "token")
+
+    # 20900 is IceProd v2
+    iceprod_tools.prefetch_iceprod1_steering_params(
+        iceprod_conn, [10410, 10285, 10285, 20900, 10001]
+    )
+    cursor.execute.assert_called_once_with(
+        "SELECT * FROM steering_parameter WHERE dataset_id IN (%s, %s, %s) "
+        "ORDER BY dataset_id, name",
+        [10001, 10285, 10410],
+    )
+
+    get_steering_params = iceprod_tools._get_iceprod1_dataset_steering_params
+    assert len(get_steering_params(iceprod_conn, 10285)) == 2
+    assert len(get_steering_params(iceprod_conn, 10410)) == 1
+    assert not get_steering_params(iceprod_conn, 10001)  # not found
+    assert not iceprod_conn.iceprod1_prefetched  # dropped once looked up
+    iceprod_tools.prefetch_iceprod1_steering_params(iceprod_conn, [10285])  # done
+    cursor.execute.assert_called_once()
+
+
+def test_async_iceprod_coalesced() -> None:
+    """Test that concurrent calls for the same file are coalesced."""
+    calls: List[str] = []
+    release = threading.Event()
+
+    def get(dataset_num: int, filepath: str, job_index: int, _: Mock) -> Any:
+        calls.append(filepath)
+        if filepath == "/data/sim/a.i3":
+            assert release.wait(5)  # until the followers are waiting
+        if job_index == 3:
+            raise iceprod_tools.DatasetNotFound()
+        return ({"filepath": filepath}, {"dataset": dataset_num, "job": job_index})
+
+    async def index() -> List[Any]:
+        async_iceprod = iceprod_tools.AsyncIceProd(Mock())
+        first = async_iceprod.submit(20900, "/data/sim/a.i3", 1)
+        followers = [
+            async_iceprod.get_steering_params_and_ip_metadata(20900, f, 1)
+            for f in ["/data/sim/a.i3", "/data/sim/a.i3"]
+        ]
+        # same job, another file -- not waiting on the first
+        other_file = async_iceprod.get_steering_params_and_ip_metadata(
+            20900, "/data/sim/b.i3", 1
+        )
+        assert (await other_file)[0] == {"filepath": "/data/sim/b.i3"}
+        release.set()
+        results = await asyncio.gather(first, *followers)
+        errors = await asyncio.gather(
+            *[async_iceprod.submit(20900, "/data/sim/c.i3", 3) for _ in range(2)],
+            return_exceptions=True,
+        )
+        assert async_iceprod.coalesced == 3
+        async_iceprod.close()
+        return results + errors
+
+    with patch.object(iceprod_tools, "get_steering_params_and_ip_metadata", get):
+        results = asyncio.run(index())
+
+    assert [r[0] for r in results[:3]] == [{"filepath": "/data/sim/a.i3"}] * 3
+    assert all(isinstance(r, iceprod_tools.DatasetNotFound) for r in results[3:])
+    assert sorted(calls) == ["/data/sim/a.i3", "/data/sim/b.i3", "/data/sim/c.i3"]
+
+
+def test_async_iceprod_prefetch() -> None:
+    """Test that a prefetched call is used by the file's own `submit()`."""
+    calls: List[str] = []
+
+    def get(dataset_num: int, filepath: str, job_index: int, _: Mock) -> Any:
+        calls.append(filepath)
+        if filepath == "/data/sim/skipped.i3":
+            raise iceprod_tools.DatasetNotFound()
+        return ({"filepath": filepath}, {"dataset": dataset_num, "job": job_index})
+
+    async def index() -> Any:
+        async_iceprod = iceprod_tools.AsyncIceProd(Mock())
+        async_iceprod.prefetch(20900, "/data/sim/a.i3", 1)
+        async_iceprod.prefetch(20900, "/data/sim/a.i3", 1)  # already started
+        async_iceprod.prefetch(20900, "/data/sim/skipped.i3", 2)
+        result = await async_iceprod.submit(20900, "/data/sim/a.i3", 1)
+        await async_iceprod.drop_prefetched()  # never indexed, error's retrieved
+        assert not async_iceprod._prefetched
+        async_iceprod.close()
+        return result
+
+    with patch.object(iceprod_tools, "get_steering_params_and_ip_metadata", get):
+        result = asyncio.run(index())
+
+    assert result[0] == {"filepath": "/data/sim/a.i3"}
+    assert sorted(calls) == ["/data/sim/a.i3", "/data/sim/skipped.i3"]
+
+
+def test_iceprodv2_rc_per_thread() -> None:
+    """Test that each thread gets its own IceProd v2 REST client."""
+    iceprod_conn = iceprod_tools.IceProdConnection("pass", "token")
+    rcs = [iceprod_conn.get_iceprodv2_rc()]
+    thread = threading.Thread(
+        target=lambda: rcs.append(iceprod_conn.get_iceprodv2_rc())
+    )
+    thread.start()
+    thread.join()
+
+    assert rcs[0] is iceprod_conn.get_iceprodv2_rc()  # reused by its thread
+    assert rcs[1] is not rcs[0]
+
+
+@patch("rest_tools.client.RestClient.request_seq")
+def test_get_task_info_bulk_tasks(request_seq: Mock) -> None:
+    """Test looking up tasks in the dataset's task index, from one request."""
+    request_seq.side_effect = [
+        {
+            f"t{j}{name}": {
+                "name": name,
+                "task_id": f"t{j}{name}",
+                "job_id": f"j{j}",
+                **({} if j is None else {"job_index": j}),  # Ex: an old task
+            }
+            for j in [0, 1, 2, None]
+            for name in ["generate", "filter"]
+        },
+        {},  # job 3's tasks, not in the (cached) index
+    ]
+    iceprod_conn = iceprod_tools.IceProdConnection("pass", "token", bulk_tasks=True)
+
+    for job_index in range(3):
+        querier = iceprod_tools._IceProdV2Querier(20900, iceprod_conn, "/data/sim/a")
+        assert querier._get_task_info("abc123", job_index, "filter") == (
+            f"t{job_index}filter",
+            f"j{job_index}",
+        )
+    request_seq.assert_called_once_with(
+        "GET", "/datasets/abc123/tasks", {"keys": "name|task_id|job_id|job_index"}
+    )
+
+    # not in the index, so the job's tasks are requested
+    with pytest.raises(iceprod_tools.TaskNotFound):
+        querier._get_task_info("abc123", 3, "filter")
+    request_seq.assert_called_with(
+        "GET",
+        "/datasets/abc123/tasks",
+        {"job_index": 3, "keys": "name|task_id|job_id|task_index"},
+    )
+    assert request_seq.call_count == 2
+
+
+def test_get_task_index_lock() -> None:
+    """Test that each dataset's task index has its own lock."""
+    lock = iceprod_tools._get_task_index_lock("abc123")
+    assert iceprod_tools._get_task_index_lock("abc123") is lock
+    assert iceprod_tools._get_task_index_lock("def456") is not lock
@@ -0,0 +1,128 @@
+"""Test reverse-solving IceProd v2 outfile URL templates."""
+
+# pylint: disable=W0212
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import Mock, patch
+
+import pytest
+from iceprod.core.serialization import dict_to_dataclasses  # type: ignore[import]
+from indexer.metadata.simulation import iceprod_tools, outfile_templates
+
+INTEGRATION_DIR = Path(__file__).parent / "../../integration/simulation/"
+CORSIKA_IP2 = INTEGRATION_DIR / "Corsika_IP2/ip2-job-config.json"
+OUTFILE_URL = "$steering(TARGET::2016)/$steering(outfile)"  # in the config
+OUTFILE_DIR = "/data/sim/IceCube/2016/generated/CORSIKA-in-ice/20900/"
+
+
+def _job_config() -> Any:
+    with open(CORSIKA_IP2) as f:
+        job_config = dict_to_dataclasses(json.load(f))
+    job_config["options"].update(
+        {"dataset": 20900, "dataset_id": "abc123", "jobs_submitted": 100000}
+    )
+    return job_config
+
+
+def _env(job_config: Any) -> Dict[str, Any]:
+    return {"parameters": job_config["steering"]["parameters"]}
+
+
+@pytest.mark.parametrize(
+    "filepath,solved",
+    [
+        (
+            OUTFILE_DIR + "0000000-0000999/corsika.020900.000982.i3.zst",
+            {"job": 982, "iter": None},
+        ),
+        (
+            OUTFILE_DIR + "0098000-0098999/corsika.020900.098765.i3.zst",
+            {"job": 98765, "iter": None},
+        ),
+        (OUTFILE_DIR + "0000000-0000999/corsika.020901.000982.i3.zst", None),
+        ("/data/sim/IceCube/2016/generated/corsika.020900.000982.i3.zst", None),
+    ],
+)
+def test_solve(filepath: str, solved: Any) -> None:
+    """Test solving the Corsika config's outfile for the job."""
+    job_config = _job_config()
+    pattern = outfile_templates.compile_path(
+        OUTFILE_URL, job_config, _env(job_config), "generate"
+    )
+    assert pattern
+    assert outfile_templates.solve(pattern, filepath) == solved
+
+
+def test_solve_iter_and_task() -> None:
+    """Test solving for the iter, and expanding the task."""
+    job_config = _job_config()
+    url = "gsiftp://gridftp/data/$(task)/$sprintf('%s-%03d',$(job),$(iter)).i3"
+    pattern = outfile_templates.compile_path(url, job_config, _env(job_config), "gen")
+    assert pattern
+
+    assert outfile_templates.solve(pattern, "/data/gen/17-004.i3") == {
+        "job": 17,
+        "iter": 4,
+    }
+    assert outfile_templates.solve(pattern, "/data/foo/17-004.i3") is None
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/data/$len($(job)).i3",  # depends on the job's length
+        "/data/$steering(outfile)[$(job)]",  # a lookup
+        "gsiftp://$eval($(job)//2)/foo.i3",  # the host isn't expanded
+    ],
+)
+def test_unsupported(url: str) -> None:
+    """Test that templates which can't be soundly compiled aren't."""
+    job_config = _job_config()
+    assert not outfile_templates.compile_path(url, job_config, _env(job_config), "t")
+
+
+def test_get_outfile_info() -> None:
+    """Test finding files' jobs, w/o a job index, w/o trying every job."""
+    with patch.object(
+        iceprod_tools, "_get_iceprod2_dataset_job_config", return_value=_job_config()
+    ), patch.object(
+        outfile_templates.ExpParser,
+        "parse",
+        autospec=True,
+        side_effect=outfile_templates.ExpParser.parse,
+    ) as parse:
+        for job in [98765, 982]:  # two files, same dataset
+            subdir = f"{job // 1000 * 1000:07d}-{job // 1000 * 1000 + 999:07d}"
+            querier = iceprod_tools._IceProdV2Querier(
+                20900, Mock(), f"{OUTFILE_DIR}{subdir}/corsika.020900.{job:06d}.i3.zst"
+            )
+            parse.reset_mock()
+
+            job_index, task, steering_params = querier._get_outfile_info(
+                "abc123", None, 100000
+            )
+            assert (job_index, task) == (job, "generate")
+            assert steering_params["CORSIKA::seed"] == (20900 * 100000 + job) % 10**8
+            # compiling (once per dataset) & verifying, vs. once per job
+            assert [c[0][1] for c in parse.call_args_list].count(OUTFILE_URL) <= 3
+
+
+def test_get_outfile_info_miscompiled(caplog: pytest.LogCaptureFixture) -> None:
+    """Test that a file is still found if its outfile's pattern misses it."""
+    filepath = f"{OUTFILE_DIR}0000000-0000999/corsika.020900.000042.i3.zst"
+    querier = iceprod_tools._IceProdV2Querier(20900, Mock(), filepath)
+
+    with patch.object(
+        iceprod_tools, "_get_iceprod2_dataset_job_config", return_value=_job_config()
+    ), patch.object(
+        iceprod_tools,
+        "_get_iceprod2_outfile_patterns",
+        return_value=[re.compile(r"/mis-compiled/.*")] * 10,  # >= one per outfile
+    ):
+        job_index, task, _ = querier._get_outfile_info("abc123", None, 100)
+
+    assert (job_index, task) == (42, "generate")  # by trying every job
+    assert "was compiled wrong" in caplog.text